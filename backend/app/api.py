@@ -1,65 +1,173 @@
 # backend/app/api.py
 
-from fastapi import APIRouter, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
+from typing import List, Optional
+from contextlib import asynccontextmanager
 import os
+import uuid
 
 from app.services.hybrid_rag_pipeline import HybridRAGAgentPipeline
 from app.services.insight_generator import InsightGenerator
-from app.services.table_qa import run_table_qa
-from app.utils.document_loader import ingest_document
+from app.services.table_qa import run_table_qa, stream_table_qa
+from app.services.ingestion_jobs import IngestionJobQueue
+from app.services.readiness import ComponentLoader
+from app.services import model_registry
+from app.utils.graph_loader import close_driver
+from app.utils.pdf_parser import shutdown_pools, warm_pool
+from app.utils import metrics
+from app.utils.log import get_logger
+from app.utils.concurrency import EndpointLimiter, ndjson_response
+from app import config
 
 # --- Initialize FastAPI Router ---
 router = APIRouter()
+logger = get_logger(__name__)
 
-# --- Initialize Pipelines ---
+# --- Initialize Pipelines (cheap; collections, Neo4j and models load in the background) ---
 pipeline = HybridRAGAgentPipeline()
-insight_generator = InsightGenerator(collection_name="default")   # << INIT ONCE
+insight_generator = InsightGenerator()   # << INIT ONCE (shares the per-collection retrievers)
+
+# --- Per-endpoint limits: blocking work runs off the event loop, overflow gets 429 ---
+limiters = {
+    "hybrid_rag": EndpointLimiter("hybrid_rag", config.HYBRID_RAG_CONCURRENCY, config.ENDPOINT_QUEUE_DEPTH),
+    "insights": EndpointLimiter("insights", config.INSIGHTS_CONCURRENCY, config.ENDPOINT_QUEUE_DEPTH),
+    "table_qa": EndpointLimiter("table_qa", config.TABLE_QA_CONCURRENCY, config.ENDPOINT_QUEUE_DEPTH),
+}
+
+# --- Background ingestion (uploads return a job ID immediately) ---
+job_queue = IngestionJobQueue()
+SUPPORTED_UPLOAD_TYPES = (".pdf", ".txt", ".html")
+
+# --- Startup: slow components load in parallel while the API already serves requests ---
+def _warm_up_models():
+    failed = model_registry.warm_up()
+    if failed:
+        raise RuntimeError(f"Ollama models not loaded: {failed}")
+
+components = ComponentLoader()
+for name, loader in pipeline.loaders().items():
+    components.add(name, loader)
+components.add("ollama", _warm_up_models)
+# Answers given before every component is up aren't cached
+pipeline.readiness = components
+insight_generator.readiness = components
+
+@asynccontextmanager
+async def lifespan(app):
+    warm_pool()
+    job_queue.start()
+    components.start()
+    yield
+    components.shutdown()
+    close_driver()
+    shutdown_pools()
+
+# --- Collections a request may search (None = all configured ones) ---
+def resolve_collections(collections: Optional[List[str]]):
+    if not collections:
+        return None
+    unknown = sorted(set(collections) - set(config.SEARCH_COLLECTIONS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown collections {unknown}, expected a subset of {config.SEARCH_COLLECTIONS}")
+    return list(dict.fromkeys(collections))
 
 # --- Upload Endpoint ---
-@router.post("/upload")
+@router.post("/upload", status_code=202)
 async def upload_file(file: UploadFile = File(...)):
     upload_dir = "./uploads"
     os.makedirs(upload_dir, exist_ok=True)
 
-    file_path = os.path.join(upload_dir, file.filename)
-
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-
-    print(f"[UPLOAD] File saved to {file_path}")
-
-    # Ingest the document
-    ingest_document(file_path)
-
-    return JSONResponse({"message": "File uploaded and ingested successfully.", "file_path": file_path})
+    filename = os.path.basename(file.filename or "")
+    if not filename.lower().endswith(SUPPORTED_UPLOAD_TYPES):
+        raise HTTPException(status_code=400, detail=f"Unsupported file type, expected one of {SUPPORTED_UPLOAD_TYPES}")
+
+    # Each upload streams into its own per-job file, so a second upload with the
+    # same name can't overwrite a file a running job is still reading. The job
+    # ingests it under `file_path` and moves it there once it completes.
+    file_path = os.path.join(upload_dir, filename)
+    job_id = uuid.uuid4().hex
+    job_path = os.path.join(upload_dir, f"{job_id}_{filename}")
+    with open(job_path, "wb") as f:
+        while chunk := await file.read(config.UPLOAD_CHUNK_SIZE):
+            f.write(chunk)
+
+    logger.info("Upload saved to %s (job %s)", job_path, job_id)
+
+    # Ingest the document in the background
+    job_queue.submit(job_path, source=file_path, job_id=job_id)
+
+    return JSONResponse(
+        {"message": "File uploaded, ingestion queued.", "file_path": file_path, "job_id": job_id, "status": "queued"},
+        status_code=202,
+    )
+
+# --- Ingestion Job Status Endpoint ---
+@router.get("/jobs/{job_id}")
+async def job_status_endpoint(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return JSONResponse(job)
 
 # --- Hybrid RAG QA Endpoint ---
 class QARequest(BaseModel):
     question: str
+    collections: Optional[List[str]] = None
 
 @router.post("/hybrid_rag")
 async def hybrid_rag_endpoint(request: QARequest):
-    print(f"[API] Hybrid RAG question: {request.question}")
-
-    response = pipeline.run(request.question)
+    collections = resolve_collections(request.collections)
+    response = await limiters["hybrid_rag"].run(pipeline.run, request.question, collections)
 
     return JSONResponse({"question": request.question, "answer": response})
 
+@router.post("/hybrid_rag/stream")
+async def hybrid_rag_stream_endpoint(request: QARequest):
+    collections = resolve_collections(request.collections)
+    return ndjson_response(limiters["hybrid_rag"].stream(pipeline.stream(request.question, collections)))
+
+# --- Readiness Endpoint: per-component state and load time ---
+@router.get("/ready")
+async def ready_endpoint():
+    status = components.status()
+    # Degraded still serves queries (without the failed components); only "starting" is not ready
+    return JSONResponse(status, status_code=503 if status["status"] == "starting" else 200)
+
+# --- Prometheus Metrics Endpoint: per-stage latency histograms, token / retrieval / cache counters ---
+@router.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# --- Pipeline Stats Endpoint ---
+@router.get("/stats")
+async def stats_endpoint():
+    stats = pipeline.stats()
+    stats["insights"] = insight_generator.stats()
+    stats["models"] = model_registry.stats()
+    stats["endpoints"] = {name: limiter.stats() for name, limiter in limiters.items()}
+    stats["ingestion_queue_depth"] = job_queue.queue_depth()
+    return JSONResponse(stats)
+
 # --- Insights Endpoint ---
 class InsightRequest(BaseModel):
     question: str
+    collections: Optional[List[str]] = None
 
 @router.post("/insights")
 async def insights_endpoint(request: InsightRequest):
-    print(f"[API] Insights question: {request.question}")
-
     # FIXED: use class method
-    response = insight_generator.generate_insights(request.question)
+    collections = resolve_collections(request.collections)
+    response = await limiters["insights"].run(insight_generator.generate_insights, request.question, collections)
 
     return JSONResponse({"question": request.question, "insights": response})
 
+@router.post("/insights/stream")
+async def insights_stream_endpoint(request: InsightRequest):
+    collections = resolve_collections(request.collections)
+    return ndjson_response(limiters["insights"].stream(insight_generator.stream_insights(request.question, collections)))
+
 # --- Table QA Endpoint ---
 class TableQARequest(BaseModel):
     file_path: str
@@ -67,8 +175,10 @@ class TableQARequest(BaseModel):
 
 @router.post("/table_qa")
 async def table_qa_endpoint(request: TableQARequest):
-    print(f"[API] Table QA: {request.file_path}, Q: {request.question}")
+    response = await limiters["table_qa"].run(run_table_qa, request.file_path, request.question)
 
-    response = run_table_qa(request.file_path, request.question)
+    return JSONResponse({"file_path": request.file_path, "question": request.question, "answer": response})
 
-    return JSONResponse({"file_path": request.file_path, "question": request.question, "answer": response})
\ No newline at end of file
+@router.post("/table_qa/stream")
+async def table_qa_stream_endpoint(request: TableQARequest):
+    return ndjson_response(limiters["table_qa"].stream(stream_table_qa(request.file_path, request.question)))
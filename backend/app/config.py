@@ -10,6 +10,13 @@ load_dotenv()
 NEO4J_URI = os.getenv("NEO4J_URI", "neo4j+s://91e40f31.databases.neo4j.io")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "qArxw-_vILQuc-nUh1IVmIC6yI6qDz0oJ7ekwJ8Mq-I")
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_WRITE_BATCH_SIZE = int(os.getenv("NEO4J_WRITE_BATCH_SIZE", "500"))
+NEO4J_CONNECTION_TIMEOUT_S = float(os.getenv("NEO4J_CONNECTION_TIMEOUT_S", "10"))
+
+# Knowledge-graph context per question
+KG_TOP_K = 5
+KG_TOKEN_BUDGET = 800
 
 # Chroma (no longer used, kept for fallback/debug)
 CHROMA_DB_DIR = "./vector_store"
@@ -24,6 +31,100 @@ CHUNK_OVERLAP = 200
 # Ollama settings
 OLLAMA_BASE_URL = "http://localhost:11434"
 OLLAMA_MODEL = "phi4-mini"
+OLLAMA_EMBEDDING_MODEL = "nomic-embed-text"
+INSIGHTS_MODEL = "mistral"
+TABLE_QA_MODEL = "mistral"
+
+# Shared Ollama clients: built once per process, models kept loaded between requests
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "8"))
+WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "phi4-mini,mistral,nomic-embed-text").split(",") if m.strip()]
+WARMUP_TIMEOUT_S = 120
+
+# Question rewriting: "off", "heuristic" (rules only) or "llm" (rules, LLM when ambiguous)
+REWRITE_MODE = os.getenv("REWRITE_MODE", "llm")
+REWRITE_CACHE_SIZE = 1024
+
+# Retrieval: dense + BM25 candidates fused with reciprocal rank fusion
+RETRIEVAL_TOP_K = 5
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+HYBRID_SPARSE_WEIGHT = float(os.getenv("HYBRID_SPARSE_WEIGHT", "1.0"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Federated search: collections queried by default, and each one's latency budget
+SEARCH_COLLECTIONS = [c.strip() for c in os.getenv("SEARCH_COLLECTIONS", "default,finqa,tatqa,sec_summaries").split(",") if c.strip()]
+COLLECTION_TIMEOUT_MS = int(os.getenv("COLLECTION_TIMEOUT_MS", "1500"))
+
+# Cross-encoder reranking between retrieval and generation
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "1") == "1"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch")   # "onnx" / "openvino" for exported, quantized models
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_BUDGET_MS = int(os.getenv("RERANK_BUDGET_MS", "300"))
+RERANK_TOKEN_BUDGET = int(os.getenv("RERANK_TOKEN_BUDGET", "1500"))
+
+# Context assembly before generation: near-duplicate passages dropped, then a per-model token budget
+CONTEXT_TOKEN_BUDGETS = {"phi4-mini": 2000, "mistral": 3000}
+DEFAULT_CONTEXT_TOKEN_BUDGET = 2000
+CONTEXT_DEDUP_THRESHOLD = 0.8   # estimated Jaccard similarity of word shingles
+CONTEXT_MAX_OVERLAP = CHUNK_OVERLAP + 50
+
+# Answer cache: exact (normalized question) + semantic (embedding similarity) tiers
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL_S = int(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# Startup: components load in the background; queries run without the ones still loading
+STARTUP_WORKERS = int(os.getenv("STARTUP_WORKERS", "8"))
+STARTUP_RETRIES = int(os.getenv("STARTUP_RETRIES", "3"))
+STARTUP_RETRY_DELAY_S = float(os.getenv("STARTUP_RETRY_DELAY_S", "10"))
+
+# Observability: log level for the queued logger, latency histogram buckets (seconds) for /metrics
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Local FAISS collections (used when a batch is too large for Pinecone)
+LOCAL_VECTORS_DIR = "./local_vectors"
+
+# Embedding cache (shared by ingestion and query paths)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Ingestion writer (batched embedding + upsert)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "96"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "4"))
+WRITE_RETRIES = 3
+
+# Ingestion ledger (which sources / chunk hashes are already stored per collection)
+INGESTION_LEDGER_DIR = "./ingestion_ledger"
+
+# API concurrency: requests running at once per endpoint, and how many may wait
+HYBRID_RAG_CONCURRENCY = int(os.getenv("HYBRID_RAG_CONCURRENCY", "4"))
+INSIGHTS_CONCURRENCY = int(os.getenv("INSIGHTS_CONCURRENCY", "2"))
+TABLE_QA_CONCURRENCY = int(os.getenv("TABLE_QA_CONCURRENCY", "2"))
+ENDPOINT_QUEUE_DEPTH = int(os.getenv("ENDPOINT_QUEUE_DEPTH", "16"))
+
+# Background ingestion jobs for /upload
+JOBS_DB_PATH = "./jobs/jobs.sqlite3"
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "1"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# PDF parsing: pages are sharded across a process pool (0 = one worker per core)
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "0"))
+PDF_PAGES_PER_TASK = 8
+
+# Table QA: extracted tables cached per document content hash
+TABLE_CACHE_DIR = "./table_cache"
+TABLE_QA_TOP_TABLES = 2
+
+# Dataset ingestion (FinQA / TAT-QA JSON is streamed, never loaded whole)
+JSON_READ_CHUNK_SIZE = 1024 * 1024
+DATASET_BATCH_SIZE = int(os.getenv("DATASET_BATCH_SIZE", "500"))
 
 # Dataset paths
 SEC_FILINGS_RAW_DIR = "../datasets/sec_filings/raw/sec-edgar-filings"
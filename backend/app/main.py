@@ -2,10 +2,16 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import router
+from app.utils.log import configure_logging, get_logger
+from app.api import router, lifespan
+
+# --- Queued logging first, so every module's logger writes through it ---
+configure_logging()
+
+logger = get_logger(__name__)
 
 # --- Initialize FastAPI app ---
-app = FastAPI(title="Financial QA & Insights API")
+app = FastAPI(title="Financial QA & Insights API", lifespan=lifespan)
 
 # --- CORS settings for Frontend (Next.js) ---
 origins = [
@@ -28,5 +34,5 @@ app.include_router(router)
 # --- Root endpoint ---
 @app.get("/")
 def root():
-    print("[Startup] FastAPI app has fully started 🚀")
+    logger.debug("Root endpoint called")
     return {"message": "Financial QA & Insights API is running 🚀"}
\ No newline at end of file
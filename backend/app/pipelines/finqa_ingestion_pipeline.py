@@ -1,44 +1,35 @@
 import os
-import json
-from app.utils.vector_store import save_vector_store
+from app import config
+from app.utils.vector_store import save_vector_store, delete_stale_chunks, get_embeddings
 from app.utils.graph_loader import save_chunks_to_neo4j
-from app.utils.document_loader import split_documents
+from app.utils.financial_chunker import chunk_finqa_entry
+from app.utils.json_stream import iter_json_array, batched
 
-def ingest_finqa_dataset(file_path: str):
-    print(f"[FinQA Ingestion] Ingesting FinQA dataset: {file_path}")
+# --- Generator stage: records → structured chunks (nothing is materialized beyond one batch) ---
+def _entry_chunks(entries, file_path):
+    for entry in entries:
+        yield from chunk_finqa_entry(entry, file_path)
+
+def ingest_finqa_dataset(file_path: str, limit: int = None, offset: int = 0, batch_size: int = config.DATASET_BATCH_SIZE):
+    print(f"[FinQA Ingestion] Ingesting FinQA dataset: {file_path} (offset={offset}, limit={limit or 'all'})")
 
     if not os.path.exists(file_path):
         print(f"[FinQA Ingestion] ERROR: File does not exist → {file_path}")
         return
 
-    with open(file_path, "r") as f:
-        data = json.load(f)
-        data = data[:100]  # Limit to 100 samples for demo
+    entries = iter_json_array(file_path, offset=offset, limit=limit)
+    chunks = _entry_chunks(entries, file_path)
 
-    BATCH_SIZE = 50  # Can be adjusted based on memory limits
-    chunks_batch = []
     total_chunks = 0
-
-    for i, entry in enumerate(data):
-        q = entry.get("qa", {}).get("question", "")
-        a = entry.get("qa", {}).get("answer", "")
-        table = entry.get("table", "")
-        combined_text = f"Question: {q}\nAnswer: {a}\nTable: {table}"
-
-        split_chunks = split_documents(combined_text)
-        chunks_batch.extend(split_chunks)
-
-        if len(chunks_batch) >= BATCH_SIZE:
-            save_vector_store(chunks_batch, collection_name="finqa")
-            save_chunks_to_neo4j(chunks_batch, source=file_path)
-            total_chunks += len(chunks_batch)
-            print(f"[Ingestion] ✅ Batch of {len(chunks_batch)} chunks uploaded")
-            chunks_batch = []
-
-    if chunks_batch:
-        save_vector_store(chunks_batch, collection_name="finqa")
-        save_chunks_to_neo4j(chunks_batch, source=file_path)
+    seen_ids = set()
+    for chunks_batch in batched(chunks, batch_size):
+        seen_ids.update(save_vector_store(chunks_batch, collection_name="finqa", source=file_path))
+        save_chunks_to_neo4j(chunks_batch, source=file_path, collection_name="finqa")
         total_chunks += len(chunks_batch)
-        print(f"[Ingestion] ✅ Final batch of {len(chunks_batch)} chunks uploaded")
+        print(f"[Ingestion] ✅ Batch of {len(chunks_batch)} chunks uploaded ({total_chunks} so far)")
 
-    print(f"[Ingestion] 🎉 DONE — Total Chunks Ingested: {total_chunks}")
\ No newline at end of file
+    # Only a full pass knows which chunks the file no longer produces
+    if limit is None and not offset:
+        delete_stale_chunks("finqa", file_path, seen_ids)
+    print(f"[Ingestion] 🎉 DONE — Total Chunks Ingested: {total_chunks}")
+    print(f"[Ingestion] Embedding cache: {get_embeddings().report()}")
@@ -1,8 +1,11 @@
 import os
-from typing import List, Dict
+import re
+from typing import List, Dict, Optional
 import requests
-from app.utils.vector_store import save_vector_store
+from app.utils.vector_store import save_vector_store, delete_stale_chunks
+from app.utils.ingestion_ledger import get_ledger, make_chunk_id, file_hash
 from app.utils.graph_loader import save_chunks_to_neo4j
+from app.services.model_registry import get_http_session
 from app import config
 import time
 
@@ -20,9 +23,9 @@ def summarize_text(raw_text: str, model: str = config.OLLAMA_MODEL, retries: int
     for attempt in range(1, retries + 1):
         try:
             print(f"[Summary] 🔄 Attempt {attempt} — Sending request to Ollama...")
-            response = requests.post(
+            response = get_http_session().post(
                 f"{config.OLLAMA_BASE_URL}/api/generate",
-                json={"model": model, "prompt": prompt, "stream": False},
+                json={"model": model, "prompt": prompt, "stream": False, "keep_alive": config.OLLAMA_KEEP_ALIVE},
                 timeout=timeout
             )
             response.raise_for_status()
@@ -37,24 +40,51 @@ def summarize_text(raw_text: str, model: str = config.OLLAMA_MODEL, retries: int
                 raise RuntimeError(f"Failed after {retries} retries: {e}")
 
 # ─────────────────────────────────────────────
-# 2. — Build summary chunk
+# 2. — Fiscal period from the EDGAR submission header
+# ─────────────────────────────────────────────
+PERIOD_RE = re.compile(r"CONFORMED PERIOD OF REPORT:\s*(\d{4})(\d{2})\d{2}")
+FISCAL_YEAR_END_RE = re.compile(r"FISCAL YEAR END:\s*(\d{2})\d{2}")
+
+def parse_fiscal_period(raw_text: str, form_type: str) -> Dict:
+    """{"fiscal_year": 2008} for a 10-K, plus "fiscal_quarter": "Q3" for a 10-Q; {} if the header lacks a period."""
+    header = raw_text[:5000]
+    period = PERIOD_RE.search(header)
+    if not period:
+        return {}
+    year, month = int(period.group(1)), int(period.group(2))
+    fye = FISCAL_YEAR_END_RE.search(header)
+    fye_month = int(fye.group(1)) if fye else 12
+
+    if not form_type.upper().startswith("10-Q"):
+        return {"fiscal_year": year}
+    months_into_year = (month - fye_month) % 12 or 12
+    return {
+        "fiscal_year": year + (1 if month > fye_month else 0),
+        "fiscal_quarter": f"Q{min(4, max(1, round(months_into_year / 3)))}",
+    }
+
+# ─────────────────────────────────────────────
+# 3. — Build summary chunk
 # ─────────────────────────────────────────────
 def build_summary_chunk(title: str,
                         company: str,
                         form_type: str,
                         summary: str,
-                        file_path: str) -> Dict:
+                        file_path: str,
+                        period: Optional[Dict] = None) -> Dict:
     chunk_text = f"Company: {company}\nForm: {form_type}\nTitle: {title}\nSummary:\n{summary}"
     metadata = {
         "company": company,
         "form_type": form_type,
         "title": title,
-        "source": file_path
+        "source": file_path,
+        # fiscal_year / fiscal_quarter: filterable at query time
+        **(period or {}),
     }
     return {"text": chunk_text, "metadata": metadata}
 
 # ─────────────────────────────────────────────
-# 3. — Main ingestion with debug steps
+# 4. — Main ingestion with debug steps
 # ─────────────────────────────────────────────
 def ingest_sec_dataset(root_folder: str,
                        max_files: int = 100,
@@ -77,6 +107,8 @@ def ingest_sec_dataset(root_folder: str,
     print(f"[SEC-Summary] Found {len(txt_files)} filings")
 
     pc_batch, neo_batch, pc_accum, neo_accum = [], [], 0, 0
+    ledger = get_ledger("sec_summaries")
+    processed = {}  # file_path -> (content hash, chunk id)
 
     for idx, file_path in enumerate(txt_files):
         print(f"\n[{idx+1}/{len(txt_files)}] Processing: {file_path}")
@@ -87,6 +119,11 @@ def ingest_sec_dataset(root_folder: str,
             print(f"[Skip] Could not read {file_path}: {e}")
             continue
 
+        content_hash = file_hash(file_path)
+        if ledger.source_hash(file_path) == content_hash and ledger.ids_for_source(file_path):
+            print(f"[Skip] Unchanged since last ingestion: {file_path}")
+            continue
+
         parts = file_path.split(os.sep)
         try:
             company, form_type = parts[-4], parts[-3]
@@ -100,7 +137,8 @@ def ingest_sec_dataset(root_folder: str,
             print(f"[Skip] Skipping file due to summary error: {file_path}")
             continue
 
-        chunk = build_summary_chunk(title, company, form_type, summary, file_path)
+        chunk = build_summary_chunk(title, company, form_type, summary, file_path, parse_fiscal_period(raw_text, form_type))
+        processed[file_path] = (content_hash, make_chunk_id("sec_summaries", file_path, chunk["text"]))
         pc_batch.append(chunk)
         flattened_chunk = {
             "text": chunk["text"],
@@ -122,7 +160,7 @@ def ingest_sec_dataset(root_folder: str,
         if neo_accum >= neo4j_batch:
             print(f"[Neo4j] 🔁 Uploading batch of {len(neo_batch)}")
             try:
-                save_chunks_to_neo4j(neo_batch, source="sec_summary_ingestion")
+                save_chunks_to_neo4j(neo_batch, source="sec_summary_ingestion", collection_name="sec_summaries")
                 print("[Neo4j] ✅ Batch uploaded")
             except Exception as e:
                 print(f"[Neo4j] ❌ Upload error: {e}")
@@ -140,9 +178,15 @@ def ingest_sec_dataset(root_folder: str,
     if neo_batch:
         print(f"[Neo4j] ⏳ Uploading final batch of {len(neo_batch)}")
         try:
-            save_chunks_to_neo4j(neo_batch, source="sec_summary_ingestion")
+            save_chunks_to_neo4j(neo_batch, source="sec_summary_ingestion", collection_name="sec_summaries")
             print("[Neo4j] ✅ Final batch uploaded")
         except Exception as e:
             print(f"[Neo4j] ❌ Final upload error: {e}")
 
+    # Drop summaries superseded by this run and remember which file versions are stored
+    for file_path, (content_hash, chunk_id) in processed.items():
+        if chunk_id in ledger.ids_for_source(file_path):
+            delete_stale_chunks("sec_summaries", file_path, {chunk_id})
+            ledger.mark_source(file_path, content_hash)
+
     print("\n🎉 SEC summary ingestion complete!")
\ No newline at end of file
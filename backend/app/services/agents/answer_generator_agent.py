@@ -1,15 +1,83 @@
 # backend/app/services/agents/answer_generator_agent.py
 
 from langchain_core.messages import AIMessage
+from app.services.numeric_reasoning import solve_numeric_question, tables_from_text
+from app.utils.financial_entities import find_company
+from app.utils.log import get_logger
 
-def generate_answer(messages: list, llm):
-    print("[Agent] Generating answer...")
+logger = get_logger(__name__)
 
+def build_answer_prompt(messages: list, solved=None) -> str:
     context = messages[-1].content
-    prompt = f"Answer the following based on context:\n\n{context}\n\nAnswer:"
+    hint = ""
+    if solved:
+        hint = f"\n\nA calculation over a table in the context gives: {solved['answer']} Use it only if that table answers the question."
+    return f"Answer the following based on context:\n\n{context}{hint}\n\nAnswer:"
+
+# --- Arithmetic questions over tables in the retrieved context are computed, not generated ---
+def _passage_company(passage):
+    return passage.get("company") or find_company(f"{passage.get('source') or ''}\n{passage['text']}")
+
+def _table_matches_question(passage, table_passages, company) -> bool:
+    if company:
+        return _passage_company(passage) == company
+    # No company named: only trust the table when every table in the context comes from one source
+    return len({p.get("source") for p in table_passages}) == 1
+
+def solve_from_context(messages: list):
+    """
+    (solved, trusted): the solver's result over the context's tables, and whether
+    it may replace the LLM answer. It may when the row matched exactly and the
+    table comes from the company (or the single source) the question is about;
+    otherwise the result only goes into the prompt as a hint.
+    """
+    question = messages[0].content
+    passages = messages[-1].additional_kwargs.get("passages") or [{"text": messages[-1].content}]
+    table_passages = [passage for passage in passages if tables_from_text(passage["text"])]
+
+    company = find_company(question)
+    best, best_key = None, None
+    for passage in table_passages:
+        solved = solve_numeric_question(question, context=passage["text"])
+        if not solved:
+            continue
+        # Tables from the right company first, then the closest row match
+        key = (_table_matches_question(passage, table_passages, company), solved["program"]["score"])
+        if best is None or key > best_key:
+            best, best_key = solved, key
+    if best is None:
+        return None, False
+
+    trusted = best["confident"] and best_key[0]
+    if trusted:
+        logger.info("Solved numerically (%s), skipping LLM", best["program"]["operation"])
+    else:
+        logger.info("Solved numerically (%s), passing the result to the LLM as a hint", best["program"]["operation"])
+    return best, trusted
 
+def generate_answer(messages: list, llm):
+    logger.debug("Generating answer")
+
+    solved, trusted = solve_from_context(messages)
+    if trusted:
+        return [AIMessage(content=solved["answer"], additional_kwargs={"program": solved["program"]})]
+
+    prompt = build_answer_prompt(messages, solved)
     response = llm.invoke(prompt)
 
-    print(f"[Agent] Generated Answer: {response}")
+    logger.debug("Generated answer: %s", response)
+
+    return [AIMessage(content=response)]
+
+# --- Streaming variant: yields answer tokens as the LLM produces them ---
+def stream_answer(messages: list, llm):
+    logger.debug("Streaming answer")
+
+    solved, trusted = solve_from_context(messages)
+    if trusted:
+        yield solved["answer"]
+        return
 
-    return [AIMessage(content=response)]
\ No newline at end of file
+    prompt = build_answer_prompt(messages, solved)
+    for token in llm.stream(prompt):
+        yield token
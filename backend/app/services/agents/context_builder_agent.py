@@ -0,0 +1,29 @@
+# backend/app/services/agents/context_builder_agent.py
+
+from langchain_core.messages import AIMessage
+from app.services.agents.answer_generator_agent import build_answer_prompt
+from app.utils.log import get_logger
+from app.utils.token_budget import estimate_tokens
+
+logger = get_logger(__name__)
+
+def build_context(messages: list, builder):
+    logger.debug("Building context")
+
+    retrieved = messages[-1].additional_kwargs
+    retrieval_info = dict(retrieved.get("retrieval", {}))
+
+    passages, info = builder.build(retrieved.get("passages", []))
+    context = "\n\n".join(passage["text"] for passage in passages)
+
+    # Token count of the prompt generate_answer will send, recorded per request
+    info["prompt_tokens"] = estimate_tokens(build_answer_prompt([AIMessage(content=context)]))
+    builder.record(info, info["prompt_tokens"])
+
+    logger.debug(
+        "Context: %s/%s passages, %s -> %s tokens (%s duplicates dropped)",
+        info["passages_kept"], info["passages_in"], info["tokens_before"], info["tokens_after"], info["duplicates_removed"],
+    )
+
+    retrieval_info["context"] = info
+    return [AIMessage(content=context, additional_kwargs={"retrieval": retrieval_info, "passages": passages})]
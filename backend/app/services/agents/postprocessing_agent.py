@@ -1,11 +1,44 @@
 # backend/app/services/agents/postprocessing_agent.py
 
 from langchain_core.messages import AIMessage
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+ANSWER_FOOTER = "\n\n[Generated by Hybrid RAG System]"
 
 def postprocess_answer(messages: list):
-    print("[Agent] Post-processing answer...")
+    logger.debug("Post-processing answer")
 
     answer = messages[-1].content.strip()
-    final_output = answer + "\n\n[Generated by Hybrid RAG System]"
+    final_output = answer + ANSWER_FOOTER
+
+    return [AIMessage(content=final_output)]
+
+# --- Incremental post-processing for streamed answers ---
+class StreamingPostprocessor:
+    """
+    Applies the same transformation as `postprocess_answer` token by token:
+    leading whitespace is dropped, trailing whitespace is held back until more
+    text follows it, and the footer is emitted by `finish()`. The concatenated
+    output is therefore identical to the non-streaming answer.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._pending = ""
+
+    def feed(self, token: str) -> str:
+        if not self._started:
+            token = token.lstrip()
+            if not token:
+                return ""
+            self._started = True
+
+        text = self._pending + token
+        emitted = text.rstrip()
+        self._pending = text[len(emitted):]
+        return emitted
 
-    return [AIMessage(content=final_output)]
\ No newline at end of file
+    def finish(self) -> str:
+        return ANSWER_FOOTER
@@ -1,19 +1,144 @@
 # backend/app/services/agents/question_rewriter_agent.py
 
-from langchain_community.llms import Ollama
+import re
+import threading
+import time
+from collections import OrderedDict
+
 from langchain_core.messages import HumanMessage, AIMessage
 
-def rewrite_question(messages: list):
-    print("[Agent] Rewriting question...")
+from app import config
+from app.services.model_registry import get_llm
+from app.utils.log import get_logger
+from app.utils.tracing import record_cache
+from app.utils.financial_entities import COMPANY_TICKERS, KNOWN_TICKERS, extract_entities
+
+logger = get_logger(__name__)
+
+REWRITE_MODES = ("off", "heuristic", "llm")
+
+REWRITE_PROMPT = "Rewrite this user question to be more precise and suitable for document retrieval and keep dates or year as it is:\n\n{question}"
+
+PRONOUN_RE = re.compile(r"\b(it|its|they|their|them|this|that|these|those|he|she)\b", re.IGNORECASE)
+WORD_RE = re.compile(r"[A-Za-z0-9$%.-]+")
+
+# --- Rule-based normalization: tickers, fiscal years, form types, quarters ---
+def normalize_question(question: str) -> str:
+    text = " ".join(question.split())
+
+    # "10k", "10 q", "10-k" -> "10-K"
+    text = re.sub(r"\b(10|8|20)\s?-?\s?([kqf])\b", lambda m: f"{m.group(1)}-{m.group(2).upper()}", text, flags=re.IGNORECASE)
+
+    # "FY23", "fy 2023", "fiscal '23" -> "fiscal year 2023"
+    text = re.sub(r"\b(?:FY|fiscal(?:\s+year)?)\s?'?((?:19|20)\d{2})\b", r"fiscal year \1", text, flags=re.IGNORECASE)
+    text = re.sub(r"\b(?:FY|fiscal(?:\s+year)?)\s?'?(\d{2})\b", lambda m: f"fiscal year 20{m.group(1)}", text, flags=re.IGNORECASE)
+
+    # "q3" -> "Q3"
+    text = re.sub(r"\bq([1-4])\b", r"Q\1", text, flags=re.IGNORECASE)
+
+    # Lower-case tickers -> upper-case; company names get their ticker appended once
+    text = re.sub(r"\b[a-z]{2,5}\b", lambda m: m.group(0).upper() if m.group(0).upper() in KNOWN_TICKERS and m.group(0) not in COMPANY_TICKERS else m.group(0), text)
+    for name, ticker in COMPANY_TICKERS.items():
+        if ticker not in text:
+            text = re.sub(rf"\b({name}(?:'s)?)(?!\w)", rf"\1 ({ticker})", text, count=1, flags=re.IGNORECASE)
+
+    return text
 
-    llm = Ollama(model="phi4-mini", base_url="http://localhost:11434")
+def is_ambiguous(question: str) -> bool:
+    """True when rules alone are unlikely to produce a good retrieval query."""
+    words = WORD_RE.findall(question)
+    entities = extract_entities(question)
+    has_anchor = bool(entities["company"] or entities["years"] or entities["form_type"])
 
-    # Assume latest HumanMessage is the user input
-    question = messages[-1].content
+    if len(words) < 4:
+        return True
+    if PRONOUN_RE.search(question) and not entities["company"]:
+        return True
+    return not has_anchor and len(words) < 8
 
-    prompt = f"Rewrite this user question to be more precise and suitable for document retrieval and keep dates or year as it is:\n\n{question}"
-    response = llm.invoke(prompt)
+def _cache_key(mode: str, question: str) -> str:
+    return f"{mode}:{' '.join(question.lower().split())}"
 
-    print(f"[Agent] Rewritten: {response}")
+class QuestionRewriter:
+    def __init__(self, mode: str = config.REWRITE_MODE, llm=None, cache_size: int = config.REWRITE_CACHE_SIZE):
+        if mode not in REWRITE_MODES:
+            raise ValueError(f"Unknown rewrite mode '{mode}', expected one of {REWRITE_MODES}")
+        self.mode = mode
+        self.llm = llm
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {"off": 0, "heuristic": 0, "llm": 0, "cache": 0}
+        self.llm_seconds = 0.0
 
-    return [AIMessage(content=response)]
\ No newline at end of file
+    def _get_llm(self):
+        if self.llm is None:
+            self.llm = get_llm(config.OLLAMA_MODEL)
+        return self.llm
+
+    def _count(self, path: str, llm_seconds: float = 0.0):
+        with self._lock:
+            self.counts[path] += 1
+            self.llm_seconds += llm_seconds
+
+    def rewrite(self, question: str) -> str:
+        if self.mode == "off":
+            self._count("off")
+            return question
+
+        key = _cache_key(self.mode, question)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.counts["cache"] += 1
+                record_cache("rewrite", True)
+                return self._cache[key]
+        record_cache("rewrite", False)
+
+        normalized = normalize_question(question)
+        if self.mode == "llm" and is_ambiguous(normalized):
+            start = time.perf_counter()
+            rewritten = self._get_llm().invoke(REWRITE_PROMPT.format(question=normalized)).strip() or normalized
+            self._count("llm", time.perf_counter() - start)
+        else:
+            rewritten = normalized
+            self._count("heuristic")
+
+        with self._lock:
+            self._cache[key] = rewritten
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return rewritten
+
+    def __call__(self, messages: list):
+        logger.debug("Rewriting question (mode=%s)", self.mode)
+
+        # Assume latest HumanMessage is the user input
+        question = messages[-1].content
+        rewritten = self.rewrite(question)
+
+        logger.debug("Rewritten: %s", rewritten)
+        return [AIMessage(content=rewritten)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+            llm_calls = counts["llm"]
+            avg_llm_ms = (self.llm_seconds / llm_calls * 1000) if llm_calls else None
+        skipped = counts["heuristic"] + counts["cache"] + counts["off"]
+        return {
+            "mode": self.mode,
+            "paths": counts,
+            "avg_llm_rewrite_ms": round(avg_llm_ms, 1) if avg_llm_ms is not None else None,
+            # Only estimable once at least one LLM rewrite has been timed
+            "estimated_saved_ms": round(skipped * avg_llm_ms, 1) if avg_llm_ms is not None else None,
+        }
+
+# --- Default LLM rewriter (kept for callers that use the plain node function) ---
+_default_rewriter = None
+
+def rewrite_question(messages: list):
+    global _default_rewriter
+    if _default_rewriter is None:
+        _default_rewriter = QuestionRewriter(mode="llm")
+    return _default_rewriter(messages)
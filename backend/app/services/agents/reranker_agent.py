@@ -0,0 +1,21 @@
+# backend/app/services/agents/reranker_agent.py
+
+from langchain_core.messages import AIMessage
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+def rerank_passages(messages: list, reranker):
+    logger.debug("Reranking retrieved passages")
+
+    retrieved = messages[-1].additional_kwargs
+    retrieval_info = dict(retrieved.get("retrieval", {}))
+    passages = retrieved.get("passages", [])
+
+    kept, info = reranker.rerank(retrieval_info.get("query") or messages[0].content, passages)
+    context = "\n\n".join(passage["text"] for passage in kept)
+
+    logger.debug("Kept %s/%s passages (reranked=%s, %sms)", info["kept"], info["candidates"], info["reranked"], info["elapsed_ms"])
+
+    retrieval_info["rerank"] = info
+    return [AIMessage(content=context, additional_kwargs={"retrieval": retrieval_info, "passages": kept})]
@@ -1,23 +1,68 @@
 # backend/app/services/agents/retriever_agent.py
 
 from langchain_core.messages import AIMessage
+from app.utils.financial_entities import extract_entities
+from app.utils.metadata_filters import filters_from_entities
+from app.utils.log import get_logger
 
-def retrieve_relevant_docs(messages: list, vector_store, graph_nodes):
-    print("[Agent] Retrieving relevant documents...")
+logger = get_logger(__name__)
 
-    # Use rewritten question
+def retrieve_relevant_docs(messages: list, retriever, kg_retriever=None, k=None):
+    logger.debug("Retrieving relevant documents")
+
+    # Use rewritten question; the request may narrow which collections are searched
     query = messages[-1].content
+    collections = messages[0].additional_kwargs.get("collections")
+
+    # Ticker / form type / fiscal period in the question narrow the search before scoring
+    filters = filters_from_entities(extract_entities(query))
 
-    retriever = vector_store.as_retriever(search_kwargs={"k": 5})
+    # Hybrid dense + BM25 search, fused with RRF (see HybridRetriever)
     try:
-        docs = retriever.get_relevant_documents(query)
+        docs, applied_filters = retriever.search(query, k=k, filters=filters, collections=collections)
     except Exception as e:
-        print(f"[Retriever] Error during retrieval: {e}")
-    docs = []
+        logger.warning("Error during retrieval: %s", e)
+        docs, applied_filters = [], {}
+
+    # Components still warming up (or unavailable) are left out and reported
+    names = collections or getattr(retriever, "collections", [])
+    degraded = [name for name in names if name not in applied_filters]
 
-    kg_context = " ".join(graph_nodes)
+    kg_nodes = []
+    if kg_retriever is not None and not getattr(kg_retriever, "ready", True):
+        degraded.append("knowledge_graph")
+    elif kg_retriever is not None:
+        try:
+            kg_nodes = kg_retriever.retrieve(query)
+        except Exception as e:
+            logger.warning("Error during KG retrieval: %s", e)
+
+    kg_context = "\n\n".join(kg_nodes)
     combined_context = "\n\n".join([doc.page_content for doc in docs]) + "\n\n" + kg_context
 
-    print(f"[Agent] Retrieved {len(docs)} docs + KG context")
+    logger.debug("Retrieved %d docs + %d KG nodes", len(docs), len(kg_nodes))
+
+    # Individual passages travel with the message so later nodes (rerank) can reorder them
+    passages = [
+        {
+            "text": doc.page_content,
+            "kind": "chunk",
+            "source": doc.metadata.get("source"),
+            "collection": doc.metadata.get("collection"),
+            "company": doc.metadata.get("company"),
+            "score": doc.metadata.get("score"),
+        }
+        for doc in docs
+    ] + [{"text": text, "kind": "kg"} for text in kg_nodes]
 
-    return [AIMessage(content=combined_context)]
\ No newline at end of file
+    retrieval_info = {
+        "query": query,
+        "num_docs": len(docs),
+        "num_kg_nodes": len(kg_nodes),
+        "filters": applied_filters,
+        "sources": [doc.metadata.get("source") for doc in docs if doc.metadata.get("source")],
+        "collections": sorted({doc.metadata["collection"] for doc in docs if doc.metadata.get("collection")}),
+    }
+    if degraded:
+        retrieval_info["degraded"] = degraded
+    return [AIMessage(content=combined_context, additional_kwargs={"retrieval": retrieval_info, "passages": passages})]
@@ -0,0 +1,153 @@
+# backend/app/services/answer_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app import config
+from app.services.agents.question_rewriter_agent import normalize_question
+from app.utils.financial_entities import extract_entities
+from app.utils.ingestion_ledger import get_ledger
+from app.utils.vector_store import get_embeddings
+from app.utils.tracing import record_cache
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+def cacheable(retrieval: Optional[Dict], readiness=None) -> bool:
+    """
+    Only answers built with every component up are worth caching: one given while a
+    collection was warming or timed out, or the KG wasn't connected, would be served
+    for the whole TTL after they recover. `readiness` is the startup ComponentLoader.
+    """
+    if (retrieval or {}).get("degraded"):
+        return False
+    return readiness is None or readiness.status()["status"] == "ready"
+
+def cache_question(question: str) -> str:
+    return normalize_question(question).lower().rstrip("?!. ")
+
+def _entity_signature(question: str) -> Tuple:
+    # "Meta 2023 revenue" and "Meta 2022 revenue" embed almost identically; never let one answer the other
+    entities = extract_entities(question)
+    return (entities["company"], entities["form_type"], tuple(entities["years"]), entities["quarter"])
+
+class AnswerCache:
+    """
+    Two-tier answer cache. The exact tier is keyed by normalized question and
+    the searched collections. The semantic tier reuses an answer when a new
+    question's embedding is within `similarity` (cosine) of a cached one that
+    names the same company / filing / period. Entries expire after `ttl`
+    seconds, the least recently used go first past `max_entries`, and an entry
+    is dropped as soon as any of its collections' ingestion ledger version moves.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = config.ANSWER_CACHE_SIZE,
+        ttl: int = config.ANSWER_CACHE_TTL_S,
+        similarity: float = config.ANSWER_CACHE_SIMILARITY,
+        embeddings=None,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.embeddings = embeddings
+        self._entries: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "invalidated": 0, "saved_seconds": 0.0}
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        try:
+            vector = np.asarray((self.embeddings or get_embeddings()).embed_query(question), dtype="float32")
+        except Exception as e:
+            logger.warning("Could not embed question, exact tier only: %s", e)
+            return None
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    @staticmethod
+    def _versions(collections: List[str]) -> Tuple:
+        return tuple(get_ledger(name).version for name in collections)
+
+    def _live(self, key: Tuple, entry: Dict, versions: Tuple, now: float) -> bool:
+        if now - entry["created"] > self.ttl or entry["versions"] != versions:
+            del self._entries[key]
+            self._stats["invalidated"] += 1
+            return False
+        return True
+
+    def get(self, question: str, collections: List[str]) -> Optional[Dict]:
+        """Returns {"answer", "tier", "similarity"} on a hit, else None."""
+        hit = self._lookup(question, collections)
+        record_cache(f"answer_{self.name}", hit is not None)
+        return hit
+
+    def _lookup(self, question: str, collections: List[str]) -> Optional[Dict]:
+        scope = tuple(sorted(collections))
+        versions = self._versions(list(scope))
+        key = (scope, cache_question(question))
+        now = time.time()
+
+        with self._lock:
+            self._stats["lookups"] += 1
+            entry = self._entries.get(key)
+            if entry is not None and self._live(key, entry, versions, now):
+                self._entries.move_to_end(key)
+                self._stats["exact_hits"] += 1
+                self._stats["saved_seconds"] += entry["elapsed"]
+                return {"answer": entry["answer"], "tier": "exact", "similarity": 1.0}
+
+        vector = self._embed(question)
+        if vector is None:
+            return None
+        signature = _entity_signature(question)
+
+        with self._lock:
+            best_key, best_score = None, self.similarity
+            for other_key, other in list(self._entries.items()):
+                if other_key[0] != scope or other["signature"] != signature or other["vector"] is None:
+                    continue
+                if not self._live(other_key, other, versions, now):
+                    continue
+                score = float(np.dot(vector, other["vector"]))
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+            if best_key is None:
+                return None
+            entry = self._entries[best_key]
+            self._entries.move_to_end(best_key)
+            self._stats["semantic_hits"] += 1
+            self._stats["saved_seconds"] += entry["elapsed"]
+            return {"answer": entry["answer"], "tier": "semantic", "similarity": round(best_score, 4)}
+
+    def put(self, question: str, collections: List[str], answer, elapsed: float):
+        scope = tuple(sorted(collections))
+        entry = {
+            "answer": answer,
+            "elapsed": elapsed,
+            "created": time.time(),
+            "versions": self._versions(list(scope)),
+            "signature": _entity_signature(question),
+            "vector": self._embed(question),
+        }
+        with self._lock:
+            key = (scope, cache_question(question))
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        stats["hit_rate"] = round(hits / stats["lookups"], 3) if stats["lookups"] else 0.0
+        stats["saved_seconds"] = round(stats["saved_seconds"], 2)
+        return stats
@@ -0,0 +1,135 @@
+# backend/app/services/context_builder.py
+
+import hashlib
+import re
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app import config
+from app.utils.token_budget import estimate_tokens, truncate_to_tokens
+
+WORD_RE = re.compile(r"\w+")
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+MERSENNE_PRIME = (1 << 61) - 1
+OVERLAP_ANCHOR = 40
+
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+def context_budget(model_name: str) -> int:
+    return config.CONTEXT_TOKEN_BUDGETS.get(model_name, config.DEFAULT_CONTEXT_TOKEN_BUDGET)
+
+# --- MinHash over word shingles: near-duplicate detection in O(passages × permutations) ---
+def minhash_signature(text: str) -> np.ndarray:
+    words = WORD_RE.findall(text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") >> 4 for s in shingles],
+        dtype=np.uint64,
+    )
+    # (a·x + b) mod p per permutation; uint64 arithmetic wraps, which is fine for hashing
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % np.uint64(MERSENNE_PRIME)
+    return permuted.min(axis=0)
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+# --- Chunk overlap: strip the prefix a passage shares with the end of one already kept ---
+def strip_overlap(previous: str, text: str, max_overlap: int = config.CONTEXT_MAX_OVERLAP) -> str:
+    anchor = text[:OVERLAP_ANCHOR]
+    if len(anchor) < OVERLAP_ANCHOR:
+        return text
+    window_start = max(0, len(previous) - max_overlap)
+    position = previous.find(anchor, window_start)
+    while position != -1:
+        if text.startswith(previous[position:]):
+            return text[len(previous) - position:].lstrip()
+        position = previous.find(anchor, position + 1)
+    return text
+
+class ContextBuilder:
+    """
+    Turns ranked passages into the prompt context: near-duplicates (MinHash
+    estimate over word shingles) are dropped, the CHUNK_OVERLAP text that
+    adjacent chunks of one source share is cut, passages are ordered by
+    score and the result is truncated to the model's token budget. Token
+    counts before and after are kept per request and in aggregate.
+    """
+
+    def __init__(self, model_name: str = config.OLLAMA_MODEL, dedup_threshold: float = config.CONTEXT_DEDUP_THRESHOLD):
+        self.model_name = model_name
+        self.token_budget = context_budget(model_name)
+        self.dedup_threshold = dedup_threshold
+        self._lock = threading.Lock()
+        self._totals = {"requests": 0, "tokens_before": 0, "tokens_after": 0, "prompt_tokens": 0, "duplicates_removed": 0}
+
+    @staticmethod
+    def _order(passages: List[Dict]) -> List[Dict]:
+        # Reranker scores cover every passage; otherwise scored chunks go first, KG nodes keep their order after
+        if passages and all("rerank_score" in p for p in passages):
+            return sorted(passages, key=lambda p: p["rerank_score"], reverse=True)
+        return sorted(passages, key=lambda p: (p.get("score") is not None, p.get("score") or 0.0), reverse=True)
+
+    def build(self, passages: List[Dict]) -> Tuple[List[Dict], Dict]:
+        tokens_before = sum(estimate_tokens(p["text"]) for p in passages)
+
+        kept, signatures, duplicates = [], [], 0
+        for passage in self._order(passages):
+            text = passage["text"].strip()
+            for previous in kept:
+                if previous.get("source") and previous.get("source") == passage.get("source"):
+                    text = strip_overlap(previous["text"], text)
+            if not text:
+                duplicates += 1
+                continue
+
+            signature = minhash_signature(text)
+            if any(estimated_jaccard(signature, other) >= self.dedup_threshold for other in signatures):
+                duplicates += 1
+                continue
+            signatures.append(signature)
+            kept.append({**passage, "text": text})
+
+        budgeted, used = [], 0
+        for passage in kept:
+            remaining = self.token_budget - used
+            if remaining <= 0:
+                break
+            text = passage["text"]
+            if estimate_tokens(text) > remaining:
+                text = truncate_to_tokens(text, remaining)
+            if text:
+                budgeted.append({**passage, "text": text})
+                used += estimate_tokens(text)
+
+        info = {
+            "passages_in": len(passages),
+            "passages_kept": len(budgeted),
+            "duplicates_removed": duplicates,
+            "tokens_before": tokens_before,
+            "tokens_after": used,
+            "token_budget": self.token_budget,
+        }
+        return budgeted, info
+
+    def record(self, info: Dict, prompt_tokens: int):
+        with self._lock:
+            self._totals["requests"] += 1
+            self._totals["tokens_before"] += info["tokens_before"]
+            self._totals["tokens_after"] += info["tokens_after"]
+            self._totals["prompt_tokens"] += prompt_tokens
+            self._totals["duplicates_removed"] += info["duplicates_removed"]
+
+    def stats(self):
+        with self._lock:
+            totals = dict(self._totals)
+        requests = totals["requests"] or 1
+        return {
+            **totals,
+            "avg_prompt_tokens": round(totals["prompt_tokens"] / requests, 1),
+            "avg_tokens_saved": round((totals["tokens_before"] - totals["tokens_after"]) / requests, 1),
+        }
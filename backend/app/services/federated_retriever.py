@@ -0,0 +1,148 @@
+# backend/app/services/federated_retriever.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app import config
+from app.services.hybrid_retriever import HybridRetriever
+from app.utils.vector_store import load_vector_store
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# --- One hybrid retriever per collection, shared by every pipeline in the process ---
+_retrievers: Dict[str, HybridRetriever] = {}
+_load_locks: Dict[str, threading.Lock] = {}
+_retrievers_lock = threading.Lock()
+
+def _load_lock(collection_name: str) -> threading.Lock:
+    with _retrievers_lock:
+        return _load_locks.setdefault(collection_name, threading.Lock())
+
+def get_collection_retriever(collection_name: str) -> HybridRetriever:
+    retriever = _retrievers.get(collection_name)
+    if retriever is not None:
+        return retriever
+    # Per-collection lock: collections load in parallel, each one only once
+    with _load_lock(collection_name):
+        if collection_name not in _retrievers:
+            vector_store = load_vector_store(collection_name=collection_name)
+            _retrievers[collection_name] = HybridRetriever(vector_store, collection_name=collection_name)
+        return _retrievers[collection_name]
+
+def register_collection_retriever(collection_name: str, retriever: HybridRetriever):
+    """Serve `collection_name` from an already-built retriever (e.g. an in-memory benchmark index)."""
+    with _load_lock(collection_name):
+        _retrievers[collection_name] = retriever
+
+def collection_loading(collection_name: str) -> bool:
+    lock = _load_locks.get(collection_name)
+    return collection_name not in _retrievers and lock is not None and lock.locked()
+
+class FederatedRetriever:
+    """
+    Fans a query out to several collections at once and merges the results.
+    Each collection's fused scores are divided by its best score, so every
+    collection's top hit lands at 1.0 and no namespace dominates just because
+    its raw scores run higher. A collection that misses its latency budget (or
+    fails, or is still loading) is left out of that answer instead of holding
+    up the request. Collections load on first use unless something (see
+    `loaders`) loads them ahead of time.
+    """
+
+    def __init__(
+        self,
+        collections: List[str] = None,
+        k: int = config.RETRIEVAL_TOP_K,
+        timeout_ms: int = config.COLLECTION_TIMEOUT_MS,
+    ):
+        self.collections = list(collections or config.SEARCH_COLLECTIONS)
+        self.k = k
+        self.timeout = timeout_ms / 1000
+        # Room for slow searches that outlive their budget without blocking new requests
+        self._pool = ThreadPoolExecutor(max_workers=4 * len(self.collections) + 4, thread_name_prefix="federated")
+        self._stats_lock = threading.Lock()
+        self._stats = {name: {"queries": 0, "timeouts": 0, "errors": 0, "warming": 0, "total_ms": 0.0} for name in self.collections}
+        logger.debug("Searching %s (budget %sms per collection)", self.collections, timeout_ms)
+
+    def loaders(self) -> Dict:
+        """{component name: loader} for loading every collection in the background at startup."""
+        return {f"collection:{name}": (lambda name=name: get_collection_retriever(name)) for name in self.collections}
+
+    def _record(self, name: str, outcome: str = None, elapsed_ms: float = 0.0):
+        with self._stats_lock:
+            stats = self._stats.setdefault(name, {"queries": 0, "timeouts": 0, "errors": 0, "warming": 0, "total_ms": 0.0})
+            stats["queries"] += 1
+            stats["total_ms"] += elapsed_ms
+            if outcome:
+                stats[outcome] += 1
+
+    def _search_one(self, name: str, query: str, k: int, filters):
+        start = time.perf_counter()
+        docs, applied = get_collection_retriever(name).search(query, k=k, filters=filters)
+        return docs, applied, (time.perf_counter() - start) * 1000
+
+    def retrieve(self, query: str, k: int = None, filters=None, collections: Optional[List[str]] = None) -> List[Document]:
+        return self.search(query, k=k, filters=filters, collections=collections)[0]
+
+    def search(self, query: str, k: int = None, filters=None, collections: Optional[List[str]] = None) -> Tuple[List[Document], Dict]:
+        """Returns (merged top-k documents, {collection: filters applied there})."""
+        k = k or self.k
+        names = list(collections or self.collections)
+
+        # Collections still loading in the background sit this query out
+        warming = [name for name in names if collection_loading(name)]
+        for name in warming:
+            self._record(name, "warming")
+        if warming:
+            logger.info("%s still loading, answering without them", warming)
+        names = [name for name in names if name not in warming]
+
+        futures = {self._pool.submit(self._search_one, name, query, k, filters): name for name in names}
+        done, pending = wait(futures, timeout=self.timeout)
+
+        for future in pending:
+            name = futures[future]
+            self._record(name, "timeouts", self.timeout * 1000)
+            logger.warning("'%s' exceeded %.0fms, answering without it", name, self.timeout * 1000)
+
+        scored, applied_filters = [], {}
+        for future in done:
+            name = futures[future]
+            try:
+                docs, applied, elapsed_ms = future.result()
+            except Exception as e:
+                self._record(name, "errors")
+                logger.warning("Search in '%s' failed: %s", name, e)
+                continue
+            self._record(name, elapsed_ms=elapsed_ms)
+            applied_filters[name] = applied
+
+            best = max((doc.metadata.get("score", 0.0) for doc in docs), default=0.0) or 1.0
+            for doc in docs:
+                raw = doc.metadata.get("score", 0.0)
+                scored.append((raw / best, raw, Document(
+                    id=getattr(doc, "id", None),
+                    page_content=doc.page_content,
+                    metadata={**doc.metadata, "collection": name, "score": round(raw / best, 6)},
+                )))
+
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [doc for _, _, doc in scored[:k]], applied_filters
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                name: {
+                    "queries": s["queries"],
+                    "timeouts": s["timeouts"],
+                    "errors": s["errors"],
+                    "warming": s["warming"],
+                    "avg_ms": round(s["total_ms"] / s["queries"], 2) if s["queries"] else 0.0,
+                }
+                for name, s in self._stats.items()
+            }
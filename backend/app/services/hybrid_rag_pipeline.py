@@ -1,56 +1,262 @@
-# backend/app/services/hybrid_rag_agent_pipeline.py
+# backend/app/services/hybrid_rag_pipeline.py
+
+import time
 
 from langgraph.graph import END, MessageGraph
 from langchain_core.messages import HumanMessage, AIMessage
-from app.utils.vector_store import load_vector_store
-from app.utils.graph_loader import load_knowledge_graph
-from langchain_ollama import OllamaLLM as Ollama
-from app.services.agents.question_rewriter_agent import rewrite_question
+from app.services.kg_retriever import KnowledgeGraphRetriever
+from app.services.federated_retriever import FederatedRetriever
+from app.services.model_registry import get_llm
+from app.services.agents.question_rewriter_agent import QuestionRewriter
 from app.services.agents.retriever_agent import retrieve_relevant_docs
-from app.services.agents.answer_generator_agent import generate_answer
-from app.services.agents.postprocessing_agent import postprocess_answer
+from app.services.agents.reranker_agent import rerank_passages
+from app.services.agents.context_builder_agent import build_context
+from app.services.reranker import CrossEncoderReranker
+from app.services.context_builder import ContextBuilder
+from app.services.answer_cache import AnswerCache, cacheable
+from app import config
+from app.services.agents.answer_generator_agent import build_answer_prompt, generate_answer, stream_answer
+from app.services.agents.postprocessing_agent import postprocess_answer, StreamingPostprocessor
+from app.utils.log import get_logger
+from app.utils.token_budget import estimate_tokens
+from app.utils.tracing import get_trace, start_trace
+
+logger = get_logger(__name__)
+
+# --- What each stage reports on its span (token counts, docs retrieved, ...) ---
+def stage_attributes(stage: str, messages: list, result: list) -> dict:
+    kwargs = result[-1].additional_kwargs if result else {}
+    retrieval = kwargs.get("retrieval", {})
+    if stage == "retrieve_docs":
+        return {
+            "docs": retrieval.get("num_docs"),
+            "kg_nodes": retrieval.get("num_kg_nodes"),
+            "degraded": ",".join(retrieval.get("degraded", [])) or None,
+        }
+    if stage == "rerank":
+        rerank = retrieval.get("rerank", {})
+        return {"kept": rerank.get("kept"), "reranked": rerank.get("reranked")}
+    if stage == "build_context":
+        context = retrieval.get("context", {})
+        return {"context_tokens": context.get("tokens_after"), "duplicates": context.get("duplicates_removed")}
+    if stage == "generate_answer":
+        if "program" in kwargs:
+            return {"solver": kwargs["program"]["operation"]}
+        return {
+            "prompt_tokens": estimate_tokens(build_answer_prompt(messages)),
+            "completion_tokens": estimate_tokens(result[-1].content) if result else 0,
+        }
+    return {}
 
 class HybridRAGAgentPipeline:
-    def __init__(self, collection_name="default"):
+    def __init__(self, collections=None):
         print("[HybridRAG] Initializing LangGraph Hybrid RAG Pipeline...")
 
-        # Load Vector Store
-        self.vector_store = load_vector_store(collection_name=collection_name)
+        # Dense + BM25 retrieval, fanned out across collections (default, finqa, tatqa, sec_summaries)
+        self.retriever = FederatedRetriever(collections)
 
-        # Load KG
-        self.graph_nodes = load_knowledge_graph()
+        # KG retriever (top-k full-text matches per question, token-budgeted); connects in `loaders`
+        self.kg_retriever = KnowledgeGraphRetriever()
 
-        # LLM
-        self.llm = Ollama(model="phi4-mini", base_url="http://localhost:11434")
+        # LLM (shared per-process client, model kept loaded between requests)
+        self.llm = get_llm(config.OLLAMA_MODEL)
         print("[HybridRAG] LLM ready ✅")
 
+        # Cross-encoder reranking over a larger candidate pool (optional, latency-budgeted; model loads in `loaders`)
+        self.reranker = CrossEncoderReranker() if config.RERANK_ENABLED else None
+
+        # Deduplicated, token-budgeted prompt context sized for the configured model
+        self.context_builder = ContextBuilder(model_name=config.OLLAMA_MODEL)
+
+        # Question rewriter (shares the pipeline's LLM client)
+        self.rewriter = QuestionRewriter(llm=self.llm)
+
+        # Repeated / near-duplicate questions skip the whole graph
+        self.answer_cache = AnswerCache("hybrid_rag") if config.ANSWER_CACHE_ENABLED else None
+        # Startup ComponentLoader (set by the API); answers aren't cached until it reports ready
+        self.readiness = None
+
+        # Graph nodes, each wrapped in a timing span (shared by the graph and the streaming path)
+        self.nodes = {
+            "rewrite_question": self._traced("rewrite_question", self.rewriter),
+            "retrieve_docs": self._traced("retrieve_docs", self.retrieve),
+            "rerank": self._traced("rerank", self.rerank),
+            "build_context": self._traced("build_context", self.build_context),
+            "generate_answer": self._traced("generate_answer", lambda x: generate_answer(x, self.llm)),
+            "postprocess": self._traced("postprocess", postprocess_answer),
+        }
+
         # Build LangGraph
         self.graph = self.build_graph()
 
+    def loaders(self):
+        """{component name: loader} for the slow parts, run in the background at startup."""
+        loaders = {**self.retriever.loaders(), "knowledge_graph": self.kg_retriever.connect}
+        if self.reranker:
+            loaders["reranker"] = self.reranker.load
+        return loaders
+
+    def retrieve(self, messages):
+        k = config.RERANK_CANDIDATES if self.reranker else None
+        # Until Neo4j is reachable, answer from the vector collections alone
+        return retrieve_relevant_docs(messages, self.retriever, self.kg_retriever, k=k)
+
+    def rerank(self, messages):
+        return rerank_passages(messages, self.reranker)
+
+    def build_context(self, messages):
+        return build_context(messages, self.context_builder)
+
+    def _traced(self, stage: str, node):
+        # The request's trace is found through the request ID carried on the question message
+        def traced_node(messages):
+            trace = get_trace(messages[0].additional_kwargs.get("request_id"), "hybrid_rag")
+            with trace.span(stage) as span:
+                result = node(messages)
+                span.update(stage_attributes(stage, messages, result))
+            return result
+        return traced_node
+
     def build_graph(self):
         graph = MessageGraph()
 
         # Define flow
-        graph.add_node("rewrite_question", rewrite_question)
-        graph.add_node("retrieve_docs", lambda x: retrieve_relevant_docs(x, self.vector_store, self.graph_nodes))
-        graph.add_node("generate_answer", lambda x: generate_answer(x, self.llm))
-        graph.add_node("postprocess", postprocess_answer)
+        graph.add_node("rewrite_question", self.nodes["rewrite_question"])
+        graph.add_node("retrieve_docs", self.nodes["retrieve_docs"])
+        graph.add_node("build_context", self.nodes["build_context"])
+        graph.add_node("generate_answer", self.nodes["generate_answer"])
+        graph.add_node("postprocess", self.nodes["postprocess"])
 
         # Edges
         graph.set_entry_point("rewrite_question")
         graph.add_edge("rewrite_question", "retrieve_docs")
-        graph.add_edge("retrieve_docs", "generate_answer")
+        if self.reranker:
+            graph.add_node("rerank", self.nodes["rerank"])
+            graph.add_edge("retrieve_docs", "rerank")
+            graph.add_edge("rerank", "build_context")
+        else:
+            graph.add_edge("retrieve_docs", "build_context")
+        graph.add_edge("build_context", "generate_answer")
         graph.add_edge("generate_answer", "postprocess")
         graph.add_edge("postprocess", END)
 
         return graph.compile()
 
-    def run(self, question: str):
-        print(f"[HybridRAG] Running LangGraph pipeline for: {question}")
+    def _question_message(self, question: str, collections=None, request_id: str = None):
+        kwargs = {"request_id": request_id} if request_id else {}
+        if collections:
+            kwargs["collections"] = collections
+        return HumanMessage(content=question, additional_kwargs=kwargs)
+
+    def _cached(self, question: str, collections=None):
+        if not self.answer_cache:
+            return None
+        cached = self.answer_cache.get(question, collections or self.retriever.collections)
+        if cached:
+            logger.info("Answer cache hit (%s, similarity=%s)", cached["tier"], cached["similarity"])
+        return cached
+
+    def _remember(self, question: str, collections, answer: str, started: float, retrieval: dict):
+        if not self.answer_cache:
+            return
+        if not cacheable(retrieval, self.readiness):
+            logger.info("Retrieval degraded (%s), not caching the answer", retrieval.get("degraded") or "components loading")
+            return
+        self.answer_cache.put(question, collections or self.retriever.collections, answer, time.perf_counter() - started)
+
+    def run(self, question: str, collections=None):
+        trace = start_trace("hybrid_rag")
+        logger.info("Running LangGraph pipeline request_id=%s question=%r", trace.request_id, question)
+
+        status = "error"
+        try:
+            cached = self._cached(question, collections)
+            if cached:
+                status = "cached"
+                return cached["answer"]
+
+            started = time.perf_counter()
+            response = self.graph.invoke([self._question_message(question, collections, trace.request_id)])
+
+            final_answer = response[-1].content if isinstance(response[-1], AIMessage) else str(response)
+            logger.debug("Final answer request_id=%s: %s", trace.request_id, final_answer)
+
+            retrieval = next((m.additional_kwargs["retrieval"] for m in reversed(response) if "retrieval" in m.additional_kwargs), {})
+            self._remember(question, collections, final_answer, started, retrieval)
+            status = "ok"
+            return final_answer
+        finally:
+            trace.finish(status)
+
+    def stream(self, question: str, collections=None):
+        """
+        Same flow as the LangGraph run, but yields events as they become available:
+        retrieval metadata first, then post-processed answer tokens, then the final answer.
+        """
+        trace = start_trace("hybrid_rag_stream")
+        logger.info("Streaming pipeline request_id=%s question=%r", trace.request_id, question)
+
+        status = "error"
+        try:
+            cached = self._cached(question, collections)
+            if cached:
+                status = "cached"
+                yield {"event": "metadata", "question": question, "request_id": trace.request_id,
+                       "cached": cached["tier"], "similarity": cached["similarity"]}
+                yield {"event": "token", "content": cached["answer"]}
+                yield {"event": "done", "answer": cached["answer"]}
+                return
+
+            started = time.perf_counter()
+            messages = [self._question_message(question, collections, trace.request_id)]
+            messages += self.nodes["rewrite_question"](messages)
+            messages += self.nodes["retrieve_docs"](messages)
+            if self.reranker:
+                messages += self.nodes["rerank"](messages)
+            messages += self.nodes["build_context"](messages)
+
+            yield {
+                "event": "metadata",
+                "question": question,
+                "request_id": trace.request_id,
+                "rewritten_question": messages[1].content,
+                **messages[-1].additional_kwargs.get("retrieval", {}),
+            }
+
+            postprocessor = StreamingPostprocessor()
+            parts = []
+            with trace.span("generate_answer") as span:
+                for token in stream_answer(messages, self.llm):
+                    text = postprocessor.feed(token)
+                    if text:
+                        parts.append(text)
+                        yield {"event": "token", "content": text}
+                span["prompt_tokens"] = estimate_tokens(build_answer_prompt(messages))
+                span["completion_tokens"] = estimate_tokens("".join(parts))
+
+            footer = postprocessor.finish()
+            parts.append(footer)
+            yield {"event": "token", "content": footer}
 
-        response = self.graph.invoke([HumanMessage(content=question)])
-        
-        final_answer = response[-1].content if isinstance(response[-1], AIMessage) else str(response)
-        print(f"[HybridRAG] Final Answer: {final_answer}")
+            final_answer = "".join(parts)
+            logger.debug("Final answer request_id=%s: %s", trace.request_id, final_answer)
+            self._remember(question, collections, final_answer, started, messages[-1].additional_kwargs.get("retrieval", {}))
+            status = "ok"
+            yield {"event": "done", "answer": final_answer}
+        except GeneratorExit:
+            status = "cancelled"
+            raise
+        finally:
+            trace.finish(status)
 
-        return final_answer
\ No newline at end of file
+    def stats(self):
+        stats = {
+            "rewrite": self.rewriter.stats(),
+            "collections": self.retriever.stats(),
+            "context": self.context_builder.stats(),
+        }
+        if self.reranker:
+            stats["rerank"] = self.reranker.stats()
+        if self.answer_cache:
+            stats["answer_cache"] = self.answer_cache.stats()
+        return stats
\ No newline at end of file
@@ -0,0 +1,128 @@
+# backend/app/services/hybrid_retriever.py
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from app import config
+from app.utils.bm25_index import get_sparse_index
+from app.utils.ingestion_ledger import make_chunk_id
+from app.utils.metadata_filters import relaxations
+from app.utils.vector_store import dense_search, fetch_documents
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# --- Reciprocal rank fusion over ranked ID lists ---
+def reciprocal_rank_fusion(rankings: Dict[str, List[str]], weights: Dict[str, float], rrf_k: int = config.RRF_K) -> Dict[str, float]:
+    scores = {}
+    for name, ranked_ids in rankings.items():
+        weight = weights.get(name, 1.0)
+        for rank, chunk_id in enumerate(ranked_ids, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + weight / (rrf_k + rank)
+    return scores
+
+class HybridRetriever:
+    """
+    Dense (vector store) and sparse (BM25) search run side by side over the
+    same chunk IDs; results are fused with weighted RRF. A weight of 0 turns
+    that side off. Metadata filters (see metadata_filters) narrow both sides
+    before scoring; when nothing matches, the most specific constraint is
+    dropped and the search retried.
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        collection_name: str = "default",
+        k: int = config.RETRIEVAL_TOP_K,
+        candidates: int = config.RETRIEVAL_CANDIDATES,
+        dense_weight: float = config.HYBRID_DENSE_WEIGHT,
+        sparse_weight: float = config.HYBRID_SPARSE_WEIGHT,
+        rrf_k: int = config.RRF_K,
+        sparse_index=None,
+    ):
+        self.vector_store = vector_store
+        self.collection_name = collection_name
+        self.k = k
+        self.candidates = max(candidates, k)
+        self.weights = {"dense": dense_weight, "sparse": sparse_weight}
+        self.rrf_k = rrf_k
+        self.sparse_index = sparse_index if sparse_index is not None else get_sparse_index(collection_name)
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid-retriever")
+        logger.debug("Hybrid retriever ready (k=%s, dense=%s, sparse=%s, rrf_k=%s)", k, dense_weight, sparse_weight, rrf_k)
+
+    def _chunk_id(self, doc: Document) -> str:
+        return getattr(doc, "id", None) or make_chunk_id(self.collection_name, doc.metadata.get("source", "unknown"), doc.page_content)
+
+    def _dense(self, query: str, pool: int, filters, allowed):
+        if not self.weights["dense"]:
+            return []
+        return dense_search(self.vector_store, query, pool, filters=filters, allowed_ids=allowed)
+
+    def _sparse(self, query: str, pool: int, allowed):
+        if not self.weights["sparse"]:
+            return []
+        return self.sparse_index.search(query, k=pool, allowed=allowed)
+
+    def retrieve(self, query: str, k: int = None, filters: Optional[Dict[str, List]] = None) -> List[Document]:
+        return self.search(query, k=k, filters=filters)[0]
+
+    def search(self, query: str, k: int = None, filters: Optional[Dict[str, List]] = None) -> Tuple[List[Document], Dict]:
+        """Returns (documents, the filters that were actually applied)."""
+        k = k or self.k
+        for applied in relaxations(filters or {}):
+            allowed = self.sparse_index.matching_ids(applied)
+            if allowed is not None and not allowed and len(self.sparse_index):
+                continue
+            # A collection without an indexed sparse side can't pre-count matches; just try it
+            docs = self._fused(query, k, applied, allowed or None)
+            if docs or not applied:
+                return docs, applied
+        return [], {}
+
+    def _fused(self, query: str, k: int, filters: Dict, allowed: Optional[Set[str]]) -> List[Document]:
+        # A caller asking for more than the default pool (the reranker's candidates) widens both sides
+        pool = max(self.candidates, k)
+        dense_future = self._pool.submit(self._dense, query, pool, filters, allowed)
+        sparse_future = self._pool.submit(self._sparse, query, pool, allowed)
+
+        # One side failing shouldn't take retrieval down with it
+        try:
+            dense_docs = dense_future.result()
+        except Exception as e:
+            logger.warning("Dense search failed: %s", e)
+            dense_docs = []
+        try:
+            sparse_hits = sparse_future.result()
+        except Exception as e:
+            logger.warning("Sparse search failed: %s", e)
+            sparse_hits = []
+
+        documents = {}
+        for doc in dense_docs:
+            documents.setdefault(self._chunk_id(doc), doc)
+        rankings = {
+            "dense": list(documents),
+            "sparse": [chunk_id for chunk_id, _ in sparse_hits],
+        }
+
+        scores = reciprocal_rank_fusion(rankings, self.weights, self.rrf_k)
+        top_ids = sorted(scores, key=scores.get, reverse=True)[:k]
+
+        missing = [chunk_id for chunk_id in top_ids if chunk_id not in documents]
+        if missing:
+            documents.update(fetch_documents(self.vector_store, self.collection_name, missing))
+
+        results = []
+        for chunk_id in top_ids:
+            doc = documents.get(chunk_id)
+            if doc is None:
+                continue
+            results.append(Document(
+                id=chunk_id,
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "chunk_id": chunk_id, "score": round(scores[chunk_id], 6)},
+            ))
+        return results
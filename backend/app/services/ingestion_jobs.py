@@ -0,0 +1,193 @@
+# backend/app/services/ingestion_jobs.py
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+from app import config
+from app.utils.document_loader import ingest_document
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+class IngestionJobQueue:
+    """
+    Persistent background queue for uploaded documents. Jobs live in SQLite so
+    `/jobs/{id}` survives restarts, and anything still queued or running when
+    the process stopped is picked up again by `start()`. Re-running a job is
+    safe: the ingestion ledger skips chunks that were already stored.
+
+    A job may own its input file: `file_path` is then a per-job copy that is
+    ingested under `source`, moved to `source` when the job completes and
+    deleted when it fails, so uploads sharing a name never read each other's
+    half-written files.
+    """
+
+    def __init__(self, db_path: str = config.JOBS_DB_PATH, workers: int = config.INGESTION_WORKERS):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                source TEXT,
+                collection TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress TEXT NOT NULL DEFAULT '{}',
+                timings TEXT NOT NULL DEFAULT '{}',
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "source" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN source TEXT")
+        self._conn.commit()
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._threads:
+            return
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+            self._conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            self._conn.commit()
+        for (job_id,) in rows:
+            self._queue.put(job_id)
+        if rows:
+            print(f"[Jobs] Resuming {len(rows)} interrupted ingestion jobs")
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"ingestion-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[Jobs] Ingestion queue started with {self.workers} workers ✅")
+
+    def submit(self, file_path: str, collection_name: str = "default", source: str = None, job_id: str = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, file_path, source, collection, status, stage, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', 'queued', ?, ?)",
+                (job_id, file_path, source, collection_name, now, now),
+            )
+            self._conn.commit()
+        self._queue.put(job_id)
+        print(f"[Jobs] Queued job {job_id} for {file_path}")
+        return job_id
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, file_path, collection, status, stage, progress, timings, error, attempts, created_at, updated_at, source "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "file_path": row[1],
+            "collection": row[2],
+            "status": row[3],
+            "stage": row[4],
+            "progress": json.loads(row[5]),
+            "timings": json.loads(row[6]),
+            "error": row[7],
+            "attempts": row[8],
+            "created_at": row[9],
+            "updated_at": row[10],
+            "source": row[11] or row[1],
+        }
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    # --- Worker ---
+    @staticmethod
+    def _release_input(job, completed: bool):
+        """Publish (on success) or drop a per-job input file once its job is done."""
+        if job["source"] == job["file_path"] or not os.path.exists(job["file_path"]):
+            return
+        if completed:
+            os.replace(job["file_path"], job["source"])
+        else:
+            os.remove(job["file_path"])
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        for key in ("progress", "timings"):
+            if key in fields:
+                fields[key] = json.dumps(fields[key])
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id: str):
+        job = self.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATUSES:
+            return
+
+        started = time.time()
+        timings = {}
+        progress_state = {}
+        current = {"stage": None, "since": started}
+
+        def on_progress(stage, **counters):
+            now = time.time()
+            if stage != current["stage"]:
+                if current["stage"]:
+                    timings[current["stage"]] = round(now - current["since"], 3)
+                current.update(stage=stage, since=now)
+            progress_state.update(counters)
+            self._update(job_id, stage=stage, progress=progress_state, timings=timings)
+
+        self._update(job_id, status="running", attempts=job["attempts"] + 1)
+        print(f"[Jobs] ▶️ Running job {job_id} ({job['file_path']})")
+
+        try:
+            ingest_document(
+                job["file_path"], collection_name=job["collection"], progress=on_progress, source=job["source"],
+            )
+        except Exception as e:
+            if current["stage"]:
+                timings[current["stage"]] = round(time.time() - current["since"], 3)
+            timings["total"] = round(time.time() - started, 3)
+            self._update(job_id, status="failed", error=str(e), timings=timings)
+            self._release_input(job, completed=False)
+            print(f"[Jobs] ❌ Job {job_id} failed: {e}")
+            return
+
+        if current["stage"]:
+            timings[current["stage"]] = round(time.time() - current["since"], 3)
+        timings["total"] = round(time.time() - started, 3)
+        self._update(job_id, status="completed", stage="completed", progress=progress_state, timings=timings)
+        self._release_input(job, completed=True)
+        print(f"[Jobs] ✅ Job {job_id} completed in {timings['total']:.1f}s")
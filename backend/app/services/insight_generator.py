@@ -1,28 +1,127 @@
 # backend/app/services/insight_generator.py
 
-from app.utils.vector_store import load_vector_store
-from langchain_community.llms import Ollama
-from langchain.chains import RetrievalQA
+import time
+from app import config
+from app.utils.financial_entities import extract_entities
+from app.utils.metadata_filters import filters_from_entities
+from app.services.federated_retriever import FederatedRetriever
+from app.services.answer_cache import AnswerCache, cacheable
+from app.services.model_registry import get_llm
+from app.utils.log import get_logger
+from app.utils.token_budget import estimate_tokens
+from app.utils.tracing import start_trace
+from langchain.chains.retrieval_qa.prompt import PROMPT
+
+logger = get_logger(__name__)
 
 class InsightGenerator:
-    def __init__(self, collection_name="default"):
-        print(f"[Insight] Initializing Insight Generator for collection '{collection_name}'...")
-        self.vector_store = load_vector_store(collection_name=collection_name)
-        self.retriever = self.vector_store.as_retriever(search_kwargs={"k": 5})
+    def __init__(self, collections=None):
+        print("[Insight] Initializing Insight Generator...")
+        self.retriever = FederatedRetriever(collections)
+        self.answer_cache = AnswerCache("insights") if config.ANSWER_CACHE_ENABLED else None
+        # Startup ComponentLoader (set by the API); answers aren't cached until it reports ready
+        self.readiness = None
+        # Shared per-process client for your local Mistral
+        self.llm = get_llm(config.INSIGHTS_MODEL)
         print("[Insight] Retriever ready ✅")
 
-    def generate_insights(self, question: str) -> str:
-        print(f"[Insight] Generating insights for question: {question}")
+    def _build_prompt(self, question: str, collections=None, trace=None):
+        # Same "stuff" prompt RetrievalQA uses, so streamed and blocking answers match
+        with trace.span("retrieve") as span:
+            filters = filters_from_entities(extract_entities(question))
+            docs, applied_filters = self.retriever.search(question, filters=filters, collections=collections)
+            span["docs"] = len(docs)
+        # Collections that were warming, timed out or failed have no entry in applied_filters
+        degraded = [name for name in (collections or self.retriever.collections) if name not in applied_filters]
+        retrieval = {"degraded": degraded} if degraded else {}
+        context = "\n\n".join(doc.page_content for doc in docs)
+        return PROMPT.format(context=context, question=question), docs, retrieval
+
+    def _cached(self, question: str, collections=None):
+        if not self.answer_cache:
+            return None
+        cached = self.answer_cache.get(question, collections or self.retriever.collections)
+        if cached:
+            logger.info("Answer cache hit (%s, similarity=%s)", cached["tier"], cached["similarity"])
+        return cached
+
+    def _remember(self, question: str, collections, response: str, started: float, retrieval: dict):
+        if not self.answer_cache:
+            return
+        if not cacheable(retrieval, self.readiness):
+            logger.info("Retrieval degraded (%s), not caching the answer", retrieval.get("degraded") or "components loading")
+            return
+        self.answer_cache.put(question, collections or self.retriever.collections, response, time.perf_counter() - started)
+
+    def generate_insights(self, question: str, collections=None) -> str:
+        trace = start_trace("insights")
+        logger.info("Generating insights request_id=%s question=%r", trace.request_id, question)
+
+        status = "error"
+        try:
+            cached = self._cached(question, collections)
+            if cached:
+                status = "cached"
+                return cached["answer"]
+
+            started = time.perf_counter()
+            prompt, _, retrieval = self._build_prompt(question, collections, trace)
+            with trace.span("generate") as span:
+                response = self.llm.invoke(prompt)
+                span["prompt_tokens"] = estimate_tokens(prompt)
+                span["completion_tokens"] = estimate_tokens(response)
+            logger.debug("Response request_id=%s: %s", trace.request_id, response)
+            self._remember(question, collections, response, started, retrieval)
+            status = "ok"
+            return response
+        finally:
+            trace.finish(status)
+
+    def stream_insights(self, question: str, collections=None):
+        trace = start_trace("insights_stream")
+        logger.info("Streaming insights request_id=%s question=%r", trace.request_id, question)
+
+        status = "error"
+        try:
+            cached = self._cached(question, collections)
+            if cached:
+                status = "cached"
+                yield {"event": "metadata", "question": question, "request_id": trace.request_id,
+                       "cached": cached["tier"], "similarity": cached["similarity"]}
+                yield {"event": "token", "content": cached["answer"]}
+                yield {"event": "done", "insights": cached["answer"]}
+                return
+
+            started = time.perf_counter()
+            prompt, docs, retrieval = self._build_prompt(question, collections, trace)
+            yield {
+                "event": "metadata",
+                "question": question,
+                "request_id": trace.request_id,
+                "num_docs": len(docs),
+                "sources": [doc.metadata.get("source") for doc in docs if doc.metadata.get("source")],
+                "collections": sorted({doc.metadata["collection"] for doc in docs if doc.metadata.get("collection")}),
+                **retrieval,
+            }
 
-        # Use Ollama with your local Mistral
-        llm = Ollama(model="mistral", base_url="http://localhost:11434")
+            parts = []
+            with trace.span("generate") as span:
+                for token in self.llm.stream(prompt):
+                    parts.append(token)
+                    yield {"event": "token", "content": token}
+                response = "".join(parts)
+                span["prompt_tokens"] = estimate_tokens(prompt)
+                span["completion_tokens"] = estimate_tokens(response)
 
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            retriever=self.retriever,
-            chain_type="stuff"
-        )
+            logger.debug("Response request_id=%s: %s", trace.request_id, response)
+            self._remember(question, collections, response, started, retrieval)
+            status = "ok"
+            yield {"event": "done", "insights": response}
+        except GeneratorExit:
+            status = "cancelled"
+            raise
+        finally:
+            trace.finish(status)
 
-        response = qa_chain.run(question)
-        print(f"[Insight] Response: {response}")
-        return response
\ No newline at end of file
+    def stats(self):
+        return {"answer_cache": self.answer_cache.stats()} if self.answer_cache else {}
@@ -0,0 +1,41 @@
+# backend/app/services/kg_retriever.py
+
+from typing import List
+
+from app import config
+from app.utils.financial_entities import extract_entities
+from app.utils.graph_loader import ensure_fulltext_index, search_knowledge_graph
+from app.utils.token_budget import take_within_budget
+
+class KnowledgeGraphRetriever:
+    def __init__(self, k: int = config.KG_TOP_K, token_budget: int = config.KG_TOKEN_BUDGET, graph_driver=None):
+        self.k = k
+        self.token_budget = token_budget
+        # None means the shared Neo4j driver; tests pass an in-memory fake
+        self.graph_driver = graph_driver
+        self.ready = False
+
+    def connect(self):
+        # Talks to Neo4j, so it runs at startup in the background rather than in __init__
+        ensure_fulltext_index(self.graph_driver)
+        self.ready = True
+        print(f"[KG] Full-text retriever ready (k={self.k}, budget={self.token_budget} tokens) ✅")
+
+    def retrieve(self, question: str) -> List[str]:
+        entities = extract_entities(question)
+        hits = search_knowledge_graph(
+            question,
+            k=self.k,
+            company=entities["company"],
+            form_type=entities["form_type"],
+            graph_driver=self.graph_driver,
+        )
+
+        # Same chunk text can be stored under several sources; keep the best-scoring copy
+        texts, seen = [], set()
+        for hit in hits:
+            if hit["text"] and hit["text"] not in seen:
+                seen.add(hit["text"])
+                texts.append(hit["text"])
+
+        return take_within_budget(texts, self.token_budget)
@@ -0,0 +1,83 @@
+# backend/app/services/model_registry.py
+
+import threading
+import time
+from typing import Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_ollama import OllamaLLM
+
+from app import config
+
+# --- One LLM client per model per process ---
+# Each OllamaLLM owns an HTTP client with its own keep-alive connection pool, so
+# sharing the object also shares the sockets; keep_alive keeps the model
+# resident in Ollama between requests instead of reloading it after 5 minutes.
+_llms: Dict[str, OllamaLLM] = {}
+_session = None
+_lock = threading.Lock()
+_stats = {"llm_requests": 0, "llm_constructed": 0, "construct_ms": 0.0, "warm_up": {}}
+
+def get_llm(model: str = config.OLLAMA_MODEL) -> OllamaLLM:
+    with _lock:
+        _stats["llm_requests"] += 1
+        llm = _llms.get(model)
+        if llm is None:
+            started = time.perf_counter()
+            llm = OllamaLLM(model=model, base_url=config.OLLAMA_BASE_URL, keep_alive=config.OLLAMA_KEEP_ALIVE)
+            _llms[model] = llm
+            _stats["llm_constructed"] += 1
+            _stats["construct_ms"] += (time.perf_counter() - started) * 1000
+            print(f"[Models] LLM client for '{model}' ready ✅")
+        return llm
+
+# --- Pooled HTTP session for direct Ollama API calls (summaries, warm-up) ---
+def get_http_session() -> requests.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.OLLAMA_POOL_SIZE)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+# --- Warm-up: load each model into Ollama once at startup so the first request doesn't pay for it ---
+def warm_up(models: List[str] = None) -> List[str]:
+    """Returns the models that could not be loaded."""
+    models = config.WARMUP_MODELS if models is None else models
+    session = get_http_session()
+    failed = []
+    for model in models:
+        started = time.perf_counter()
+        if model == config.OLLAMA_EMBEDDING_MODEL:
+            url, payload = f"{config.OLLAMA_BASE_URL}/api/embed", {"model": model, "input": "warm-up"}
+        else:
+            # A generate request without a prompt only loads the model
+            get_llm(model)
+            url, payload = f"{config.OLLAMA_BASE_URL}/api/generate", {"model": model}
+        try:
+            response = session.post(url, json={**payload, "keep_alive": config.OLLAMA_KEEP_ALIVE}, timeout=config.WARMUP_TIMEOUT_S)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"[Models] ⚠️ Warm-up of '{model}' failed: {e}")
+            with _lock:
+                _stats["warm_up"][model] = {"ok": False, "error": str(e)}
+            failed.append(model)
+            continue
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        with _lock:
+            _stats["warm_up"][model] = {"ok": True, "ms": elapsed_ms}
+        print(f"[Models] Warmed up '{model}' in {elapsed_ms} ms ✅")
+    return failed
+
+def stats():
+    with _lock:
+        return {
+            "models": sorted(_llms),
+            "llm_requests": _stats["llm_requests"],
+            "llm_constructed": _stats["llm_constructed"],
+            "construct_ms": round(_stats["construct_ms"], 2),
+            "warm_up": dict(_stats["warm_up"]),
+        }
@@ -0,0 +1,356 @@
+# backend/app/services/numeric_reasoning.py
+
+import ast
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.utils.financial_entities import COMPANY_TICKERS, find_years
+
+# --- Operations we can execute without an LLM, keyed by the phrases that ask for them ---
+OPERATION_PATTERNS = [
+    ("pct_change", re.compile(r"percent(age)?\s+(change|increase|decrease|growth)|%\s*change|growth\s+rate|rate\s+of\s+(change|growth)", re.I)),
+    ("ratio", re.compile(r"\bratio\b|\bproportion\b", re.I)),
+    ("average", re.compile(r"\baverage\b|\bmean\b", re.I)),
+    ("sum", re.compile(r"\btotal\b|\bsum\b|\bcombined\b", re.I)),
+    ("diff", re.compile(r"\bchange\b|\bdifference\b|\bincrease\b|\bdecrease\b|\bgrowth\b", re.I)),
+]
+
+LABEL_STOPWORDS = {
+    "the", "a", "an", "of", "in", "for", "to", "from", "and", "between", "what", "was", "is", "were",
+    "how", "much", "did", "does", "by", "on", "at", "as", "its", "their", "value", "amount", "fiscal",
+    "year", "years", "percentage", "percent", "change", "increase", "decrease", "growth", "rate",
+    "difference", "ratio", "average", "mean", "sum", "combined", "proportion",
+    # Filler that names no metric ("the company's revenue in millions over the period")
+    "company", "companys", "s", "million", "millions", "billion", "billions", "thousand", "thousands",
+    "reported", "respectively", "over", "period", "during", "with", "compared", "than", "versus", "vs",
+    "are", "be", "has", "have", "had", "do", "it", "that", "this", "these", "those", "there", "which",
+    "both", "each", "ended", "ending", "end",
+}
+# "Apple's revenue" asks for the revenue row; the company picks the table, not the row
+LABEL_STOPWORDS |= set(COMPANY_TICKERS) | {ticker.lower() for ticker in COMPANY_TICKERS.values()}
+# Words that tell rows apart ("Total revenue", "Outstanding at 31 March") but are just as often filler
+# in the question ("total revenue in 2018 and 2019", "for the year ended December 31"): they count
+# toward a row match only when the question and the row label both have them
+OPTIONAL_WORDS = {
+    "total", "january", "february", "march", "april", "may", "june", "july", "august", "september",
+    "october", "november", "december",
+}
+# "total" names a row ("Total revenue") as often as it asks for a sum; only these always mean a sum
+SUM_WORD_RE = re.compile(r"\bsum\b|\bcombined\b", re.I)
+# "ratio of net income to revenue": two rows in one year
+RATIO_OF_RE = re.compile(
+    r"\b(?:ratio|proportion)\s+(?:of|between)\s+(.+?)\s+(?:to|and)\s+(.+?)(?=\s+(?:in|for|during|at|as\s+of|on)\b|[?.,]|$)",
+    re.I,
+)
+# Row and question must each cover this much of the other's metric words
+MIN_ROW_COVERAGE = 0.75
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+YEAR_CELL_RE = re.compile(r"\b((?:19|20)\d{2})\b")
+MISSING_CELLS = {"", "-", "—", "–", "n/a", "na", "nm"}
+
+def _tokens(text: str):
+    # Numbers (years, "December 31", "3 year period") never name a metric
+    return {t for t in TOKEN_RE.findall(str(text).lower()) if t not in LABEL_STOPWORDS and not t.isdigit()}
+
+# --- Cell parsing: "$1,234.5", "(123)", "12.5%", "—" ---
+def parse_number(cell) -> float:
+    if cell is None:
+        return np.nan
+    if isinstance(cell, (int, float)):
+        return float(cell)
+    text = str(cell).strip().lower()
+    if text in MISSING_CELLS:
+        return np.nan
+    negative = text.startswith("(") and text.endswith(")")
+    text = re.sub(r"[\s$,%()€£]", "", text)
+    try:
+        value = float(text)
+    except ValueError:
+        return np.nan
+    return -value if negative else value
+
+# --- Tables → typed numeric frames (row labels as index, fiscal years as columns where possible) ---
+def _header_row(rows: List[List]) -> int:
+    for i, row in enumerate(rows[:3]):
+        if any(YEAR_CELL_RE.search(str(cell)) for cell in row):
+            return i
+    return 0
+
+def to_numeric_frame(rows: List[List]) -> Optional[pd.DataFrame]:
+    rows = [[("" if cell is None else str(cell)) for cell in row] for row in rows if row]
+    if len(rows) < 2:
+        return None
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+
+    header_at = _header_row(rows)
+    columns = []
+    for i, cell in enumerate(rows[header_at]):
+        year = YEAR_CELL_RE.search(cell)
+        columns.append(year.group(1) if year else (" ".join(cell.split()) or f"col_{i}"))
+
+    body = rows[header_at + 1:]
+    labels = [" ".join(row[0].split()) for row in body]
+    values = np.array([[parse_number(cell) for cell in row[1:]] for row in body], dtype="float64")
+    if values.size == 0:
+        return None
+
+    frame = pd.DataFrame(values, index=labels, columns=columns[1:])
+    frame = frame.loc[:, frame.notna().any(axis=0)]
+    frame = frame.loc[:, ~frame.columns.duplicated()]
+    frame = frame[[bool(label) for label in frame.index]]
+    return frame if not frame.empty else None
+
+def dataframe_to_rows(df: pd.DataFrame) -> List[List]:
+    return [list(df.columns)] + df.astype(str).values.tolist()
+
+# --- Tables embedded in retrieved context: markdown pipes or Python-literal lists after "Table:" ---
+def _literal_tables(text: str):
+    for match in re.finditer(r"Table:\s*(\[\[)", text):
+        start, depth, quote = match.start(1), 0, None
+        for end in range(start, len(text)):
+            char = text[end]
+            if quote:
+                if char == quote and text[end - 1] != "\\":
+                    quote = None
+            elif char in "'\"":
+                quote = char
+            elif char == "[":
+                depth += 1
+            elif char == "]":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        table = ast.literal_eval(text[start:end + 1])
+                    except (ValueError, SyntaxError):
+                        break
+                    if isinstance(table, list) and all(isinstance(row, list) for row in table):
+                        yield table
+                    break
+
+def _markdown_tables(text: str):
+    block = []
+    for line in text.splitlines() + [""]:
+        stripped = line.strip()
+        if stripped.startswith("|") and stripped.endswith("|"):
+            cells = [cell.strip() for cell in stripped.strip("|").split("|")]
+            if not all(re.fullmatch(r":?-{2,}:?", cell) for cell in cells if cell):
+                block.append(cells)
+        elif block:
+            yield block
+            block = []
+
+def tables_from_text(text: str) -> List[List[List]]:
+    return list(_literal_tables(text)) + list(_markdown_tables(text))
+
+# --- Program resolution: operation + row + year columns ---
+def detect_operation(question: str) -> Optional[str]:
+    matched = [name for name, pattern in OPERATION_PATTERNS if pattern.search(question)]
+    if "pct_change" in matched and "diff" in matched:
+        matched.remove("diff")
+    # "total" usually names a row ("Total revenue") when another operation is asked for
+    if "sum" in matched and len(matched) > 1:
+        matched.remove("sum")
+    # Compound questions ("change in the average ...") need more than one step; leave them to the LLM
+    return matched[0] if len(matched) == 1 else None
+
+def question_years(question: str) -> List[str]:
+    years = find_years(question)
+    # "from 2015 to 2019" / "2017-2019" / "3 year period" cover every year in between
+    if len(years) == 2 and re.search(r"\b(from\s+)?(19|20)\d{2}\s*(-|–|to|through)\s*(19|20)\d{2}\b", question, re.I):
+        years = list(range(years[0], years[1] + 1))
+    return [str(year) for year in years]
+
+def mentioned_years(question: str) -> List[str]:
+    """Years in the order the question names them ("ratio of 2019 to 2018" keeps 2019 first)."""
+    years = []
+    for match in YEAR_CELL_RE.finditer(question):
+        if match.group(1) not in years:
+            years.append(match.group(1))
+    return years
+
+def _best_row(metric_tokens, frame: pd.DataFrame):
+    """
+    (label, coverage, overlap) for the row whose label best matches the metric
+    words. Coverage is the lower of how much of the label the question covers
+    and how much of the question the label covers, so "net income margin"
+    does not match "Net income".
+    """
+    best, best_key = None, (0.0, 0)
+    for label in frame.index:
+        label_tokens = _tokens(label)
+        unshared = OPTIONAL_WORDS - (label_tokens & metric_tokens)
+        label_tokens, wanted = label_tokens - unshared, metric_tokens - unshared
+        if not label_tokens or not wanted:
+            continue
+        overlap = len(wanted & label_tokens)
+        key = (min(overlap / len(label_tokens), overlap / len(wanted)), overlap)
+        if overlap and key > best_key:
+            best, best_key = label, key
+    return best, best_key[0], best_key[1]
+
+def _resolve_ratio(question: str, frames: List[pd.DataFrame]) -> Optional[Dict]:
+    years = mentioned_years(question)
+    match = RATIO_OF_RE.search(question)
+    sides = [_tokens(side) for side in match.groups()] if match else []
+
+    candidates = []
+    if len(sides) == 2 and all(sides):
+        # Two rows in one year; across several years the question is ambiguous
+        if len(years) != 1:
+            return None
+        for frame in frames:
+            if years[0] not in frame.columns:
+                continue
+            (row, row_score, row_overlap), (denominator, denominator_score, denominator_overlap) = (
+                _best_row(side, frame) for side in sides
+            )
+            score = min(row_score, denominator_score)
+            if row is not None and denominator is not None and row != denominator and score >= MIN_ROW_COVERAGE:
+                candidates.append(((score, row_overlap + denominator_overlap), frame, row, denominator))
+        if not candidates:
+            return None
+        (score, _), frame, row, denominator = max(candidates, key=lambda item: item[0])
+        return {"operation": "ratio", "row": row, "denominator": denominator, "columns": years,
+                "frame": frame, "score": round(score, 3)}
+
+    # One row, first-named year over second-named year
+    if len(years) != 2:
+        return None
+    metric_tokens = _tokens(question)
+    for frame in frames:
+        if not all(year in frame.columns for year in years):
+            continue
+        row, score, overlap = _best_row(metric_tokens, frame)
+        if row is not None and score >= MIN_ROW_COVERAGE:
+            candidates.append(((score, overlap), frame, row))
+    if not candidates:
+        return None
+    (score, _), frame, row = max(candidates, key=lambda item: item[0])
+    return {"operation": "ratio", "row": row, "columns": years, "frame": frame, "score": round(score, 3)}
+
+def resolve_program(question: str, frames: List[pd.DataFrame]) -> Optional[Dict]:
+    operation = detect_operation(question)
+    if operation is None:
+        return None
+    if operation == "ratio":
+        return _resolve_ratio(question, frames)
+
+    years = question_years(question)
+    # Every other operation compares or aggregates at least two periods
+    if len(years) < 2:
+        return None
+
+    metric_tokens = _tokens(question)
+    candidates = []
+    for frame in frames:
+        if not all(year in frame.columns for year in years):
+            continue
+        row, score, overlap = _best_row(metric_tokens, frame)
+        if row is not None and score >= MIN_ROW_COVERAGE:
+            candidates.append(((score, overlap), frame, row))
+
+    if not candidates:
+        return None
+    (score, _), frame, row = max(candidates, key=lambda item: item[0])
+    # "total revenue in 2018 and 2019" names the "Total revenue" row; it doesn't ask for a sum
+    if operation == "sum" and not SUM_WORD_RE.search(question) and "total" in _tokens(row):
+        return None
+    return {"operation": operation, "row": row, "columns": sorted(years), "frame": frame, "score": round(score, 3)}
+
+# --- Execution (vectorized over the selected row's year columns) ---
+def _row_values(frame: pd.DataFrame, row: str, columns: List[str]) -> pd.Series:
+    values = frame.loc[row, columns]
+    if isinstance(values, pd.DataFrame):
+        # Duplicate row labels: use the first occurrence
+        values = values.iloc[0]
+    return values.astype("float64")
+
+def execute_program(program: Dict) -> Optional[float]:
+    values = _row_values(program["frame"], program["row"], program["columns"])
+    if values.isna().any():
+        return None
+
+    operation = program["operation"]
+    first, last = values.iloc[0], values.iloc[-1]
+    if operation == "ratio" and program.get("denominator"):
+        denominator = _row_values(program["frame"], program["denominator"], program["columns"]).iloc[0]
+        if np.isnan(denominator) or denominator == 0:
+            return None
+        result = first / denominator
+    elif operation == "ratio":
+        # Columns in the order the question named them
+        result = first / last if last != 0 else np.nan
+    elif operation == "pct_change":
+        # First to last requested year, however many years the range spans
+        result = (last - first) / first * 100 if first != 0 else np.nan
+    elif operation == "diff":
+        result = last - first
+    elif operation == "sum":
+        result = values.sum()
+    else:
+        result = values.mean()
+
+    return None if not np.isfinite(result) else float(result)
+
+def _format_number(value: float) -> str:
+    return f"{value:,.2f}".rstrip("0").rstrip(".")
+
+def format_answer(program: Dict, result: float) -> str:
+    row, columns = program["row"], program["columns"]
+    span = f"from {columns[0]} to {columns[-1]}" if len(columns) > 1 else f"in {columns[0]}"
+    operation = program["operation"]
+    if operation == "pct_change":
+        return f"The percentage change in {row} {span} is {_format_number(result)}%."
+    if operation == "diff":
+        return f"The change in {row} {span} is {_format_number(result)}."
+    if operation == "ratio" and program.get("denominator"):
+        return f"The ratio of {row} to {program['denominator']} in {columns[0]} is {_format_number(result)}."
+    if operation == "ratio":
+        return f"The ratio of {row} in {columns[0]} to {columns[-1]} is {_format_number(result)}."
+    if operation == "sum":
+        return f"The total {row} across {', '.join(columns)} is {_format_number(result)}."
+    return f"The average {row} across {', '.join(columns)} is {_format_number(result)}."
+
+def solve_numeric_question(question: str, tables=None, context: str = "") -> Optional[Dict]:
+    """
+    Try to answer a FinQA/TAT-QA-style arithmetic question straight from tables.
+    `tables` may hold DataFrames or row lists; tables found in `context` text are
+    added. Returns {"answer", "value", "program", "confident"} or None when no
+    program resolves; `confident` means the row label and the question's metric
+    words match exactly, so callers may use the answer without an LLM.
+    """
+    raw_tables = []
+    for table in tables or []:
+        raw_tables.append(dataframe_to_rows(table) if isinstance(table, pd.DataFrame) else table)
+    if context:
+        raw_tables.extend(tables_from_text(context))
+
+    frames = [frame for frame in (to_numeric_frame(rows) for rows in raw_tables) if frame is not None]
+    if not frames:
+        return None
+
+    program = resolve_program(question, frames)
+    if program is None:
+        return None
+    result = execute_program(program)
+    if result is None:
+        return None
+
+    summary = {
+        "operation": program["operation"],
+        "row": program["row"],
+        "columns": program["columns"],
+        "score": program["score"],
+    }
+    if program.get("denominator"):
+        summary["denominator"] = program["denominator"]
+    return {
+        "answer": format_answer(program, result),
+        "value": result,
+        "program": summary,
+        "confident": program["score"] >= 1.0,
+    }
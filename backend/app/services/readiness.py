@@ -0,0 +1,87 @@
+# backend/app/services/readiness.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from app import config
+
+class ComponentLoader:
+    """
+    Loads slow components (vector collections, the knowledge graph, models)
+    in background threads, several at once, so the API can serve requests
+    while they warm up. Each component's state and load time is tracked for
+    `/ready`; a failed loader is retried a few times before it is marked
+    failed, and the service keeps answering without it.
+    """
+
+    def __init__(self, workers: int = config.STARTUP_WORKERS, retries: int = config.STARTUP_RETRIES,
+                 retry_delay_s: float = config.STARTUP_RETRY_DELAY_S):
+        self.workers = workers
+        self.retries = retries
+        self.retry_delay_s = retry_delay_s
+        self._loaders: Dict[str, Callable] = {}
+        self._status: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._pool = None
+
+    def add(self, name: str, loader: Callable):
+        with self._lock:
+            self._loaders[name] = loader
+            self._status[name] = {"state": "pending", "attempts": 0}
+
+    def _set(self, name: str, **fields):
+        with self._lock:
+            self._status[name].update(fields)
+
+    def _load(self, name: str):
+        started = time.perf_counter()
+        for attempt in range(1, self.retries + 1):
+            if self._stopping.is_set():
+                return
+            self._set(name, state="loading", attempts=attempt)
+            try:
+                self._loaders[name]()
+            except Exception as e:
+                print(f"[Startup] ⚠️ '{name}' failed to load (attempt {attempt}/{self.retries}): {e}")
+                self._set(name, error=str(e))
+                if attempt < self.retries:
+                    self._stopping.wait(self.retry_delay_s)
+                continue
+            load_ms = round((time.perf_counter() - started) * 1000, 1)
+            self._set(name, state="ready", load_ms=load_ms, error=None)
+            print(f"[Startup] '{name}' ready in {load_ms} ms ✅")
+            return
+        self._set(name, state="failed", load_ms=round((time.perf_counter() - started) * 1000, 1))
+
+    def start(self):
+        if self._pool is not None:
+            return
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="startup")
+        for name in list(self._loaders):
+            self._pool.submit(self._load, name)
+        print(f"[Startup] Loading {len(self._loaders)} components in the background")
+
+    def shutdown(self):
+        self._stopping.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def is_ready(self, name: str) -> bool:
+        with self._lock:
+            return self._status.get(name, {}).get("state") == "ready"
+
+    def status(self) -> Dict:
+        """{"status": "starting" | "ready" | "degraded", "components": {name: {...}}}"""
+        with self._lock:
+            components = {name: dict(status) for name, status in self._status.items()}
+        states = {status["state"] for status in components.values()}
+        if states & {"pending", "loading"}:
+            overall = "starting"
+        elif "failed" in states:
+            overall = "degraded"
+        else:
+            overall = "ready"
+        return {"status": overall, "components": components}
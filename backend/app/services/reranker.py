@@ -0,0 +1,102 @@
+# backend/app/services/reranker.py
+
+import time
+from typing import Dict, List, Tuple
+
+from app import config
+from app.utils.log import get_logger
+from app.utils.token_budget import estimate_tokens, truncate_to_tokens
+
+logger = get_logger(__name__)
+
+class CrossEncoderReranker:
+    """
+    Scores (question, passage) pairs with a small CPU cross-encoder and keeps
+    the best passages that fit the token budget. Scoring runs in batches; if
+    the ms budget runs out before every batch is scored, the original
+    retrieval order is kept. `backend` is passed to sentence-transformers, so
+    "onnx"/"openvino" exports (including quantized ones) drop in by config.
+    """
+
+    def __init__(
+        self,
+        model_name: str = config.RERANK_MODEL,
+        backend: str = config.RERANK_BACKEND,
+        batch_size: int = config.RERANK_BATCH_SIZE,
+        budget_ms: int = config.RERANK_BUDGET_MS,
+        token_budget: int = config.RERANK_TOKEN_BUDGET,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.token_budget = token_budget
+        self.backend = backend
+        self.model = None
+        self.calls = 0
+        self.fallbacks = 0
+
+    def load(self):
+        """Load the cross-encoder; until it is loaded (or if it can't be) reranking is a pass-through."""
+        try:
+            from sentence_transformers import CrossEncoder
+
+            kwargs = {"device": "cpu"}
+            if self.backend != "torch":
+                kwargs["backend"] = self.backend
+            self.model = CrossEncoder(self.model_name, **kwargs)
+            print(f"[Rerank] Cross-encoder '{self.model_name}' ready ({self.backend}, budget {self.budget_ms}ms) ✅")
+        except Exception as e:
+            # Retrieval order still works; reranking just becomes a pass-through
+            print(f"[Rerank] ⚠️ Could not load cross-encoder '{self.model_name}', keeping retrieval order: {e}")
+            raise
+
+    def _score(self, question: str, texts: List[str], deadline: float):
+        scores = []
+        for start in range(0, len(texts), self.batch_size):
+            if time.perf_counter() > deadline:
+                return None
+            pairs = [(question, text) for text in texts[start:start + self.batch_size]]
+            scores.extend(float(score) for score in self.model.predict(pairs, batch_size=self.batch_size))
+        # The last batch may have finished past the deadline
+        return scores if time.perf_counter() <= deadline else None
+
+    def _within_budget(self, passages: List[Dict]) -> List[Dict]:
+        kept, used = [], 0
+        for passage in passages:
+            remaining = self.token_budget - used
+            if remaining <= 0:
+                break
+            text = passage["text"]
+            if estimate_tokens(text) > remaining:
+                text = truncate_to_tokens(text, remaining)
+            if text:
+                kept.append({**passage, "text": text})
+                used += estimate_tokens(text)
+        return kept
+
+    def rerank(self, question: str, passages: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """`passages` are dicts with at least "text"; returns (kept passages, info)."""
+        start = time.perf_counter()
+        info = {"candidates": len(passages), "reranked": False}
+        self.calls += 1
+
+        ordered = passages
+        if self.model is None:
+            info["fallback"] = "model unavailable"
+        elif passages:
+            scores = self._score(question, [p["text"] for p in passages], start + self.budget_ms / 1000)
+            if scores is None:
+                self.fallbacks += 1
+                info["fallback"] = f"over {self.budget_ms}ms budget"
+                logger.info("Budget of %sms exceeded, keeping retrieval order", self.budget_ms)
+            else:
+                ranked = sorted(zip(scores, range(len(passages))), key=lambda item: item[0], reverse=True)
+                ordered = [{**passages[i], "rerank_score": round(score, 4)} for score, i in ranked]
+                info["reranked"] = True
+
+        kept = self._within_budget(ordered)
+        info.update(kept=len(kept), elapsed_ms=round((time.perf_counter() - start) * 1000, 2))
+        return kept, info
+
+    def stats(self):
+        return {"model": self.model_name if self.model is not None else None, "calls": self.calls, "fallbacks": self.fallbacks}
@@ -1,29 +1,37 @@
 # backend/app/services/table_qa.py
 
-import pdfplumber
-import pandas as pd
-from langchain_community.llms import Ollama
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-
-# --- Extract tables from PDF ---
+from app.utils.pdf_parser import iter_pdf_pages
+from app.utils.table_cache import table_cache, tables_from_pages, select_tables
+from app.services.numeric_reasoning import solve_numeric_question
+from app.services.model_registry import get_llm
+from app.utils.log import get_logger
+from app.utils.token_budget import estimate_tokens
+from app.utils.tracing import record_cache, start_trace
+from app import config
+
+logger = get_logger(__name__)
+
+# --- Extract tables from PDF (pages parsed in parallel) ---
 def extract_tables_from_pdf(file_path: str):
-    print(f"[TableQA] Extracting tables from: {file_path}")
-
-    tables = []
-    with pdfplumber.open(file_path) as pdf:
-        for i, page in enumerate(pdf.pages):
-            page_tables = page.extract_tables()
-            for table in page_tables:
-                df = pd.DataFrame(table[1:], columns=table[0])
-                print(f"[TableQA] Extracted table on page {i+1} with shape {df.shape}")
-                tables.append(df)
-
-    print(f"[TableQA] Total tables extracted: {len(tables)}")
+    logger.info("Extracting tables from %s", file_path)
+
+    tables = tables_from_pages(iter_pdf_pages(file_path))
+    for table in tables:
+        logger.debug("Extracted table on page %s with shape %s", table["page"], table["df"].shape)
+
+    logger.info("Extracted %d tables", len(tables))
+    return tables
+
+# --- Tables for a document: parsed once per content hash, then served from the cache ---
+def load_tables(file_path: str):
+    tables = table_cache.get(file_path)
+    record_cache("tables", tables is not None)
+    if tables is None:
+        tables = table_cache.put(file_path, extract_tables_from_pdf(file_path))
     return tables
 
 # --- Build Table QA Prompt ---
-def build_table_qa_prompt(table_text: str, user_question: str) -> str:
+def build_table_qa_prompt(table_text: str, user_question: str, solved=None) -> str:
     prompt_template = """
 You are a financial data expert. Answer the user's question based on the following table:
 
@@ -36,39 +44,128 @@ QUESTION:
 Answer clearly and concisely.
 """
     prompt = prompt_template.format(table=table_text, question=user_question)
+    if solved:
+        prompt += f"A calculation over the table gives: {solved['answer']} Use it only if it answers the question.\n"
     return prompt
 
-# --- Run Table QA ---
-def run_table_qa(file_path: str, user_question: str):
-    print(f"[TableQA] Running Table QA...")
-
-    # Step 1: Extract tables
-    tables = extract_tables_from_pdf(file_path)
+# --- Select a table and build the prompt (None when the document has no tables) ---
+def prepare_table_qa(file_path: str, user_question: str, trace):
+    # Step 1: Extract tables (cached per file content)
+    with trace.span("load_tables") as span:
+        tables = load_tables(file_path)
+        span["tables"] = len(tables)
 
     if not tables:
-        print("[TableQA] No tables found!")
-        return "No tables found in document."
-
-    # For simplicity → use first table (or implement selection logic)
-    df = tables[0]
-    table_text = df.to_string()
-
-    # Step 2: Build prompt
-    prompt = build_table_qa_prompt(table_text, user_question)
-
-    # Step 3: Initialize Ollama LLM
-    llm = Ollama(
-        model="mistral",  # You can switch to "llama3", "phi3", etc.
-        base_url="http://localhost:11434"
+        logger.info("No tables found in %s", file_path)
+        return None
+    return prepare_from_tables(tables, user_question, trace)
+
+# --- Same, over tables already in memory ({"df", "page", "position", "shape"} entries) ---
+def prepare_from_tables(tables, user_question: str, trace):
+    # Pick the best-matching table(s) for this question
+    with trace.span("select_tables") as span:
+        selected = select_tables(user_question, tables)
+        span["selected"] = len(selected)
+
+    # Arithmetic over the selected tables needs no LLM when the row matches exactly
+    with trace.span("solve") as span:
+        solved = solve_numeric_question(user_question, tables=[table["df"] for table in selected])
+        span["solver"] = solved["program"]["operation"] if solved else None
+    table_text = "\n\n".join(
+        f"(page {table['page']}, table {table['position'] + 1})\n{table['df'].to_string()}" for table in selected
     )
 
-    chain = LLMChain(
-        llm=llm,
-        prompt=PromptTemplate.from_template("{input}")
-    )
+    # Step 2: Build prompt (an inexact match only goes in as a hint)
+    hint = solved if solved and not solved["confident"] else None
+    prompt = build_table_qa_prompt(table_text, user_question, hint)
+    metadata = {
+        "num_tables": len(tables),
+        "selected_tables": [{"page": t["page"], "position": t["position"], "shape": t["shape"]} for t in selected],
+    }
+    if solved and solved["confident"]:
+        logger.info("Solved numerically (%s), skipping LLM", solved["program"]["operation"])
+        metadata["program"] = solved["program"]
+        metadata["answer"] = solved["answer"]
+    return prompt, metadata
+
+# --- Answer a prepared question: the solver's result, else the shared Ollama client ---
+def _answer(prepared, trace, llm=None):
+    """Returns (answer, status)."""
+    if prepared is None:
+        return "No tables found in document.", "no_tables"
+    prompt, metadata = prepared
+    if "answer" in metadata:
+        return metadata["answer"], "solved"
+
+    # The prompt is already fully built
+    with trace.span("generate") as span:
+        response = (llm or get_llm(config.TABLE_QA_MODEL)).invoke(prompt)
+        span["prompt_tokens"] = estimate_tokens(prompt)
+        span["completion_tokens"] = estimate_tokens(response)
+
+    logger.debug("Response request_id=%s: %s", trace.request_id, response)
+    return response, "ok"
 
-    # Step 4: Run chain
-    response = chain.run(input=prompt)
-
-    print(f"[TableQA] Response: {response}")
-    return response
\ No newline at end of file
+# --- Run Table QA ---
+def run_table_qa(file_path: str, user_question: str):
+    trace = start_trace("table_qa")
+    logger.info("Running Table QA request_id=%s file=%s", trace.request_id, file_path)
+
+    status = "error"
+    try:
+        response, status = _answer(prepare_table_qa(file_path, user_question, trace), trace)
+        return response
+    finally:
+        trace.finish(status)
+
+def answer_from_tables(tables, user_question: str, llm=None):
+    """Table QA over tables that are already parsed (datasets, benchmarks); `llm` defaults to the shared client."""
+    trace = start_trace("table_qa")
+    status = "error"
+    try:
+        response, status = _answer(prepare_from_tables(tables, user_question, trace), trace, llm)
+        return response
+    finally:
+        trace.finish(status)
+
+# --- Streaming Table QA: metadata first, then answer tokens ---
+def stream_table_qa(file_path: str, user_question: str):
+    trace = start_trace("table_qa_stream")
+    logger.info("Streaming Table QA request_id=%s file=%s", trace.request_id, file_path)
+
+    status = "error"
+    try:
+        prepared = prepare_table_qa(file_path, user_question, trace)
+        if prepared is None:
+            status = "no_tables"
+            yield {"event": "metadata", "request_id": trace.request_id, "num_tables": 0}
+            yield {"event": "done", "answer": "No tables found in document."}
+            return
+        prompt, metadata = prepared
+        answer = metadata.pop("answer", None)
+
+        yield {"event": "metadata", "request_id": trace.request_id, **metadata}
+
+        if answer is not None:
+            status = "solved"
+            yield {"event": "token", "content": answer}
+            yield {"event": "done", "answer": answer}
+            return
+
+        parts = []
+        with trace.span("generate") as span:
+            for token in get_llm(config.TABLE_QA_MODEL).stream(prompt):
+                parts.append(token)
+                yield {"event": "token", "content": token}
+            response = "".join(parts)
+            span["prompt_tokens"] = estimate_tokens(prompt)
+            span["completion_tokens"] = estimate_tokens(response)
+
+        logger.debug("Response request_id=%s: %s", trace.request_id, response)
+        status = "ok"
+        yield {"event": "done", "answer": response}
+    except GeneratorExit:
+        status = "cancelled"
+        raise
+    finally:
+        trace.finish(status)
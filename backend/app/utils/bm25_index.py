@@ -0,0 +1,164 @@
+# backend/app/utils/bm25_index.py
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app import config
+from app.utils.metadata_filters import indexable_fields
+
+SPARSE_INDEX_FILE = "bm25.json"
+TERM_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+    "or", "that", "the", "this", "to", "was", "were", "what", "which", "with", "how", "did", "does",
+}
+
+def tokenize(text: str) -> List[str]:
+    # Tickers, line-item words, fiscal years and decimals ("1.5") survive as whole terms
+    return [term for term in TERM_RE.findall(text.lower()) if term not in STOPWORDS]
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk IDs, updated incrementally as chunks are stored or
+    removed. Filterable metadata (company, form type, fiscal period) is
+    indexed alongside so queries can be narrowed to a chunk-ID subset.
+    Per-chunk term counts and fields are persisted to `path` (JSON); postings
+    are rebuilt in memory on load.
+    """
+
+    def __init__(self, path: str = None, k1: float = config.BM25_K1, b: float = config.BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_len = 0
+        self._doc_fields: Dict[str, Dict[str, str]] = {}
+        self._field_postings: Dict[Tuple[str, str], Set[str]] = {}
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    # --- Updates ---
+    def _index(self, chunk_id: str, terms: Dict[str, int], fields: Dict[str, str]):
+        self._doc_terms[chunk_id] = terms
+        self._doc_len[chunk_id] = sum(terms.values())
+        self._total_len += self._doc_len[chunk_id]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[chunk_id] = tf
+        if fields:
+            self._doc_fields[chunk_id] = fields
+            for item in fields.items():
+                self._field_postings.setdefault(item, set()).add(chunk_id)
+
+    def _add_one(self, chunk_id: str, text: str, metadata: Optional[Dict] = None):
+        if chunk_id in self._doc_len:
+            self._remove_one(chunk_id)
+        self._index(chunk_id, dict(Counter(tokenize(text))), indexable_fields(metadata))
+
+    def _remove_one(self, chunk_id: str):
+        terms = self._doc_terms.pop(chunk_id, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(chunk_id)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(chunk_id, None)
+                if not posting:
+                    del self._postings[term]
+        for item in self._doc_fields.pop(chunk_id, {}).items():
+            ids = self._field_postings.get(item)
+            if ids is not None:
+                ids.discard(chunk_id)
+                if not ids:
+                    del self._field_postings[item]
+
+    def add(self, items: Iterable[Tuple]):
+        """Index (chunk_id, text) or (chunk_id, text, metadata) tuples; re-adding an ID replaces it."""
+        with self._lock:
+            for item in items:
+                self._add_one(*item)
+
+    def remove(self, chunk_ids: Iterable[str]):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._remove_one(chunk_id)
+
+    # --- Query ---
+    def matching_ids(self, filters: Dict[str, List]) -> Optional[Set[str]]:
+        """Chunk IDs satisfying every field filter (any listed value); None when unfiltered."""
+        if not filters:
+            return None
+        with self._lock:
+            matched = None
+            for field, values in filters.items():
+                ids = set()
+                for value in values:
+                    ids |= self._field_postings.get((field, str(value)), set())
+                matched = ids if matched is None else matched & ids
+                if not matched:
+                    return set()
+            return matched
+
+    def search(self, query: str, k: int = config.RETRIEVAL_CANDIDATES, allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Top-k (chunk_id, score); `allowed` restricts scoring to a chunk-ID subset."""
+        with self._lock:
+            total_docs = len(self._doc_len)
+            if not total_docs:
+                return []
+            avg_len = self._total_len / total_docs or 1.0
+
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (total_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for chunk_id, tf in posting.items():
+                    if allowed is not None and chunk_id not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[chunk_id] / avg_len)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    # --- Persistence ---
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            payload = {"k1": self.k1, "b": self.b, "docs": self._doc_terms, "fields": self._doc_fields}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(payload, f)
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        with open(self.path, "r") as f:
+            payload = json.load(f)
+        fields = payload.get("fields", {})
+        for chunk_id, terms in payload.get("docs", {}).items():
+            self._index(chunk_id, terms, fields.get(chunk_id, {}))
+        print(f"[BM25] Loaded sparse index with {len(self._doc_len)} chunks from {self.path}")
+
+# --- One index per collection, stored next to the collection's local vectors ---
+_indexes: Dict[str, BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+def get_sparse_index(collection_name: str) -> BM25Index:
+    with _indexes_lock:
+        if collection_name not in _indexes:
+            path = os.path.join(config.LOCAL_VECTORS_DIR, collection_name, SPARSE_INDEX_FILE)
+            _indexes[collection_name] = BM25Index(path)
+        return _indexes[collection_name]
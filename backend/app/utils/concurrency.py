@@ -0,0 +1,141 @@
+# backend/app/utils/concurrency.py
+
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+class EndpointLimiter:
+    """
+    Runs blocking work (LLM / embedding / vector-store calls) off the event loop
+    with at most `max_concurrency` jobs running and `max_queue` waiting. Anything
+    beyond that is rejected with 429 so a burst can't pile up unbounded.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"{name}-worker")
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self.rejected = 0
+
+    def _admit(self):
+        with self._lock:
+            if self._admitted >= self.max_concurrency + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"'{self.name}' is saturated ({self._admitted} requests in flight), retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._admitted += 1
+
+    def _release(self):
+        with self._lock:
+            self._admitted -= 1
+
+    def _call(self, fn, *args):
+        with self._slots:
+            return fn(*args)
+
+    async def run(self, fn, *args):
+        self._admit()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._call, fn, *args)
+        finally:
+            self._release()
+
+    def stream(self, events):
+        """Admit now (so saturation is a 429, not a broken stream) and hold a slot while iterating."""
+        self._admit()
+        return _LimitedStream(self, events)
+
+    def stats(self) -> dict:
+        with self._lock:
+            admitted = self._admitted
+        return {
+            "in_flight": min(admitted, self.max_concurrency),
+            "queued": max(admitted - self.max_concurrency, 0),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+class _LimitedStream:
+    """Iterator that holds a limiter slot while events are produced and frees it exactly once."""
+
+    def __init__(self, limiter: EndpointLimiter, events):
+        self._limiter = limiter
+        self._events = iter(events)
+        self._holding = False
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+        if not self._holding:
+            self._limiter._slots.acquire()
+            self._holding = True
+        try:
+            return next(self._events)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if hasattr(self._events, "close"):
+            self._events.close()
+        if self._holding:
+            self._limiter._slots.release()
+        self._limiter._release()
+
+    # A stream the client abandoned before it started still gives its admission back
+    __del__ = close
+
+# --- Streaming helper: one JSON event per line (NDJSON) ---
+class _ClosingStreamingResponse(StreamingResponse):
+    """
+    Closes the event source however the response ends: finished, failed or
+    the client disconnected. Starlette cancels a disconnected stream without
+    closing its iterator, which would hold a limiter slot until GC.
+    """
+
+    def __init__(self, events, content, **kwargs):
+        super().__init__(content, **kwargs)
+        self._events = events
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            close = getattr(self._events, "close", None)
+            if close:
+                close()
+
+def ndjson_response(events):
+    def body():
+        try:
+            for event in events:
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.exception("Streaming error: %s", e)
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+
+    return _ClosingStreamingResponse(events, body(), media_type="application/x-ndjson")
@@ -1,17 +1,18 @@
 import os
-import json
 from pathlib import Path
 from typing import List
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_core.documents import Document
 # Optional: DOCX support (if you want later):
 # from langchain_community.document_loaders import UnstructuredWordDocumentLoader
 
 from bs4 import BeautifulSoup  # for HTML support!
 
-from app import config
-from app.utils.vector_store import save_vector_store
+from app.utils.vector_store import save_vector_store, delete_stale_chunks
+from app.utils.json_stream import iter_json_array
+from app.utils.financial_chunker import get_text_splitter, table_to_markdown_chunks
+from app.utils.pdf_parser import count_pages, iter_pdf_pages, parse_pdf
+from app.utils.table_cache import table_cache, tables_from_pages
 
 # --- Universal load_text_file ---
 def load_text_file(file_path: str) -> List[str]:
@@ -23,8 +24,10 @@ def load_text_file(file_path: str) -> List[str]:
 # --- Load PDF ---
 def load_pdf(file_path: str):
     print(f"[DocLoader] Loading PDF: {file_path}")
-    loader = PyPDFLoader(file_path)
-    return loader.load()
+    return [
+        Document(page_content=page["text"], metadata={"source": file_path, "page": page["page"]})
+        for page in parse_pdf(file_path)
+    ]
 
 # --- Load HTML ---
 def load_html(file_path: str) -> List[str]:
@@ -36,69 +39,97 @@ def load_html(file_path: str) -> List[str]:
     text = soup.get_text(separator="\n")
     return [text]
 
-# --- Load FinQA JSON ---
-def load_finqa_json(file_path: str):
-    print(f"[DocLoader] Loading FinQA JSON: {file_path}")
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    chunks = []
-    for item in data:
+# --- Load FinQA JSON (streamed: yields one combined text per record) ---
+def load_finqa_json(file_path: str, offset: int = 0, limit: int = None):
+    print(f"[DocLoader] Streaming FinQA JSON: {file_path}")
+    for item in iter_json_array(file_path, offset=offset, limit=limit):
         question = item.get("question", "")
         table = item.get("table", "")
         answer = item.get("answer_text", "")
-        combined = f"Question: {question}\nTable: {table}\nAnswer: {answer}"
-        chunks.append(combined)
-    return chunks
+        yield f"Question: {question}\nTable: {table}\nAnswer: {answer}"
 
-# --- Load TAT-QA JSON ---
-def load_tatqa_json(file_path: str):
-    print(f"[DocLoader] Loading TAT-QA JSON: {file_path}")
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    chunks = []
-    for item in data:
-        question = item.get("question", "")
-        table = item.get("table", "")
-        paragraph = item.get("paragraphs", "")
-        answer = item.get("answer", {}).get("answer_text", "")
-        combined = f"Question: {question}\nTable: {table}\nParagraph: {paragraph}\nAnswer: {answer}"
-        chunks.append(combined)
-    return chunks
+# --- Load TAT-QA JSON (streamed: yields one combined text per record) ---
+def load_tatqa_json(file_path: str, offset: int = 0, limit: int = None):
+    print(f"[DocLoader] Streaming TAT-QA JSON: {file_path}")
+    for item in iter_json_array(file_path, offset=offset, limit=limit):
+        table = "\n".join(table_to_markdown_chunks((item.get("table") or {}).get("table") or [], max_chars=float("inf")))
+        paragraphs = "\n\n".join(p.get("text", "") for p in sorted(item.get("paragraphs") or [], key=lambda p: p.get("order", 0)))
+        questions = "\n".join(q.get("question", "") for q in item.get("questions") or [])
+        yield f"{table}\n\nParagraphs:\n{paragraphs}\n\nQuestions:\n{questions}"
 
 # --- Split documents (standardized) ---
 def split_documents(documents: List[str]):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=config.CHUNK_SIZE,
-        chunk_overlap=config.CHUNK_OVERLAP
-    )
-    chunks = splitter.create_documents(documents)
+    chunks = get_text_splitter().create_documents(documents)
     print(f"[DocLoader] Split into {len(chunks)} chunks ✅")
     return chunks
 
+# --- PDF ingestion: one parallel parsing pass feeds both the splitter and the table cache ---
+def _load_and_split_pdf(file_path: str, report, source: str):
+    print(f"[DocLoader] Loading PDF: {file_path}")
+    total_pages = count_pages(file_path)
+    splitter = get_text_splitter()
+
+    chunks, pages = [], []
+    for pages_done, page in enumerate(iter_pdf_pages(file_path), start=1):
+        chunks.extend(splitter.create_documents(
+            [page["text"]],
+            metadatas=[{"source": source, "page": page["page"]}],
+        ))
+        pages.append({"page": page["page"], "tables": page["tables"]})
+        report("splitting", pages_done=pages_done, pages_total=total_pages, chunks_split=len(chunks))
+
+    if table_cache.get(file_path) is None:
+        table_cache.put(file_path, tables_from_pages(pages))
+
+    print(f"[DocLoader] Split {total_pages} pages into {len(chunks)} chunks ✅")
+    return chunks
+
 # --- Ingest document (PDF/TXT/HTML Uploads) ---
-def ingest_document(file_path: str, collection_name="default"):
+def ingest_document(file_path: str, collection_name="default", progress=None, source=None):
+    """
+    `progress(stage, **counters)` is optional and called as the document moves
+    through loading → splitting → embedding (used by the background job queue).
+    `source` is the name chunks are stored under (default: `file_path`), so a
+    per-upload copy of a document replaces the chunks of earlier uploads.
+    """
+    source = source or file_path
+    def report(stage, **counters):
+        if progress:
+            progress(stage, **counters)
+
     print(f"[Ingest] Ingesting document: {file_path}")
+    report("loading")
 
     # Detect file type
-    if file_path.lower().endswith(".txt"):
-        raw_docs = load_text_file(file_path)
-    elif file_path.lower().endswith(".pdf"):
-        raw_docs = load_pdf(file_path)
-        raw_docs = [doc.page_content for doc in raw_docs]
-    elif file_path.lower().endswith(".html"):
-        raw_docs = load_html(file_path)
+    if file_path.lower().endswith(".pdf"):
+        # Pages are parsed in parallel and split as they arrive; tables from the
+        # same pass go straight into the Table QA cache
+        chunks = _load_and_split_pdf(file_path, report, source)
     else:
-        print("[Ingest] Unsupported file type!")
-        return
-
-    print(f"[Ingest] Loaded document (length={len(raw_docs)} chunks)")
-
-    # Split
-    chunks = split_documents(raw_docs)
-
-    # Save to vector store
-    save_vector_store(chunks, collection_name=collection_name)
+        if file_path.lower().endswith(".txt"):
+            raw_docs = load_text_file(file_path)
+        elif file_path.lower().endswith(".html"):
+            raw_docs = load_html(file_path)
+        else:
+            print("[Ingest] Unsupported file type!")
+            raise ValueError(f"Unsupported file type: {file_path}")
+
+        print(f"[Ingest] Loaded document (length={len(raw_docs)} chunks)")
+        report("splitting", pages_done=len(raw_docs), pages_total=len(raw_docs))
+
+        # Split
+        chunks = split_documents(raw_docs)
+
+    report("embedding", chunks_done=0, chunks_total=len(chunks))
+
+    # Save to vector store (unchanged chunks are skipped, removed ones deleted)
+    chunk_ids = save_vector_store(
+        chunks,
+        collection_name=collection_name,
+        source=source,
+        progress=lambda done, total: report("embedding", chunks_done=done, chunks_new=total, chunks_total=len(chunks)),
+    )
+    delete_stale_chunks(collection_name, source, chunk_ids)
 
-    print(f"[Ingest] Ingestion complete ✅")
\ No newline at end of file
+    print(f"[Ingest] Ingestion complete ✅")
+    return len(chunks)
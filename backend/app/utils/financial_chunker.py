@@ -0,0 +1,123 @@
+# backend/app/utils/financial_chunker.py
+
+import re
+from typing import Dict, List
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from app import config
+
+YEAR_RE = re.compile(r"\b(19|20)\d{2}\b")
+TABLE_ANSWER_SOURCES = ("table", "table-text")
+
+# --- Standard prose splitter (shared with document_loader) ---
+def get_text_splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config.CHUNK_SIZE,
+        chunk_overlap=config.CHUNK_OVERLAP
+    )
+
+# --- Table serialization: markdown rows, header block repeated on every split ---
+def _cell(value) -> str:
+    return " ".join(str("" if value is None else value).split()).replace("|", "/")
+
+def _markdown_row(row: List) -> str:
+    return "| " + " | ".join(_cell(value) for value in row) + " |"
+
+def _header_rows(rows: List[List]) -> int:
+    """Rows up to (and including) the first one naming a fiscal year form the header."""
+    for i, row in enumerate(rows[:3]):
+        if any(YEAR_RE.search(_cell(value)) for value in row):
+            return i + 1
+    return 1
+
+def table_to_markdown_chunks(rows: List[List], max_chars: int = config.CHUNK_SIZE, title: str = "Table:") -> List[str]:
+    rows = [row for row in rows if row and any(_cell(value) for value in row)]
+    if not rows:
+        return []
+    width = max(len(row) for row in rows)
+    rows = [list(row) + [""] * (width - len(row)) for row in rows]
+
+    split_at = _header_rows(rows)
+    header = "\n".join([title] + [_markdown_row(row) for row in rows[:split_at]] + ["|" + " --- |" * width])
+
+    chunks, lines, size = [], [], len(header)
+    for row in rows[split_at:]:
+        line = _markdown_row(row)
+        if lines and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join([header] + lines))
+            lines, size = [], len(header)
+        lines.append(line)
+        size += len(line) + 1
+    if lines or not chunks:
+        chunks.append("\n".join([header] + lines))
+    return chunks
+
+# --- Paragraphs: consecutive paragraphs packed into chunk-sized groups ---
+def group_paragraphs(paragraphs: List[Dict], max_chars: int = config.CHUNK_SIZE) -> List[Dict]:
+    """`paragraphs` are {"order", "text"}; returns [{"orders": [...], "text": ...}]."""
+    splitter = get_text_splitter()
+    groups, current, size = [], [], 0
+
+    def flush():
+        nonlocal current, size
+        if current:
+            groups.append({"orders": [p["order"] for p in current], "text": "\n\n".join(p["text"] for p in current)})
+        current, size = [], 0
+
+    for paragraph in paragraphs:
+        text = " ".join(str(paragraph.get("text", "")).split())
+        if not text:
+            continue
+        if len(text) > max_chars:
+            # Oversized paragraph: flush, then fall back to the character splitter
+            flush()
+            groups.extend({"orders": [paragraph["order"]], "text": part} for part in splitter.split_text(text))
+            continue
+        if current and size + len(text) + 2 > max_chars:
+            flush()
+        current.append({"order": paragraph["order"], "text": text})
+        size += len(text) + 2
+    flush()
+    return groups
+
+# --- Dataset records → Documents (one per table split, one per paragraph group) ---
+def _documents(texts, metadata):
+    return [Document(page_content=text, metadata=dict(metadata)) for text in texts]
+
+def chunk_tatqa_entry(entry: Dict, source: str) -> List[Document]:
+    """
+    TAT-QA record: {"table": {"uid", "table"}, "paragraphs": [...], "questions": [...]}.
+    Chunks point back at the questions they answer via `question_uids`.
+    """
+    table = entry.get("table") or {}
+    table_uid = table.get("uid", "")
+    questions = entry.get("questions") or []
+    base = {"source": source, "dataset": "tatqa", "doc_uid": table_uid}
+
+    table_questions = [q["uid"] for q in questions if q.get("answer_from") in TABLE_ANSWER_SOURCES]
+    chunks = _documents(
+        table_to_markdown_chunks(table.get("table") or []),
+        {**base, "kind": "table", "question_uids": table_questions},
+    )
+
+    paragraphs = sorted(entry.get("paragraphs") or [], key=lambda p: p.get("order", 0))
+    for group in group_paragraphs(paragraphs):
+        orders = {str(order) for order in group["orders"]}
+        related = [q["uid"] for q in questions if orders & {str(p) for p in q.get("rel_paragraphs") or []}]
+        chunks.extend(_documents([group["text"]], {**base, "kind": "paragraphs", "question_uids": related}))
+    return chunks
+
+def chunk_finqa_entry(entry: Dict, source: str) -> List[Document]:
+    """FinQA record: {"id", "pre_text", "table", "post_text", "qa": {...}}."""
+    entry_id = str(entry.get("id", ""))
+    base = {"source": source, "dataset": "finqa", "doc_uid": entry_id, "question_uids": [entry_id] if entry_id else []}
+
+    chunks = _documents(table_to_markdown_chunks(entry.get("table") or []), {**base, "kind": "table"})
+
+    sentences = list(entry.get("pre_text") or []) + list(entry.get("post_text") or [])
+    paragraphs = [{"order": i, "text": text} for i, text in enumerate(sentences) if text and text.strip() != "."]
+    for group in group_paragraphs(paragraphs):
+        chunks.extend(_documents([group["text"]], {**base, "kind": "paragraphs"}))
+    return chunks
@@ -0,0 +1,62 @@
+# backend/app/utils/financial_entities.py
+
+import re
+from typing import Dict, List, Optional
+
+# Company names we see in the bundled filings / datasets, mapped to tickers
+COMPANY_TICKERS = {
+    "apple": "AAPL",
+    "amazon": "AMZN",
+    "microsoft": "MSFT",
+    "meta": "META",
+    "facebook": "META",
+    "alphabet": "GOOGL",
+    "google": "GOOGL",
+    "tesla": "TSLA",
+    "nvidia": "NVDA",
+    "netflix": "NFLX",
+}
+KNOWN_TICKERS = set(COMPANY_TICKERS.values())
+
+FORM_TYPE_RE = re.compile(r"\b(10|8|20)\s?-?\s?([KQF])\b", re.IGNORECASE)
+YEAR_RE = re.compile(r"\b(?:FY\s?)?((?:19|20)\d{2})\b", re.IGNORECASE)
+SHORT_FISCAL_YEAR_RE = re.compile(r"\bFY\s?'?(\d{2})\b", re.IGNORECASE)
+QUARTER_RE = re.compile(r"\bQ([1-4])\b|\b(first|second|third|fourth)\s+quarter\b", re.IGNORECASE)
+QUARTER_WORDS = {"first": 1, "second": 2, "third": 3, "fourth": 4}
+
+def find_company(text: str) -> Optional[str]:
+    for token in re.findall(r"\b[A-Z]{2,5}\b", text):
+        if token in KNOWN_TICKERS:
+            return token
+    lowered = text.lower()
+    for name, ticker in COMPANY_TICKERS.items():
+        if re.search(rf"\b{name}\b", lowered):
+            return ticker
+    return None
+
+def find_form_type(text: str) -> Optional[str]:
+    match = FORM_TYPE_RE.search(text)
+    if not match:
+        return None
+    return f"{match.group(1)}-{match.group(2).upper()}"
+
+def find_years(text: str) -> List[int]:
+    years = [int(y) for y in YEAR_RE.findall(text)]
+    years += [2000 + int(y) for y in SHORT_FISCAL_YEAR_RE.findall(text)]
+    return sorted(set(years))
+
+def find_quarter(text: str) -> Optional[str]:
+    match = QUARTER_RE.search(text)
+    if not match:
+        return None
+    number = match.group(1) or QUARTER_WORDS[match.group(2).lower()]
+    return f"Q{number}"
+
+# --- Entity constraints for a question: ticker, filing type, fiscal years, quarter ---
+def extract_entities(text: str) -> Dict:
+    return {
+        "company": find_company(text),
+        "form_type": find_form_type(text),
+        "years": find_years(text),
+        "quarter": find_quarter(text),
+    }
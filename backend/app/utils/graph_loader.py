@@ -1,42 +1,151 @@
 # backend/app/utils/graph_loader.py
 
+import re
+import threading
+import time
 from neo4j import GraphDatabase
 from app import config
+from app.utils.ingestion_ledger import make_chunk_id
 
-# --- Neo4j driver ---
-driver = GraphDatabase.driver(
-    config.NEO4J_URI,
-    auth=(config.NEO4J_USER, config.NEO4J_PASSWORD)
-)
+# --- Neo4j driver (connection-pooled; sessions borrow from the pool), created on first use ---
+_driver = None
+_driver_lock = threading.Lock()
+
+def get_driver():
+    global _driver
+    with _driver_lock:
+        if _driver is None:
+            _driver = GraphDatabase.driver(
+                config.NEO4J_URI,
+                auth=(config.NEO4J_USER, config.NEO4J_PASSWORD),
+                max_connection_pool_size=config.NEO4J_MAX_POOL_SIZE,
+                connection_timeout=config.NEO4J_CONNECTION_TIMEOUT_S,
+            )
+        return _driver
+
+def close_driver():
+    global _driver
+    with _driver_lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
 
 # --- Test Neo4j connection ---
 def test_connection():
-    with driver.session() as session:
+    with get_driver().session() as session:
         result = session.run("RETURN 1 AS result")
         value = result.single()["result"]
         print(f"[Neo4j] Test connection successful: {value}")
 
+# --- Schema: chunk IDs are unique, which keeps MERGE-based ingestion idempotent ---
+_constrained_drivers = set()
+
+def ensure_chunk_constraint(graph_driver=None):
+    graph_driver = graph_driver or get_driver()
+    if id(graph_driver) in _constrained_drivers:
+        return
+    with graph_driver.session() as session:
+        session.run("""
+            CREATE CONSTRAINT document_chunk_id IF NOT EXISTS
+            FOR (c:DocumentChunk) REQUIRE c.id IS UNIQUE
+        """)
+    _constrained_drivers.add(id(graph_driver))
+
+def _chunk_to_row(chunk, source, collection_name):
+    if hasattr(chunk, "page_content"):
+        text, extra = chunk.page_content, dict(getattr(chunk, "metadata", {}) or {})
+    elif isinstance(chunk, dict):
+        # SEC summaries arrive flattened ({"text": ..., "company": ..., ...})
+        extra = {k: v for k, v in chunk.items() if k not in ("text", "metadata")}
+        extra.update(chunk.get("metadata", {}) or {})
+        text = chunk.get("text", "")
+    else:
+        text, extra = str(chunk), {}
+
+    row_source = extra.pop("source", None) or source
+    props = {
+        k: v for k, v in extra.items()
+        if isinstance(v, (str, int, float, bool)) or (isinstance(v, list) and all(isinstance(item, str) for item in v))
+    }
+    return {
+        "id": make_chunk_id(collection_name, row_source, text),
+        "text": text,
+        "source": row_source,
+        "props": props,
+    }
+
+def _merge_chunk_rows(tx, rows):
+    tx.run("""
+        UNWIND $rows AS row
+        MERGE (c:DocumentChunk {id: row.id})
+        SET c.text = row.text, c.source = row.source
+        SET c += row.props
+    """, rows=rows)
+
 # --- Ingest chunks into Neo4j as DocumentChunk nodes ---
-def save_chunks_to_neo4j(chunks, source="unknown"):
-    with driver.session() as session:
-        count = 0
-        for chunk in chunks:
-            text = chunk.page_content if hasattr(chunk, "page_content") else chunk
-            session.run("""
-                CREATE (c:DocumentChunk {text: $text, source: $source})
-            """, text=text, source=source)
-            count += 1
-        print(f"[Neo4j] Ingested {count} chunks as 'DocumentChunk' nodes ✅")
-
-# --- Load knowledge graph (for HybridRAG context) ---
-def load_knowledge_graph():
-    print("[Neo4j] Loading knowledge graph...")
-    with driver.session() as session:
-        result = session.run("""
-            MATCH (c:DocumentChunk)
-            RETURN c.text AS text
-            LIMIT 100
+def save_chunks_to_neo4j(chunks, source="unknown", collection_name="default",
+                         batch_size=config.NEO4J_WRITE_BATCH_SIZE, graph_driver=None):
+    """
+    Bulk-write chunks with UNWIND ... MERGE, one explicit write transaction per
+    `batch_size` rows. `graph_driver` only needs `session()` returning an object
+    with `run()` and `execute_write()`, so an in-memory fake can stand in for Neo4j.
+    """
+    graph_driver = graph_driver or get_driver()
+    ensure_chunk_constraint(graph_driver)
+
+    rows = [_chunk_to_row(chunk, source, collection_name) for chunk in chunks]
+    start = time.perf_counter()
+
+    with graph_driver.session() as session:
+        for offset in range(0, len(rows), batch_size):
+            session.execute_write(_merge_chunk_rows, rows[offset:offset + batch_size])
+
+    elapsed = time.perf_counter() - start
+    rate = len(rows) / elapsed if elapsed > 0 else 0.0
+    print(f"[Neo4j] Ingested {len(rows)} chunks as 'DocumentChunk' nodes in {elapsed:.2f}s ({rate:.1f} nodes/s) ✅")
+    return len(rows)
+
+# --- Full-text index over chunk text (for query-time KG retrieval) ---
+FULLTEXT_INDEX = "document_chunk_text"
+_indexed_drivers = set()
+
+def ensure_fulltext_index(graph_driver=None):
+    graph_driver = graph_driver or get_driver()
+    if id(graph_driver) in _indexed_drivers:
+        return
+    with graph_driver.session() as session:
+        session.run(f"""
+            CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS
+            FOR (c:DocumentChunk) ON EACH [c.text]
         """)
-        nodes = [record["text"] for record in result]
-    print(f"[Neo4j] Loaded {len(nodes)} nodes from graph ✅")
-    return nodes
\ No newline at end of file
+    _indexed_drivers.add(id(graph_driver))
+
+LUCENE_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from", "how",
+    "in", "is", "it", "its", "much", "of", "on", "or", "the", "to", "was", "were", "what",
+    "when", "which", "who", "why", "with",
+}
+
+def _to_lucene_query(text):
+    # Plain OR of the question's terms; punctuation ("-", quotes) is dropped and terms are
+    # lowercased so words like AND / NOT / TO in a question aren't read as Lucene operators
+    terms = [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in LUCENE_STOPWORDS]
+    return " OR ".join(terms)
+
+# --- Top-k DocumentChunk nodes for a question, optionally narrowed by company / form type ---
+def search_knowledge_graph(query, k=config.KG_TOP_K, company=None, form_type=None, graph_driver=None):
+    lucene_query = _to_lucene_query(query)
+    if not lucene_query:
+        return []
+
+    graph_driver = graph_driver or get_driver()
+    with graph_driver.session() as session:
+        # Chunks without company/form_type (FinQA, TAT-QA, uploads) are never filtered out
+        result = session.run(f"""
+            CALL db.index.fulltext.queryNodes('{FULLTEXT_INDEX}', $terms) YIELD node, score
+            WHERE ($company IS NULL OR node.company IS NULL OR node.company = $company)
+              AND ($form_type IS NULL OR node.form_type IS NULL OR node.form_type = $form_type)
+            RETURN node.id AS id, node.text AS text, node.source AS source, score
+            LIMIT $k
+        """, terms=lucene_query, company=company, form_type=form_type, k=k)
+        return [record.data() for record in result]
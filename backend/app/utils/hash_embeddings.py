@@ -0,0 +1,40 @@
+# backend/app/utils/hash_embeddings.py
+
+import hashlib
+import re
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic feature-hashing embedder (unigrams + bigrams, signed buckets,
+    L2-normalized). No model server needed: used by offline benchmarks so they
+    run anywhere and give repeatable numbers.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _bucket(self, feature: str):
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimension, 1.0 if (value >> 63) & 1 else -1.0
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = TOKEN_RE.findall(text.lower())
+        vector = np.zeros(self.dimension, dtype="float32")
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            index, sign = self._bucket(feature)
+            vector[index] += sign
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
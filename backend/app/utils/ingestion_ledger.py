@@ -0,0 +1,120 @@
+# backend/app/utils/ingestion_ledger.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Set
+
+from app import config
+
+# --- Deterministic chunk IDs ---
+def make_chunk_id(collection_name: str, source: str, text: str) -> str:
+    digest = hashlib.sha256(f"{source}\x00{text}".encode("utf-8")).hexdigest()
+    return f"{collection_name}_{digest[:32]}"
+
+def file_hash(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# --- Per-collection record of which sources and chunk IDs are already stored ---
+class IngestionLedger:
+    def __init__(self, collection_name: str, directory: str = config.INGESTION_LEDGER_DIR):
+        self.collection_name = collection_name
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{collection_name}.sqlite3")
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (chunk_id, source)
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source);
+            CREATE TABLE IF NOT EXISTS sources (
+                source TEXT PRIMARY KEY,
+                file_hash TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+        """)
+        self._conn.commit()
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _bump_version(self):
+        self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def known_ids(self, chunk_ids: Iterable[str]) -> Set[str]:
+        chunk_ids = list(chunk_ids)
+        known = set()
+        with self._lock:
+            for start in range(0, len(chunk_ids), 500):
+                part = chunk_ids[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT chunk_id FROM chunks WHERE chunk_id IN ({placeholders})", part
+                ).fetchall()
+                known.update(row[0] for row in rows)
+        return known
+
+    def ids_for_source(self, source: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT chunk_id FROM chunks WHERE source = ?", (source,)).fetchall()
+        return {row[0] for row in rows}
+
+    def record(self, ids_by_source: Dict[str, Iterable[str]]):
+        now = time.time()
+        rows = [(chunk_id, source, now) for source, ids in ids_by_source.items() for chunk_id in ids]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO chunks (chunk_id, source, stored_at) VALUES (?, ?, ?)", rows)
+            self._bump_version()
+            self._conn.commit()
+
+    def forget(self, source: str, chunk_ids: Iterable[str]):
+        rows = [(chunk_id, source) for chunk_id in chunk_ids]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ? AND source = ?", rows)
+            self._bump_version()
+            self._conn.commit()
+
+    # --- Whole-file bookkeeping (lets pipelines skip unchanged inputs entirely) ---
+    def source_hash(self, source: str):
+        with self._lock:
+            row = self._conn.execute("SELECT file_hash FROM sources WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def mark_source(self, source: str, content_hash: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (source, file_hash, updated_at) VALUES (?, ?, ?)",
+                (source, content_hash, time.time()),
+            )
+            self._conn.commit()
+
+_ledgers: Dict[str, IngestionLedger] = {}
+_ledgers_lock = threading.Lock()
+
+def get_ledger(collection_name: str) -> IngestionLedger:
+    with _ledgers_lock:
+        if collection_name not in _ledgers:
+            _ledgers[collection_name] = IngestionLedger(collection_name)
+        return _ledgers[collection_name]
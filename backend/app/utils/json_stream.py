@@ -0,0 +1,93 @@
+# backend/app/utils/json_stream.py
+
+import json
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+from app import config
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+# --- Incremental reader for a top-level JSON array: one element at a time, bounded memory ---
+def iter_json_array(file_path: str, offset: int = 0, limit: int = None, chunk_size: int = config.JSON_READ_CHUNK_SIZE) -> Iterator:
+    """
+    Yield the elements of a file shaped like `[{...}, {...}, ...]` without
+    loading it whole. Only the current element (plus one read chunk) is held in
+    memory. `offset` skips elements, `limit` stops after that many.
+    """
+    stop = None if limit is None else offset + limit
+    with open(file_path, "r", encoding="utf-8") as f:
+        buffer, position, index = "", 0, 0
+        eof = False
+
+        def fill():
+            nonlocal buffer, position, eof
+            data = f.read(chunk_size)
+            if not data:
+                eof = True
+            buffer = buffer[position:] + data
+            position = 0
+
+        def skip_whitespace():
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in _WHITESPACE:
+                    position += 1
+                if position < len(buffer) or eof:
+                    return
+                fill()
+
+        skip_whitespace()
+        if position >= len(buffer) or buffer[position] != "[":
+            raise ValueError(f"{file_path} does not contain a top-level JSON array")
+        position += 1
+
+        while stop is None or index < stop:
+            skip_whitespace()
+            if position >= len(buffer):
+                raise ValueError(f"Unexpected end of file in {file_path}")
+            if buffer[position] == "]":
+                return
+            # Every element after the first must be preceded by exactly one ","
+            if index > 0:
+                if buffer[position] != ",":
+                    raise ValueError(f"Expected ',' or ']' at offset {position} in {file_path}")
+                position += 1
+                skip_whitespace()
+
+            # Grow the buffer until a whole element decodes
+            while True:
+                try:
+                    item, end = _decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()
+                    continue
+
+                # A number split across reads decodes short ("12" of "123", "123" of "123.45"): it is
+                # complete only once the next non-whitespace character is "," or "]"
+                if isinstance(item, (int, float)) and not isinstance(item, bool):
+                    following = end
+                    while following < len(buffer) and buffer[following] in _WHITESPACE:
+                        following += 1
+                    if following >= len(buffer) or buffer[following] not in ",]":
+                        if eof:
+                            raise ValueError(f"Malformed number at offset {position} in {file_path}")
+                        fill()
+                        continue
+                break
+
+            position = end
+            if index >= offset:
+                yield item
+            index += 1
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
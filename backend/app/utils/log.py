@@ -0,0 +1,39 @@
+# backend/app/utils/log.py
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+
+from app import config
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+_listener = None
+_configure_lock = threading.Lock()
+
+def configure_logging(level: str = config.LOG_LEVEL):
+    """
+    Request threads only enqueue records; formatting and writing happen on a
+    listener thread, so logging on the hot path costs a queue put. Idempotent.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        records = queue.SimpleQueue()
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger("app")
+        root.addHandler(logging.handlers.QueueHandler(records))
+        root.setLevel(level.upper())
+        root.propagate = False
+
+def get_logger(name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,46 @@
+# backend/app/utils/metadata_filters.py
+
+from typing import Dict, Iterator, List, Optional
+
+# Chunk metadata fields the query path can filter on, most to least specific
+FILTER_FIELDS = ("fiscal_quarter", "fiscal_year", "form_type", "company")
+
+# --- Question entities (see financial_entities.extract_entities) → field constraints ---
+def filters_from_entities(entities: Dict) -> Dict[str, List]:
+    filters = {}
+    if entities.get("company"):
+        filters["company"] = [entities["company"]]
+    if entities.get("form_type"):
+        filters["form_type"] = [entities["form_type"]]
+    if entities.get("years"):
+        filters["fiscal_year"] = list(entities["years"])
+    if entities.get("quarter"):
+        filters["fiscal_quarter"] = [entities["quarter"]]
+    return filters
+
+def relaxations(filters: Dict[str, List]) -> Iterator[Dict[str, List]]:
+    """The full filter first, then dropping the most specific field each step, ending unfiltered."""
+    current = dict(filters)
+    yield dict(current)
+    for field in FILTER_FIELDS:
+        if field in current:
+            del current[field]
+            yield dict(current)
+    if current:
+        yield {}
+
+def indexable_fields(metadata: Optional[Dict]) -> Dict[str, str]:
+    """Filterable fields of a chunk, values as strings (2019 and "2019" match alike)."""
+    metadata = metadata or {}
+    return {field: str(metadata[field]) for field in FILTER_FIELDS if metadata.get(field) not in (None, "")}
+
+def to_pinecone_filter(filters: Dict[str, List]) -> Optional[Dict]:
+    clauses = []
+    for field, values in filters.items():
+        # The SEC pipeline stores fiscal years as ints
+        if field == "fiscal_year":
+            values = [int(v) for v in values]
+        clauses.append({field: {"$in": list(values)}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
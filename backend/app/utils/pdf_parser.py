@@ -0,0 +1,95 @@
+# backend/app/utils/pdf_parser.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List
+
+import pdfplumber
+
+from app import config
+
+# --- Worker: parse a contiguous range of pages (text + tables in one pass per page) ---
+def _parse_page_range(file_path: str, start: int, end: int) -> List[Dict]:
+    results = []
+    with pdfplumber.open(file_path) as pdf:
+        for number in range(start, end):
+            page = pdf.pages[number]
+            tables = []
+            for position, table in enumerate(page.find_tables()):
+                tables.append({"rows": table.extract(), "position": position, "bbox": list(table.bbox)})
+            results.append({
+                "page": number + 1,
+                "text": page.extract_text() or "",
+                "tables": tables,
+            })
+            # pdfplumber caches layout objects per page; drop them once we're done
+            page.flush_cache()
+    return results
+
+def count_pages(file_path: str) -> int:
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+# --- Shared worker pool ---
+# One long-lived pool per worker count instead of one per PDF. Workers are
+# spawned, not forked: the API process runs threads (ingestion workers, the
+# Neo4j driver, model loaders) and forking it can copy a held lock into a child.
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _worker_count(workers: int = None) -> int:
+    return workers or config.PDF_PARSE_WORKERS or os.cpu_count() or 1
+
+def get_pool(workers: int = None) -> ProcessPoolExecutor:
+    workers = _worker_count(workers)
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pools[workers]
+
+def _ready() -> int:
+    return os.getpid()
+
+def warm_pool(workers: int = None):
+    """Start the pool's processes (and their pdfplumber import) ahead of the first PDF."""
+    workers = _worker_count(workers)
+    pool = get_pool(workers)
+    return [pool.submit(_ready) for _ in range(workers)]
+
+def shutdown_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(cancel_futures=True)
+
+# --- Stream parsed pages as shards finish (not necessarily in page order) ---
+def iter_pdf_pages(file_path: str, workers: int = None, pages_per_task: int = config.PDF_PAGES_PER_TASK) -> Iterator[Dict]:
+    workers = _worker_count(workers)
+    total = count_pages(file_path)
+    ranges = [(start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task)]
+
+    # Small documents aren't worth the process start-up cost
+    if workers == 1 or len(ranges) == 1:
+        for start, end in ranges:
+            yield from _parse_page_range(file_path, start, end)
+        return
+
+    pool = get_pool(workers)
+    futures = [pool.submit(_parse_page_range, file_path, start, end) for start, end in ranges]
+    try:
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        # A consumer that stops early shouldn't leave its shards queued on the shared pool
+        for future in futures:
+            future.cancel()
+
+def parse_pdf(file_path: str, workers: int = None) -> List[Dict]:
+    pages = sorted(iter_pdf_pages(file_path, workers=workers), key=lambda page: page["page"])
+    print(f"[PDFParser] Parsed {len(pages)} pages from {file_path}")
+    return pages
@@ -0,0 +1,194 @@
+# backend/app/utils/table_cache.py
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from app import config
+from app.utils.ingestion_ledger import file_hash
+from app.utils.vector_store import get_embeddings
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_FILE = "index.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+TERM_RE = re.compile(r"[a-z0-9]+")
+
+def _terms(text: str):
+    return TERM_RE.findall(text.lower())
+
+# --- DataFrame helpers (pdfplumber gives ragged rows with None headers) ---
+def table_to_dataframe(rows):
+    rows = [[("" if cell is None else str(cell)) for cell in row] for row in rows if row]
+    if not rows:
+        return pd.DataFrame()
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+
+    header, seen = [], Counter()
+    for i, name in enumerate(rows[0]):
+        name = " ".join(name.split()) or f"col_{i}"
+        seen[name] += 1
+        header.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return pd.DataFrame(rows[1:], columns=header)
+
+def tables_from_pages(pages):
+    """Turn parsed PDF pages (see pdf_parser) into table entries, in page order."""
+    tables = []
+    for page in sorted(pages, key=lambda p: p["page"]):
+        for table in page["tables"]:
+            df = table_to_dataframe(table["rows"])
+            if df.empty:
+                continue
+            tables.append({"df": df, "page": page["page"], "position": table["position"], "bbox": table["bbox"]})
+    return tables
+
+def describe_table(df: pd.DataFrame) -> str:
+    """Header + row labels: what the index matches questions against."""
+    row_labels = df.iloc[:, 0].tolist() if df.shape[1] else []
+    return " ".join(list(df.columns) + [str(label) for label in row_labels])
+
+# --- Per-file table store: Parquet per table + index.json (+ optional embeddings) ---
+class TableCache:
+    def __init__(self, directory: str = config.TABLE_CACHE_DIR, memory_items: int = 16):
+        self.directory = directory
+        self.memory_items = memory_items
+        self._hashes = {}                # (path, mtime, size) -> content hash
+        self._loaded = OrderedDict()     # content hash -> list of table entries
+        self._lock = threading.Lock()
+
+    def content_hash(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key not in self._hashes:
+                self._hashes[key] = file_hash(file_path)
+            return self._hashes[key]
+
+    def _dir_for(self, content_hash: str) -> str:
+        return os.path.join(self.directory, content_hash)
+
+    def _remember(self, content_hash: str, tables):
+        with self._lock:
+            self._loaded[content_hash] = tables
+            self._loaded.move_to_end(content_hash)
+            while len(self._loaded) > self.memory_items:
+                self._loaded.popitem(last=False)
+
+    def get(self, file_path: str):
+        """Cached tables for this file's current content, or None if never extracted."""
+        content_hash = self.content_hash(file_path)
+        with self._lock:
+            if content_hash in self._loaded:
+                self._loaded.move_to_end(content_hash)
+                return self._loaded[content_hash]
+
+        table_dir = self._dir_for(content_hash)
+        index_path = os.path.join(table_dir, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return None
+
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        embeddings_path = os.path.join(table_dir, EMBEDDINGS_FILE)
+        vectors = np.load(embeddings_path) if os.path.exists(embeddings_path) else None
+
+        tables = []
+        for i, meta in enumerate(index["tables"]):
+            entry = dict(meta)
+            entry["df"] = pd.read_parquet(os.path.join(table_dir, meta["file"]))
+            entry["embedding"] = vectors[i] if vectors is not None else None
+            tables.append(entry)
+
+        self._remember(content_hash, tables)
+        logger.debug("Loaded %d cached tables for %s", len(tables), file_path)
+        return tables
+
+    def put(self, file_path: str, tables):
+        """
+        Persist extracted tables. `tables` is a list of dicts with `df`, `page`,
+        `position` and optional `bbox`; returns them enriched with index fields.
+        """
+        content_hash = self.content_hash(file_path)
+        table_dir = self._dir_for(content_hash)
+        os.makedirs(table_dir, exist_ok=True)
+
+        index = {"source": file_path, "content_hash": content_hash, "tables": []}
+        descriptions = []
+        for i, table in enumerate(tables):
+            df = table["df"]
+            name = f"table_{i:04d}.parquet"
+            df.to_parquet(os.path.join(table_dir, name), index=False)
+
+            description = describe_table(df)
+            descriptions.append(description)
+            table.update({
+                "file": name,
+                "shape": list(df.shape),
+                "columns": list(df.columns),
+                "terms": sorted(set(_terms(description))),
+            })
+            index["tables"].append({k: v for k, v in table.items() if k not in ("df", "embedding")})
+
+        vectors = self._embed(descriptions)
+        if vectors is not None:
+            np.save(os.path.join(table_dir, EMBEDDINGS_FILE), vectors)
+        for i, table in enumerate(tables):
+            table["embedding"] = vectors[i] if vectors is not None else None
+
+        # Write the index last: its presence marks the cache entry as complete
+        with open(os.path.join(table_dir, INDEX_FILE), "w") as f:
+            json.dump(index, f)
+
+        self._remember(content_hash, tables)
+        logger.info("Cached %d tables for %s in %s", len(tables), file_path, table_dir)
+        return tables
+
+    def _embed(self, descriptions):
+        if not descriptions:
+            return None
+        try:
+            return np.asarray(get_embeddings().embed_documents(descriptions), dtype="float32")
+        except Exception as e:
+            # Term matching still works without embeddings
+            logger.warning("Could not embed table descriptions: %s", e)
+            return None
+
+# --- Pick the table(s) that best match a question (term overlap + embedding similarity) ---
+def select_tables(question: str, tables, top_n: int = config.TABLE_QA_TOP_TABLES):
+    if len(tables) <= top_n:
+        return list(tables)
+
+    question_terms = set(_terms(question))
+    doc_freq = Counter(term for table in tables for term in table["terms"])
+    idf = {term: math.log(1 + len(tables) / doc_freq[term]) for term in question_terms if doc_freq[term]}
+
+    query_vector = None
+    if any(table.get("embedding") is not None for table in tables):
+        try:
+            query_vector = np.asarray(get_embeddings().embed_query(question), dtype="float32")
+        except Exception as e:
+            logger.warning("Question embedding failed, using term overlap only: %s", e)
+
+    max_idf = sum(idf.values()) or 1.0
+    scored = []
+    for i, table in enumerate(tables):
+        lexical = sum(idf.get(term, 0.0) for term in question_terms & set(table["terms"])) / max_idf
+        semantic = 0.0
+        vector = table.get("embedding")
+        if query_vector is not None and vector is not None:
+            denom = float(np.linalg.norm(query_vector) * np.linalg.norm(vector)) or 1.0
+            semantic = float(np.dot(query_vector, vector)) / denom
+        scored.append((lexical + semantic, -i, table))
+
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    return [table for _, _, table in scored[:top_n]]
+
+table_cache = TableCache()
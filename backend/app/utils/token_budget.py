@@ -0,0 +1,34 @@
+# backend/app/utils/token_budget.py
+
+from typing import List
+
+# Rough token estimate (~4 characters per token for English / financial text).
+# Good enough for budgeting prompt context without loading a tokenizer.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    # Cut on a word boundary so we don't hand the LLM half a number
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut
+
+def take_within_budget(texts: List[str], max_tokens: int) -> List[str]:
+    """Keep texts in order until the budget is spent; the last one may be truncated."""
+    kept, used = [], 0
+    for text in texts:
+        remaining = max_tokens - used
+        if remaining <= 0:
+            break
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            text = truncate_to_tokens(text, remaining)
+            tokens = estimate_tokens(text)
+        if text:
+            kept.append(text)
+            used += tokens
+    return kept
@@ -0,0 +1,115 @@
+# backend/app/utils/tracing.py
+
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.utils import metrics
+from app.utils.log import get_logger
+
+logger = get_logger("app.trace")
+
+# --- Pipeline metrics exported on /metrics ---
+REQUEST_SECONDS = metrics.histogram("rag_request_seconds", "End-to-end request latency", ("endpoint", "status"))
+STAGE_SECONDS = metrics.histogram("rag_stage_seconds", "Latency of each pipeline stage", ("endpoint", "stage"))
+TOKENS = metrics.counter("rag_tokens_total", "Estimated prompt and completion tokens sent to / produced by the LLM", ("endpoint", "kind"))
+RETRIEVED = metrics.counter("rag_retrieved_total", "Passages retrieved (vector chunks and KG nodes)", ("endpoint", "kind"))
+CACHE = metrics.counter("rag_cache_total", "Cache lookups by outcome", ("cache", "result"))
+
+# Span attributes that feed counters as well as the span log line
+_TOKEN_ATTRIBUTES = {"prompt_tokens": "prompt", "completion_tokens": "completion"}
+_RETRIEVAL_ATTRIBUTES = {"docs": "chunk", "kg_nodes": "kg"}
+
+def _logfmt(fields: Dict) -> str:
+    return " ".join(f"{key}={value}" for key, value in fields.items() if value is not None)
+
+def record_cache(cache: str, hit: bool):
+    CACHE.inc(cache=cache, result="hit" if hit else "miss")
+
+# --- Listeners get every finished span / request as a dict (benchmarks collect raw timings this way) ---
+_listeners = []
+
+def add_listener(listener):
+    _listeners.append(listener)
+
+def remove_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+def _notify(event: Dict):
+    for listener in list(_listeners):
+        listener(event)
+
+class Trace:
+    """
+    One request: an ID plus timed spans for its stages. Every span is
+    observed in the stage latency histogram and logged as a logfmt line
+    (request_id, stage, duration_ms and whatever attributes the stage set:
+    token counts, docs retrieved, cache hits); `finish` records the request.
+    """
+
+    def __init__(self, endpoint: str, request_id: str = None):
+        self.endpoint = endpoint
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self._finished = False
+
+    @contextmanager
+    def span(self, stage: str):
+        attributes = {}
+        started = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+            STAGE_SECONDS.observe(elapsed, endpoint=self.endpoint, stage=stage)
+            for key, kind in _TOKEN_ATTRIBUTES.items():
+                if attributes.get(key):
+                    TOKENS.inc(attributes[key], endpoint=self.endpoint, kind=kind)
+            for key, kind in _RETRIEVAL_ATTRIBUTES.items():
+                if attributes.get(key):
+                    RETRIEVED.inc(attributes[key], endpoint=self.endpoint, kind=kind)
+            logger.info("span %s", _logfmt({
+                "request_id": self.request_id, "endpoint": self.endpoint, "stage": stage,
+                "duration_ms": round(elapsed * 1000, 2), **attributes,
+            }))
+            if _listeners:
+                _notify({"type": "span", "request_id": self.request_id, "endpoint": self.endpoint,
+                         "stage": stage, "seconds": elapsed, **attributes})
+
+    def finish(self, status: str = "ok", **attributes):
+        if self._finished:
+            return
+        self._finished = True
+        with _active_lock:
+            _active.pop(self.request_id, None)
+        elapsed = time.perf_counter() - self.started
+        REQUEST_SECONDS.observe(elapsed, endpoint=self.endpoint, status=status)
+        logger.info("request %s", _logfmt({
+            "request_id": self.request_id, "endpoint": self.endpoint, "status": status,
+            "duration_ms": round(elapsed * 1000, 2), **attributes,
+            **{f"{stage}_ms": round(seconds * 1000, 2) for stage, seconds in self.stages.items()},
+        }))
+        if _listeners:
+            _notify({"type": "request", "request_id": self.request_id, "endpoint": self.endpoint,
+                     "status": status, "seconds": elapsed, **attributes})
+
+# --- Traces in flight, so graph nodes can find theirs from the request ID carried in the messages ---
+_active: Dict[str, Trace] = {}
+_active_lock = threading.Lock()
+
+def start_trace(endpoint: str) -> Trace:
+    trace = Trace(endpoint)
+    with _active_lock:
+        _active[trace.request_id] = trace
+    return trace
+
+def get_trace(request_id: Optional[str], endpoint: str = "untraced") -> Trace:
+    """The active trace for `request_id`; a detached one (metrics only) if there is none."""
+    with _active_lock:
+        trace = _active.get(request_id) if request_id else None
+    return trace or Trace(endpoint, request_id)
@@ -1,106 +1,485 @@
 # app/utils/vector_store.py
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pinecone import Pinecone, ServerlessSpec
 import json
+import faiss
+import numpy as np
 from app import config
 from langchain_core.documents import Document
 from langchain_pinecone import PineconeVectorStore
 from langchain_ollama import OllamaEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from app.utils.embedding_cache import CachedEmbeddings, EmbeddingCache
+from app.utils.ingestion_ledger import get_ledger, make_chunk_id
+from app.utils.bm25_index import get_sparse_index
+from app.utils.metadata_filters import to_pinecone_filter
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Files that make up a persisted local collection
+VECTORS_FILE = "vectors.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+INDEX_FILE = "index.faiss"
+MANIFEST_FILE = "manifest.json"
 
 # Initialize Pinecone client
 def get_pinecone_index():
     pc = Pinecone(api_key=config.PINECONE_API_KEY)
     return pc.Index(config.PINECONE_INDEX_NAME)
 
-# Save documents into Pinecone (with server-side embedding)
-def save_vector_store(chunks, collection_name="default", batch_size=96):
-    print(f"[VectorStore] Received {len(chunks)} chunks.")
-
-    if len(chunks) > 1000:
-        # Save locally as fallback
-        local_dir = f"./local_vectors/{collection_name}"
-        os.makedirs(local_dir, exist_ok=True)
-        local_path = os.path.join(local_dir, "vectors.json")
-
-        local_data = []
-        for i, chunk in enumerate(chunks):
-            if hasattr(chunk, "page_content"):
-                text = chunk.page_content
-                metadata = chunk.metadata if hasattr(chunk, "metadata") else {}
-            elif isinstance(chunk, dict):
-                text = chunk.get("text", "")
-                metadata = chunk.get("metadata", {})
-            else:
-                text = str(chunk)
-                metadata = {}
-
-            local_data.append({
-                "id": f"{collection_name}_{i}",
-                "text": text,
-                "metadata": metadata,
-            })
+# Shared Ollama embedding client, wrapped in the on-disk embedding cache
+_embeddings = None
+
+def get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = CachedEmbeddings(
+            OllamaEmbeddings(model=config.OLLAMA_EMBEDDING_MODEL, base_url=config.OLLAMA_BASE_URL),
+            model_name=config.OLLAMA_EMBEDDING_MODEL,
+            cache=EmbeddingCache(),
+        )
+    return _embeddings
+
+def get_local_dir(collection_name="default"):
+    return os.path.join(config.LOCAL_VECTORS_DIR, collection_name)
+
+# --- Normalize a chunk (Document / dict / str) into (text, metadata) ---
+def _chunk_to_record(chunk):
+    if hasattr(chunk, "page_content"):
+        return chunk.page_content, (chunk.metadata if hasattr(chunk, "metadata") else {})
+    if isinstance(chunk, dict):
+        return chunk.get("text", ""), chunk.get("metadata", {})
+    return str(chunk), {}
+
+# --- Retry helper for embedding / upsert calls ---
+def _with_retries(fn, label, retries=config.WRITE_RETRIES):
+    for attempt in range(1, retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            logger.warning("%s failed (attempt %d/%d): %s", label, attempt, retries, e)
+            if attempt == retries:
+                raise
+            time.sleep(2 ** (attempt - 1))
+
+# --- Pipelined writer: embed batch N+1 while batch N is being written ---
+def _pipelined_write(texts, sink, batch_size=config.EMBEDDING_BATCH_SIZE, workers=config.EMBEDDING_WORKERS, progress=None):
+    """
+    Embed `texts` in batches on a bounded worker pool and hand each batch to
+    `sink(start, vectors)` on a single writer thread, in order. A batch that
+    still fails after retries is reported and skipped; the others continue.
+    `progress(done, total)` is called after every written batch.
+    Returns the list of failed (start, end) ranges.
+    """
+    embeddings = get_embeddings()
+    ranges = [(start, min(start + batch_size, len(texts))) for start in range(0, len(texts), batch_size)]
+    failed = []
+    started = time.perf_counter()
+    done = [0]
+
+    def embed(start, end):
+        return _with_retries(lambda: embeddings.embed_documents(texts[start:end]), f"Embedding batch {start}-{end}")
+
+    def write(start, end, vectors):
+        _with_retries(lambda: sink(start, vectors), f"Writing batch {start}-{end}")
+        done[0] += end - start
+        if progress:
+            progress(done[0], len(texts))
+        return end - start
+
+    with ThreadPoolExecutor(max_workers=workers) as embed_pool, ThreadPoolExecutor(max_workers=1) as write_pool:
+        # Keep at most `workers` batches embedding ahead of the writer to bound memory
+        pending = [embed_pool.submit(embed, *r) for r in ranges[:workers]]
+        writes = []
+        next_batch = len(pending)
+
+        for i, (start, end) in enumerate(ranges):
+            try:
+                vectors = pending[i].result()
+                writes.append(((start, end), write_pool.submit(write, start, end, vectors)))
+            except Exception:
+                failed.append((start, end))
+
+            if next_batch < len(ranges):
+                pending.append(embed_pool.submit(embed, *ranges[next_batch]))
+                next_batch += 1
+
+        written = 0
+        for (start, end), future in writes:
+            try:
+                written += future.result()
+            except Exception:
+                failed.append((start, end))
+
+    elapsed = time.perf_counter() - started
+    rate = written / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        "Wrote %d/%d chunks in %d batches (%.2fs, %.1f chunks/s, %d failed batches)",
+        written, len(texts), len(ranges), elapsed, rate, len(failed),
+    )
+    return sorted(failed)
+
+# --- Local FAISS persistence ---
+def _build_manifest(dimension, count):
+    return {
+        "embedding_model": config.OLLAMA_EMBEDDING_MODEL,
+        "dimension": int(dimension),
+        "count": int(count),
+        "index_type": "IndexFlatL2",
+        "created_at": time.time(),
+    }
+
+def _manifest_matches(manifest, count):
+    return (
+        manifest.get("embedding_model") == config.OLLAMA_EMBEDDING_MODEL
+        and manifest.get("count") == count
+        and manifest.get("dimension", 0) > 0
+    )
+
+def _replace_file(path, write):
+    """Write to a temp file and swap it in, so readers (and live mmaps) never see a half-written file."""
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def _save_matrix(path, matrix):
+    def write(tmp_path):
+        # A file object, so np.save doesn't append ".npy" to the temp name
+        with open(tmp_path, "wb") as f:
+            np.save(f, matrix)
+    _replace_file(path, write)
+
+def _write_index_file(local_dir, matrix):
+    index = faiss.IndexFlatL2(matrix.shape[1])
+    index.add(matrix)
+    _replace_file(os.path.join(local_dir, INDEX_FILE), lambda tmp_path: faiss.write_index(index, tmp_path))
+
+def _write_local_index(local_dir, vectors):
+    """Write embeddings, a serialized FAISS index and its manifest next to vectors.json."""
+    matrix = np.ascontiguousarray(vectors, dtype="float32")
+    if matrix.ndim != 2 or matrix.shape[0] == 0:
+        raise ValueError("Cannot build a FAISS index from an empty embedding matrix")
+
+    _save_matrix(os.path.join(local_dir, EMBEDDINGS_FILE), matrix)
+    _write_index_file(local_dir, matrix)
+
+    manifest = _build_manifest(matrix.shape[1], matrix.shape[0])
+
+    def write_manifest(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+    _replace_file(os.path.join(local_dir, MANIFEST_FILE), write_manifest)
+    return manifest
+
+def _read_local_index(local_dir):
+    index_path = os.path.join(local_dir, INDEX_FILE)
+    try:
+        return faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Older FAISS builds can't mmap flat indexes; fall back to a regular read
+        return faiss.read_index(index_path)
+
+def _load_manifest(local_dir):
+    manifest_path = os.path.join(local_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+def _rebuild_local_index(local_dir, texts, embeddings):
+    """Recover index + manifest, re-embedding only when stored vectors are unusable."""
+    manifest = _load_manifest(local_dir) or {}
+    embeddings_path = os.path.join(local_dir, EMBEDDINGS_FILE)
+
+    if _manifest_matches(manifest, len(texts)) and os.path.exists(embeddings_path):
+        # The stored vectors and manifest are still valid: only index.faiss needs rebuilding
+        logger.info("Rebuilding FAISS index from stored embeddings in %s", local_dir)
+        matrix = np.ascontiguousarray(np.load(embeddings_path), dtype="float32")
+        if matrix.ndim == 2 and matrix.shape == (len(texts), manifest["dimension"]):
+            _write_index_file(local_dir, matrix)
+            return _read_local_index(local_dir)
+        logger.warning("Stored embeddings have shape %s, re-embedding", matrix.shape)
+
+    logger.warning("Manifest missing or stale, re-embedding %d chunks", len(texts))
+    _write_local_index(local_dir, embeddings.embed_documents(texts))
+    return _read_local_index(local_dir)
+
+def _read_local_data(local_dir):
+    local_path = os.path.join(local_dir, VECTORS_FILE)
+    if not os.path.exists(local_path):
+        return []
+    with open(local_path, "r") as f:
+        return json.load(f)
+
+def _stored_local_vectors(local_dir, data, embeddings):
+    """Embeddings for the rows already in vectors.json (from disk, or the embedding cache)."""
+    if not data:
+        return np.zeros((0, 0), dtype="float32")
+    manifest = _load_manifest(local_dir) or {}
+    embeddings_path = os.path.join(local_dir, EMBEDDINGS_FILE)
+    if _manifest_matches(manifest, len(data)) and os.path.exists(embeddings_path):
+        # A real in-memory copy: the caller rewrites embeddings.npy from it
+        return np.array(np.load(embeddings_path))
+    return np.asarray(embeddings.embed_documents([item["text"] for item in data]), dtype="float32")
+
+def _write_local_collection(local_dir, data, vectors):
+    with open(os.path.join(local_dir, VECTORS_FILE), "w") as f:
+        json.dump(data, f, indent=2)
+    return _write_local_index(local_dir, vectors)
+
+def _save_local_collection(records, collection_name, progress=None):
+    """Append new (id, text, metadata) records to the local collection; returns the IDs written."""
+    local_dir = get_local_dir(collection_name)
+    os.makedirs(local_dir, exist_ok=True)
+
+    existing = _read_local_data(local_dir)
+    embeddings = get_embeddings()
+    existing_vectors = _stored_local_vectors(local_dir, existing, embeddings)
 
-        with open(local_path, "w") as f:
-            json.dump(local_data, f, indent=2)
+    new_data = [{"id": chunk_id, "text": text, "metadata": metadata} for chunk_id, text, metadata in records]
+    vectors = [None] * len(new_data)
 
-        print(f"[VectorStore] ⚠️ Exceeded chunk limit. Saved {len(local_data)} chunks locally at: {local_path}")
+    def collect(start, batch_vectors):
+        vectors[start:start + len(batch_vectors)] = batch_vectors
+
+    failed = _pipelined_write([item["text"] for item in new_data], collect, progress=progress)
+    if failed:
+        raise RuntimeError(f"Could not embed {len(failed)} batches for local collection '{collection_name}': {failed}")
+
+    new_vectors = np.asarray(vectors, dtype="float32")
+    all_vectors = np.vstack([existing_vectors, new_vectors]) if len(existing) else new_vectors
+    manifest = _write_local_collection(local_dir, existing + new_data, all_vectors)
+
+    logger.info(
+        "Saved %d new chunks locally at %s (collection now %d chunks, FAISS dim=%d)",
+        len(new_data), local_dir, manifest["count"], manifest["dimension"],
+    )
+    logger.debug("Embedding cache: %s", embeddings.report())
+    return [item["id"] for item in new_data]
+
+def _delete_local_chunks(collection_name, chunk_ids):
+    local_dir = get_local_dir(collection_name)
+    existing = _read_local_data(local_dir)
+    if not existing:
         return
 
-    # Else: continue to Pinecone upload
-    print(f"[Pinecone] Saving {len(chunks)} chunks using server-managed embedding with `upsert()`")
+    existing_vectors = _stored_local_vectors(local_dir, existing, get_embeddings())
+    keep = [i for i, item in enumerate(existing) if item["id"] not in chunk_ids]
+    if len(keep) == len(existing):
+        return
+    if not keep:
+        for name in (VECTORS_FILE, EMBEDDINGS_FILE, INDEX_FILE, MANIFEST_FILE):
+            path = os.path.join(local_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+        return
+    _write_local_collection(local_dir, [existing[i] for i in keep], existing_vectors[keep])
+
+def _load_local_collection(collection_name):
+    local_dir = get_local_dir(collection_name)
+    local_path = os.path.join(local_dir, VECTORS_FILE)
+    logger.info("Loading vector store locally from %s", local_path)
+    start = time.perf_counter()
+
+    with open(local_path, "r") as f:
+        data = json.load(f)
+
+    texts = [item["text"] for item in data]
+    embeddings = get_embeddings()
+
+    manifest = _load_manifest(local_dir)
+    index = None
+    if manifest and _manifest_matches(manifest, len(data)) and os.path.exists(os.path.join(local_dir, INDEX_FILE)):
+        index = _read_local_index(local_dir)
+        if index.d != manifest["dimension"] or index.ntotal != len(data):
+            index = None
+    if index is None:
+        index = _rebuild_local_index(local_dir, texts, embeddings)
+
+    docstore = InMemoryDocstore({
+        item["id"]: Document(id=item["id"], page_content=item["text"], metadata=item.get("metadata", {}))
+        for item in data
+    })
+
+    # Collections stored before the sparse index existed: build it once from the stored texts
+    sparse_index = get_sparse_index(collection_name)
+    if not len(sparse_index):
+        sparse_index.add((item["id"], item["text"], item.get("metadata")) for item in data)
+        sparse_index.save()
+        logger.info("Built BM25 index for %d chunks", len(data))
+    index_to_docstore_id = {i: item["id"] for i, item in enumerate(data)}
+
+    store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
+    logger.info("Loaded %d vectors in %.3fs", index.ntotal, time.perf_counter() - start)
+    return store
+
+def _use_local_collection(collection_name, incoming):
+    # Once a collection lives locally, keep writing there so load_vector_store sees every chunk
+    return incoming > 1000 or os.path.exists(os.path.join(get_local_dir(collection_name), VECTORS_FILE))
+
+def _upsert_to_pinecone(records, collection_name, batch_size, progress=None):
+    """Upsert (id, text, metadata) records; returns the IDs that were written."""
+    logger.info("Saving %d chunks to Pinecone in batches of %d", len(records), batch_size)
 
     index = get_pinecone_index()
-    texts = []
-    metadatas = []
+    texts = [text for _, text, _ in records]
+
+    def upsert(start, vectors):
+        batch = []
+        for i, vec in enumerate(vectors, start=start):
+            chunk_id, text, metadata = records[i]
+            batch.append({
+                "id": chunk_id,
+                "values": vec,
+                # PineconeVectorStore reads page_content back from the "text" metadata key
+                "metadata": {**metadata, "text": text},
+            })
+        index.upsert(vectors=batch, namespace=collection_name)
 
+    failed = _pipelined_write(texts, upsert, batch_size=batch_size, progress=progress)
+    failed_rows = {i for start, end in failed for i in range(start, end)}
+    if failed:
+        logger.warning("%d chunks in %d batches were not uploaded: %s", len(failed_rows), len(failed), failed)
+    logger.info("Uploaded %d vectors to Pinecone namespace '%s'", len(records) - len(failed_rows), collection_name)
+    logger.debug("Embedding cache: %s", get_embeddings().report())
+    return [record[0] for i, record in enumerate(records) if i not in failed_rows]
+
+# Save documents into Pinecone (embedded locally with Ollama, upserted in batches)
+def save_vector_store(chunks, collection_name="default", batch_size=config.EMBEDDING_BATCH_SIZE, source=None, progress=None):
+    """
+    Store chunks under content-hash IDs, skipping the ones the ingestion ledger
+    already has. Returns every chunk ID in `chunks` (stored now or before), so
+    callers can pass the full set to `delete_stale_chunks` once a source is done.
+    """
+    logger.debug("Received %d chunks", len(chunks))
+
+    records, sources = {}, {}
     for chunk in chunks:
-        if hasattr(chunk, "page_content"):
-            texts.append(chunk.page_content)
-            metadatas.append(chunk.metadata if hasattr(chunk, "metadata") else {})
-        elif isinstance(chunk, dict):
-            texts.append(chunk.get("text", ""))
-            metadatas.append(chunk.get("metadata", {}))
-        else:
-            texts.append(str(chunk))
-            metadatas.append({})
-
-    embeddings = OllamaEmbeddings(model="nomic-embed-text", base_url="http://localhost:11434")
-    vectors = embeddings.embed_documents(texts)
-
-    batch = []
-    for i, (vec, meta) in enumerate(zip(vectors, metadatas)):
-        batch.append({
-            "id": f"{collection_name}_{i}",
-            "values": vec,
-            "metadata": meta,
-        })
-
-    index.upsert(vectors=batch, namespace=collection_name)
-    print(f"[Pinecone] ✅ Uploaded {len(batch)} vectors to Pinecone namespace '{collection_name}'")
+        text, metadata = _chunk_to_record(chunk)
+        chunk_source = source or metadata.get("source") or "unknown"
+        chunk_id = make_chunk_id(collection_name, chunk_source, text)
+        records[chunk_id] = (chunk_id, text, metadata)
+        sources[chunk_id] = chunk_source
+
+    ledger = get_ledger(collection_name)
+    known = ledger.known_ids(records)
+    new_records = [record for chunk_id, record in records.items() if chunk_id not in known]
+    if known:
+        logger.info("Skipping %d unchanged chunks already in '%s'", len(known), collection_name)
+    if not new_records:
+        return list(records)
+
+    if _use_local_collection(collection_name, len(chunks)):
+        written = _save_local_collection(new_records, collection_name, progress=progress)
+    else:
+        written = _upsert_to_pinecone(new_records, collection_name, batch_size, progress=progress)
+
+    ids_by_source = {}
+    for chunk_id in written:
+        ids_by_source.setdefault(sources[chunk_id], []).append(chunk_id)
+    ledger.record(ids_by_source)
+
+    # Keep the BM25 index in step with what was actually stored
+    sparse_index = get_sparse_index(collection_name)
+    sparse_index.add((chunk_id, records[chunk_id][1], records[chunk_id][2]) for chunk_id in written)
+    sparse_index.save()
+
+    return list(records)
+
+# Remove chunks a source no longer produces (call after the whole source is ingested)
+def delete_stale_chunks(collection_name, source, keep_ids):
+    ledger = get_ledger(collection_name)
+    stale = ledger.ids_for_source(source) - set(keep_ids)
+    if not stale:
+        return 0
+
+    if os.path.exists(os.path.join(get_local_dir(collection_name), VECTORS_FILE)):
+        _delete_local_chunks(collection_name, stale)
+    else:
+        index = get_pinecone_index()
+        stale_ids = sorted(stale)
+        for start in range(0, len(stale_ids), 1000):
+            index.delete(ids=stale_ids[start:start + 1000], namespace=collection_name)
+
+    ledger.forget(source, stale)
+    sparse_index = get_sparse_index(collection_name)
+    sparse_index.remove(stale)
+    sparse_index.save()
+    logger.info("Removed %d stale chunks of '%s' from '%s'", len(stale), source, collection_name)
+    return len(stale)
+
+# --- Look chunks up by ID in whichever store backs the collection (for sparse-only hits) ---
+def fetch_documents(vector_store, collection_name, chunk_ids):
+    if not chunk_ids:
+        return {}
+    if isinstance(vector_store, FAISS):
+        found = {chunk_id: vector_store.docstore.search(chunk_id) for chunk_id in chunk_ids}
+        return {chunk_id: doc for chunk_id, doc in found.items() if isinstance(doc, Document)}
+
+    response = get_pinecone_index().fetch(ids=list(chunk_ids), namespace=collection_name)
+    documents = {}
+    for chunk_id, vector in (getattr(response, "vectors", None) or {}).items():
+        metadata = dict(getattr(vector, "metadata", None) or {})
+        text = metadata.pop("text", "")
+        documents[chunk_id] = Document(id=chunk_id, page_content=text, metadata=metadata)
+    return documents
+
+# --- Dense search narrowed before scoring: FAISS ID selector over a chunk-ID subset, or a Pinecone filter ---
+def _faiss_positions(vector_store):
+    positions = getattr(vector_store, "_positions_by_id", None)
+    if positions is None or len(positions) != len(vector_store.index_to_docstore_id):
+        positions = {chunk_id: position for position, chunk_id in vector_store.index_to_docstore_id.items()}
+        vector_store._positions_by_id = positions
+    return positions
+
+def dense_search(vector_store, query, k, filters=None, allowed_ids=None):
+    if isinstance(vector_store, FAISS):
+        if allowed_ids is None:
+            return vector_store.similarity_search(query, k=k)
+        positions = _faiss_positions(vector_store)
+        subset = np.fromiter((positions[i] for i in allowed_ids if i in positions), dtype="int64")
+        if not len(subset):
+            return []
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(subset))
+        query_vector = np.asarray([vector_store.embeddings.embed_query(query)], dtype="float32")
+        _, labels = vector_store.index.search(query_vector, min(k, len(subset)), params=params)
+        docs = []
+        for position in labels[0]:
+            if position < 0:
+                continue
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[int(position)])
+            if isinstance(doc, Document):
+                docs.append(doc)
+        return docs
+
+    pinecone_filter = to_pinecone_filter(filters or {})
+    if pinecone_filter is None:
+        return vector_store.similarity_search(query, k=k)
+    return vector_store.similarity_search(query, k=k, filter=pinecone_filter)
 
 # Load vector store using LangChain wrapper and Ollama embeddings
 def load_vector_store(collection_name="default"):
-    local_path = f"./local_vectors/{collection_name}/vectors.json"
+    local_path = os.path.join(get_local_dir(collection_name), VECTORS_FILE)
 
-    # ✅ Fallback to local if file exists
+    # ✅ Fallback to local if file exists (memory-mapped FAISS index, no re-embedding)
     if os.path.exists(local_path):
-        print(f"[LocalLoad] Loading vector store locally from: {local_path}")
-        with open(local_path, "r") as f:
-            data = json.load(f)
-
-        texts = [item["text"] for item in data]
-        metadata = [item.get("metadata", {}) for item in data]
-
-        embeddings = OllamaEmbeddings(model="nomic-embed-text", base_url="http://localhost:11434")
-        return FAISS.from_texts(texts=texts, embedding=embeddings, metadatas=metadata)
+        return _load_local_collection(collection_name)
 
     # ✅ Default: Load from Pinecone
-    print(f"[Pinecone] Loading vector store from namespace: {collection_name}")
-    embeddings = OllamaEmbeddings(model="nomic-embed-text", base_url="http://localhost:11434")
+    logger.info("Loading vector store from Pinecone namespace %s", collection_name)
+    embeddings = get_embeddings()
 
     return PineconeVectorStore(
         index=get_pinecone_index(),
         embedding=embeddings,
         namespace=collection_name,
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,85 @@
+import argparse
+import random
+import time
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from app import config
+from app.services.hybrid_retriever import HybridRetriever
+from app.utils.bm25_index import BM25Index
+from app.utils.financial_entities import COMPANY_TICKERS, extract_entities
+from app.utils.hash_embeddings import HashEmbeddings
+from app.utils.metadata_filters import filters_from_entities
+from app.utils.vector_store import get_embeddings
+
+# Synthetic multi-company corpus: every filing section reads alike and, like most chunks
+# cut from a long filing, never names the company or period; only metadata carries them.
+# Each question asks for one section of one filing, so filters are the only way to find it.
+
+COLLECTION = "filter_benchmark"
+LINE_ITEMS = ["revenue", "net income", "operating expenses", "diluted EPS", "research and development", "free cash flow"]
+FILINGS = [("10-K", None), ("10-Q", "Q1"), ("10-Q", "Q2"), ("10-Q", "Q3")]
+
+def build_corpus(years, seed):
+    rng = random.Random(seed)
+    companies = {}
+    for name, ticker in COMPANY_TICKERS.items():
+        companies.setdefault(ticker, name)
+
+    docs, questions = [], []
+    for ticker, name in sorted(companies.items()):
+        for year in years:
+            for form_type, quarter in FILINGS:
+                for item in LINE_ITEMS:
+                    value = rng.randint(100, 90000)
+                    text = (
+                        f"{item.capitalize()} was ${value:,} million for the period, compared with "
+                        f"${int(value * rng.uniform(0.8, 1.2)):,} million in the prior-year period."
+                    )
+                    metadata = {"company": ticker, "form_type": form_type, "fiscal_year": year, "source": f"{ticker}-{form_type}-{year}"}
+                    if quarter:
+                        metadata["fiscal_quarter"] = quarter
+                    chunk_id = f"{ticker}_{form_type}_{year}_{quarter or 'FY'}_{item}".replace(" ", "_")
+                    docs.append(Document(id=chunk_id, page_content=text, metadata=metadata))
+
+                    period = f"{quarter} of fiscal {year}" if quarter else f"fiscal {year}"
+                    questions.append((chunk_id, f"What was {name.capitalize()}'s {item} in the {form_type} for {period}?"))
+    return docs, questions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall and latency with and without metadata pre-filtering")
+    parser.add_argument("--years", type=int, default=10, help="Fiscal years per company")
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--k", type=int, default=config.RETRIEVAL_TOP_K)
+    parser.add_argument("--embedder", choices=["ollama", "hash"], default="hash")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    docs, questions = build_corpus(range(2024 - args.years + 1, 2025), args.seed)
+    questions = random.Random(args.seed).sample(questions, min(args.questions, len(questions)))
+    print(f"[Benchmark] {len(docs)} chunks across {len({d.metadata['company'] for d in docs})} companies, {len(questions)} questions")
+
+    embeddings = HashEmbeddings() if args.embedder == "hash" else get_embeddings()
+    vector_store = FAISS.from_documents(docs, embeddings, ids=[doc.id for doc in docs])
+    sparse_index = BM25Index()
+    sparse_index.add((doc.id, doc.page_content, doc.metadata) for doc in docs)
+    retriever = HybridRetriever(vector_store, collection_name=COLLECTION, k=args.k, sparse_index=sparse_index)
+
+    for mode in ("unfiltered", "filtered"):
+        hits, latencies, candidates = 0, [], []
+        for chunk_id, question in questions:
+            start = time.perf_counter()
+            filters = filters_from_entities(extract_entities(question)) if mode == "filtered" else {}
+            results, applied = retriever.search(question, filters=filters)
+            latencies.append((time.perf_counter() - start) * 1000)
+            allowed = sparse_index.matching_ids(applied)
+            candidates.append(len(docs) if allowed is None else len(allowed))
+            hits += any(doc.metadata["chunk_id"] == chunk_id for doc in results)
+
+        p50, p95 = np.percentile(latencies, [50, 95])
+        print(
+            f"[Benchmark] {mode:<10} recall@{args.k}={hits / len(questions):.3f}  p50={p50:6.2f}ms  "
+            f"p95={p95:6.2f}ms  avg candidates={np.mean(candidates):,.0f}"
+        )
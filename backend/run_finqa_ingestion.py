@@ -1,5 +1,14 @@
+import argparse
+
 from app.pipelines.finqa_ingestion_pipeline import ingest_finqa_dataset
 from app import config
 
 if __name__ == "__main__":
-    ingest_finqa_dataset(config.FINQA_FILE)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Stream the FinQA dataset into the 'finqa' collection")
+    parser.add_argument("--file", default=config.FINQA_FILE)
+    parser.add_argument("--limit", type=int, default=None, help="Number of records to ingest (default: all)")
+    parser.add_argument("--offset", type=int, default=0, help="Records to skip before ingesting")
+    parser.add_argument("--batch-size", type=int, default=config.DATASET_BATCH_SIZE, help="Chunks per embed/write batch")
+    args = parser.parse_args()
+
+    ingest_finqa_dataset(args.file, limit=args.limit, offset=args.offset, batch_size=args.batch_size)
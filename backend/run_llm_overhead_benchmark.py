@@ -0,0 +1,57 @@
+import argparse
+import statistics
+import time
+
+import requests
+from langchain.chains import LLMChain
+from langchain.prompts import PromptTemplate
+from langchain_community.llms import Ollama
+
+from app import config
+from app.services import model_registry
+
+# Per-request object construction on the query path, before and after the shared
+# model registry. Nothing here talks to Ollama unless --http is given, so the
+# numbers are pure client/chain construction cost.
+
+def per_request_before():
+    # What /hybrid_rag, /insights and /table_qa each built per call
+    Ollama(model=config.INSIGHTS_MODEL, base_url=config.OLLAMA_BASE_URL)
+    LLMChain(llm=Ollama(model=config.TABLE_QA_MODEL, base_url=config.OLLAMA_BASE_URL), prompt=PromptTemplate.from_template("{input}"))
+
+def per_request_after():
+    model_registry.get_llm(config.INSIGHTS_MODEL)
+    model_registry.get_llm(config.TABLE_QA_MODEL)
+
+def time_calls(fn, n):
+    samples = []
+    for _ in range(n):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def report(label, samples):
+    ordered = sorted(samples)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    print(f"{label:<28} mean={statistics.mean(samples):8.3f} ms  p50={statistics.median(samples):8.3f} ms  p95={p95:8.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request LLM/chain construction overhead, before vs after the model registry")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--http", action="store_true", help=f"Also time GET /api/tags on {config.OLLAMA_BASE_URL}: new connection vs pooled session")
+    args = parser.parse_args()
+
+    report("construct per request", time_calls(per_request_before, args.requests))
+    report("shared registry", time_calls(per_request_after, args.requests))
+
+    if args.http:
+        url = f"{config.OLLAMA_BASE_URL}/api/tags"
+        session = model_registry.get_http_session()
+        report("http: new connection", time_calls(lambda: requests.get(url, timeout=10).raise_for_status(), args.requests))
+        report("http: pooled keep-alive", time_calls(lambda: session.get(url, timeout=10).raise_for_status(), args.requests))
+
+    print(f"registry: {model_registry.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Fire N identical questions at a running API at once. With the endpoint work
+# off the event loop, wall time should track the slowest request, not the sum.
+
+def ask(url: str, question: str):
+    body = json.dumps({"question": question}).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=600) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+def ping(url: str):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=60) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test for the QA API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/hybrid_rag", choices=["/hybrid_rag", "/insights"])
+    parser.add_argument("--question", default="What was Apple's net sales in fiscal year 2008?")
+    parser.add_argument("-n", "--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    url = args.base_url.rstrip("/") + args.endpoint
+    print(f"[LoadTest] {args.concurrency} concurrent requests → {url}")
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency + 1) as pool:
+        futures = [pool.submit(ask, url, args.question) for _ in range(args.concurrency)]
+        # The root endpoint must stay responsive while questions are running
+        time.sleep(0.5)
+        root_latency = ping(args.base_url.rstrip("/") + "/")
+        results = [f.result() for f in futures]
+    wall = time.perf_counter() - wall_start
+
+    latencies = sorted(latency for status, latency in results if status == 200)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f"[LoadTest] Status codes: {statuses}")
+    print(f"[LoadTest] GET / during load: {root_latency * 1000:.0f} ms")
+    if latencies:
+        print(f"[LoadTest] Per-request latency: min={latencies[0]:.2f}s max={latencies[-1]:.2f}s sum={sum(latencies):.2f}s")
+        print(f"[LoadTest] Wall time: {wall:.2f}s (wall/max={wall / latencies[-1]:.2f}, wall/sum={wall / sum(latencies):.2f})")
@@ -0,0 +1,38 @@
+import argparse
+import os
+import time
+from concurrent.futures import wait
+
+from app.utils.pdf_parser import count_pages, iter_pdf_pages, warm_pool
+
+# Parse one PDF (e.g. a ~300-page 10-K) with 1..N worker processes and report
+# wall time, pages/s and speedup over the single-process run.
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Benchmark parallel page-level PDF parsing")
+    parser.add_argument("file", help="Path to a PDF filing")
+    parser.add_argument("--workers", default=",".join(str(w) for w in sorted({1, 2, 4, cores}) if w <= cores),
+                        help="Comma-separated worker counts to try")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    pages = count_pages(args.file)
+    print(f"[Benchmark] {args.file}: {pages} pages, {cores} cores")
+
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        best = float("inf")
+        # Time parsing, not interpreter start-up: the API keeps one warm pool too
+        if workers > 1:
+            wait(warm_pool(workers))
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            tables = sum(len(page["tables"]) for page in iter_pdf_pages(args.file, workers=workers))
+            best = min(best, time.perf_counter() - start)
+
+        baseline = baseline or best
+        print(
+            f"[Benchmark] workers={workers:<3} time={best:7.2f}s  pages/s={pages / best:7.1f}  "
+            f"speedup={baseline / best:5.2f}x  tables={tables}"
+        )
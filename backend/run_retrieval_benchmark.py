@@ -0,0 +1,78 @@
+import argparse
+import time
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from app import config
+from app.services.hybrid_retriever import HybridRetriever
+from app.utils.bm25_index import BM25Index
+from app.utils.financial_chunker import chunk_tatqa_entry
+from app.utils.hash_embeddings import HashEmbeddings
+from app.utils.ingestion_ledger import make_chunk_id
+from app.utils.json_stream import iter_json_array
+from app.utils.vector_store import get_embeddings
+
+# Index the TAT-QA dev split in memory (nothing is written to the real collections),
+# then ask every dev question through dense-only, BM25-only and fused retrieval.
+# A question counts as a hit when a chunk whose `question_uids` names it is in the top k.
+
+COLLECTION = "benchmark"
+
+def build_corpus(file_path, limit):
+    chunks, questions = {}, []
+    for entry in iter_json_array(file_path, limit=limit):
+        for doc in chunk_tatqa_entry(entry, file_path):
+            chunks.setdefault(make_chunk_id(COLLECTION, file_path, doc.page_content), doc)
+        questions.extend((q["uid"], q["question"]) for q in entry.get("questions") or [])
+    return chunks, questions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k and latency for dense, BM25 and hybrid retrieval")
+    parser.add_argument("--file", default="../datasets/tatqa/tatqa_dataset_dev.json")
+    parser.add_argument("--k", type=int, default=config.RETRIEVAL_TOP_K)
+    parser.add_argument("--limit", type=int, default=None, help="Only index the first N dev records")
+    parser.add_argument("--embedder", choices=["ollama", "hash"], default="ollama",
+                        help="'hash' uses a deterministic feature-hashing embedder (no Ollama needed)")
+    parser.add_argument("--dense-weight", type=float, default=config.HYBRID_DENSE_WEIGHT)
+    parser.add_argument("--sparse-weight", type=float, default=config.HYBRID_SPARSE_WEIGHT)
+    args = parser.parse_args()
+
+    chunks, questions = build_corpus(args.file, args.limit)
+    ids = list(chunks)
+    gold = {}
+    for chunk_id, doc in chunks.items():
+        for uid in doc.metadata.get("question_uids", []):
+            gold.setdefault(uid, set()).add(chunk_id)
+    questions = [(uid, text) for uid, text in questions if uid in gold]
+    print(f"[Benchmark] {len(ids)} chunks, {len(questions)} questions with a gold chunk")
+
+    embeddings = HashEmbeddings() if args.embedder == "hash" else get_embeddings()
+    start = time.perf_counter()
+    vector_store = FAISS.from_documents([chunks[chunk_id] for chunk_id in ids], embeddings, ids=ids)
+    sparse_index = BM25Index()
+    sparse_index.add((chunk_id, chunks[chunk_id].page_content) for chunk_id in ids)
+    print(f"[Benchmark] Indexed in {time.perf_counter() - start:.1f}s ({args.embedder} embeddings)")
+
+    modes = {
+        "dense": (1.0, 0.0),
+        "bm25": (0.0, 1.0),
+        "hybrid": (args.dense_weight, args.sparse_weight),
+    }
+    for mode, (dense_weight, sparse_weight) in modes.items():
+        retriever = HybridRetriever(
+            vector_store, collection_name=COLLECTION, k=args.k,
+            dense_weight=dense_weight, sparse_weight=sparse_weight, sparse_index=sparse_index,
+        )
+        hits, latencies = 0, []
+        for uid, question in questions:
+            start = time.perf_counter()
+            docs = retriever.retrieve(question)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += any(doc.metadata["chunk_id"] in gold[uid] for doc in docs)
+
+        p50, p95 = np.percentile(latencies, [50, 95])
+        print(
+            f"[Benchmark] {mode:<7} recall@{args.k}={hits / len(questions):.3f}  "
+            f"p50={p50:6.1f}ms  p95={p95:6.1f}ms"
+        )
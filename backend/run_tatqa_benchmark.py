@@ -0,0 +1,337 @@
+import os
+
+# Offline, side-effect-free defaults (no answer cache files, no cross-encoder download, quiet logs);
+# set before app.config is imported, and still overridable from the environment
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "0")
+os.environ.setdefault("RERANK_ENABLED", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import argparse
+import json
+import re
+import string
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from app import config
+from app.services.agents.postprocessing_agent import ANSWER_FOOTER
+from app.services.federated_retriever import FederatedRetriever, register_collection_retriever
+from app.services.hybrid_rag_pipeline import HybridRAGAgentPipeline
+from app.services.hybrid_retriever import HybridRetriever
+from app.services.insight_generator import InsightGenerator
+from app.services.numeric_reasoning import parse_number
+from app.services.table_qa import answer_from_tables
+from app.utils import tracing
+from app.utils.bm25_index import BM25Index
+from app.utils.financial_chunker import chunk_tatqa_entry
+from app.utils.financial_entities import extract_entities
+from app.utils.hash_embeddings import HashEmbeddings
+from app.utils.ingestion_ledger import make_chunk_id
+from app.utils.json_stream import iter_json_array
+from app.utils.metadata_filters import filters_from_entities
+from app.utils.table_cache import table_to_dataframe
+
+# Ingest a slice of TAT-QA into an in-memory local collection (hash embeddings + BM25,
+# nothing written to the real collections), then replay its questions through the
+# hybrid RAG pipeline, the insight generator and table QA with a stub LLM. Reports
+# throughput, per-stage latency percentiles, retrieval recall@k and answer EM/F1 as
+# JSON; --baseline compares against an earlier report and fails on quality drops.
+
+COLLECTION = "tatqa_benchmark"
+SPLITS = {
+    "dev": "../datasets/tatqa/tatqa_dataset_dev.json",
+    "test": "../datasets/tatqa/tatqa_dataset_test.json",
+}
+SYSTEMS = ("hybrid_rag", "insights", "table_qa")
+TABLE_ANSWER_SOURCES = ("table", "table-text")
+QUALITY_KEYS = ("recall_at_k", "exact_match", "f1")
+
+# --- Stub LLM: deterministic, offline, optional fixed latency ---
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+QUESTION_RE = re.compile(r"(?:Question:|QUESTION:)\s*(.+?)\s*(?:\n|$)", re.S)
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+class StubLLM:
+    """
+    Stands in for Ollama. Rewrite prompts are echoed back; otherwise the answer
+    is the context line sharing the most words with the question (the first
+    line when the prompt carries no question). `latency_ms` is slept per call.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+
+    def _answer(self, prompt: str) -> str:
+        if prompt.startswith("Rewrite this user question"):
+            return prompt.split("\n\n", 1)[-1]
+        match = QUESTION_RE.search(prompt)
+        context = prompt[:match.start()] if match else prompt.split("\n\n", 1)[-1]
+        lines = [line.strip() for line in SENTENCE_SPLIT_RE.split(context) if line.strip()]
+        if not lines:
+            return ""
+        if not match:
+            return lines[0]
+        question = set(WORD_RE.findall(match.group(1).lower()))
+        return max(lines, key=lambda line: len(question & set(WORD_RE.findall(line.lower()))))
+
+    def invoke(self, prompt: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    def stream(self, prompt: str):
+        for i, word in enumerate(self.invoke(prompt).split(" ")):
+            yield word if i == 0 else " " + word
+
+# --- Corpus: chunks (as run_tatqa_ingestion would store them), questions, tables ---
+def load_slice(file_path, offset, limit):
+    chunks, questions = {}, []
+    for entry in iter_json_array(file_path, offset=offset, limit=limit):
+        rows = (entry.get("table") or {}).get("table") or []
+        df = table_to_dataframe(rows)
+        tables = [{"df": df, "page": 1, "position": 0, "shape": list(df.shape)}] if not df.empty else []
+        for doc in chunk_tatqa_entry(entry, file_path):
+            chunks.setdefault(make_chunk_id(COLLECTION, file_path, doc.page_content), doc)
+        for question in entry.get("questions") or []:
+            questions.append({**question, "tables": tables})
+    return chunks, questions
+
+def build_index(chunks, k):
+    ids = list(chunks)
+    vector_store = FAISS.from_documents([chunks[chunk_id] for chunk_id in ids], HashEmbeddings(), ids=ids)
+    sparse_index = BM25Index()
+    sparse_index.add((chunk_id, chunks[chunk_id].page_content, chunks[chunk_id].metadata) for chunk_id in ids)
+    return HybridRetriever(vector_store, collection_name=COLLECTION, k=k, sparse_index=sparse_index)
+
+# --- Scoring (TAT-QA style: numbers compared after rounding, spans by token F1) ---
+NUMBER_RE = re.compile(r"\(?-?\$?\d[\d,]*\.?\d*%?\)?")
+
+def normalize_text(text: str) -> str:
+    text = "".join(ch for ch in str(text).lower() if ch not in set(string.punctuation))
+    return " ".join(word for word in text.split() if word not in ("a", "an", "the"))
+
+def token_f1(prediction: str, gold: str) -> float:
+    predicted, expected = normalize_text(prediction).split(), normalize_text(gold).split()
+    common = sum((Counter(predicted) & Counter(expected)).values())
+    if not predicted or not expected or not common:
+        return float(predicted == expected)
+    precision, recall = common / len(predicted), common / len(expected)
+    return 2 * precision * recall / (precision + recall)
+
+def score_answer(prediction: str, question: dict):
+    """(exact match, F1), or None when the question has no gold answer (test split)."""
+    gold = question.get("answer")
+    if gold is None or gold == "":
+        return None
+    if question.get("answer_type") in ("arithmetic", "count") and not isinstance(gold, list):
+        expected = parse_number(gold)
+        predicted = [parse_number(token) for token in NUMBER_RE.findall(prediction)]
+        hit = float(any(np.isfinite(value) and round(value, 2) == round(expected, 2) for value in predicted))
+        return hit, hit
+    gold_text = " ".join(str(part) for part in gold) if isinstance(gold, list) else str(gold)
+    return float(normalize_text(prediction) == normalize_text(gold_text)), token_f1(prediction, gold_text)
+
+# --- Timings collected from tracing spans ---
+class TimingCollector:
+    def __init__(self):
+        self.stages = defaultdict(list)     # (endpoint, stage) -> seconds
+        self.requests = defaultdict(list)   # endpoint -> seconds
+        self.statuses = defaultdict(Counter)
+
+    def __call__(self, event):
+        if event["type"] == "span":
+            self.stages[(event["endpoint"], event["stage"])].append(event["seconds"])
+        else:
+            self.requests[event["endpoint"]].append(event["seconds"])
+            self.statuses[event["endpoint"]][event["status"]] += 1
+
+def percentiles_ms(samples):
+    if not samples:
+        return None
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3)}
+
+def mean(values):
+    return round(float(np.mean(values)), 4) if values else None
+
+# --- Replay ---
+def replay(name, answer_fn, questions, workers, timings):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        answers = list(pool.map(answer_fn, questions))
+    elapsed = time.perf_counter() - started
+
+    scores, by_type = [], defaultdict(list)
+    for question, answer in zip(questions, answers):
+        scored = score_answer(answer.replace(ANSWER_FOOTER, "").strip(), question)
+        if scored is not None:
+            scores.append(scored)
+            by_type[question.get("answer_type")].append(scored)
+
+    return {
+        "questions": len(questions),
+        "seconds": round(elapsed, 3),
+        "throughput_qps": round(len(questions) / elapsed, 2) if elapsed else None,
+        "latency_ms": percentiles_ms(timings.requests[name]),
+        "stages": {stage: percentiles_ms(samples) for (ep, stage), samples in sorted(timings.stages.items()) if ep == name},
+        "statuses": dict(timings.statuses[name]),
+        "scored": len(scores),
+        "exact_match": mean([em for em, _ in scores]),
+        "f1": mean([f1 for _, f1 in scores]),
+        "by_answer_type": {
+            answer_type: {"n": len(items), "exact_match": mean([em for em, _ in items]), "f1": mean([f1 for _, f1 in items])}
+            for answer_type, items in sorted(by_type.items())
+        },
+    }
+
+def measure_retrieval(federated, questions, gold, k):
+    hits, latencies = [], []
+    for question in questions:
+        filters = filters_from_entities(extract_entities(question["question"]))
+        started = time.perf_counter()
+        docs, _ = federated.search(question["question"], k=k, filters=filters)
+        latencies.append(time.perf_counter() - started)
+        if question["uid"] in gold:
+            hits.append(float(any(doc.metadata.get("chunk_id") in gold[question["uid"]] for doc in docs)))
+    return {"scored": len(hits), "recall_at_k": mean(hits), "latency_ms": percentiles_ms(latencies)}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# --- Baseline comparison: quality drops beyond --max-drop fail the run ---
+def quality_metrics(report):
+    metrics = {"retrieval.recall_at_k": report["retrieval"]["recall_at_k"]}
+    for name, system in report["systems"].items():
+        for key in QUALITY_KEYS[1:]:
+            metrics[f"{name}.{key}"] = system[key]
+    return metrics
+
+def compare(report, baseline, max_drop):
+    regressions = []
+    current, previous = quality_metrics(report), quality_metrics(baseline)
+    for key, value in sorted(current.items()):
+        before = previous.get(key)
+        if value is None or before is None:
+            continue
+        delta = value - before
+        flag = " ⚠️" if delta < -max_drop else ""
+        print(f"[Benchmark] {key:<28} {before:.4f} → {value:.4f} ({delta:+.4f}){flag}")
+        if flag:
+            regressions.append(key)
+    for name, system in report["systems"].items():
+        before = (baseline["systems"].get(name) or {}).get("latency_ms") or {}
+        after = system.get("latency_ms") or {}
+        if before.get("p95") and after.get("p95"):
+            print(f"[Benchmark] {name + '.p95_ms':<28} {before['p95']:.1f} → {after['p95']:.1f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline TAT-QA benchmark: throughput, stage latency, recall@k, EM/F1")
+    parser.add_argument("--split", choices=sorted(SPLITS), default="dev", help="The test split has no answers: speed only")
+    parser.add_argument("--file", default=None, help="Dataset file (overrides --split)")
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=50, help="Number of dataset records (each holds several questions)")
+    parser.add_argument("--k", type=int, default=config.RETRIEVAL_TOP_K)
+    parser.add_argument("--systems", default=",".join(SYSTEMS), help=f"Comma-separated subset of {SYSTEMS}")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent requests per system")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated LLM latency per call")
+    parser.add_argument("--output", default="tatqa_benchmark_report.json")
+    parser.add_argument("--baseline", default=None, help="Earlier report to compare against")
+    parser.add_argument("--max-drop", type=float, default=0.01, help="Allowed drop in recall / EM / F1 vs --baseline")
+    args = parser.parse_args()
+
+    systems = [name.strip() for name in args.systems.split(",") if name.strip()]
+    unknown = set(systems) - set(SYSTEMS)
+    if unknown:
+        parser.error(f"Unknown systems {sorted(unknown)}, expected a subset of {SYSTEMS}")
+    file_path = args.file or SPLITS[args.split]
+
+    # Ingest the slice into the in-memory collection
+    started = time.perf_counter()
+    chunks, questions = load_slice(file_path, args.offset, args.limit)
+    register_collection_retriever(COLLECTION, build_index(chunks, args.k))
+    index_seconds = time.perf_counter() - started
+    gold = {}
+    for chunk_id, doc in chunks.items():
+        for uid in doc.metadata.get("question_uids", []):
+            gold.setdefault(uid, set()).add(chunk_id)
+    print(f"[Benchmark] {len(chunks)} chunks, {len(questions)} questions indexed in {index_seconds:.1f}s")
+
+    timings = TimingCollector()
+    tracing.add_listener(timings)
+    llm = StubLLM(args.llm_latency_ms)
+
+    report = {
+        "commit": git_commit(),
+        "dataset": {
+            "file": os.path.relpath(file_path),
+            "offset": args.offset,
+            "limit": args.limit,
+            "chunks": len(chunks),
+            "questions": len(questions),
+            "answered_questions": sum(1 for q in questions if q.get("answer") not in (None, "")),
+        },
+        "settings": {
+            "k": args.k,
+            "workers": args.workers,
+            "llm_latency_ms": args.llm_latency_ms,
+            "embedder": "hash",
+            "rewrite_mode": config.REWRITE_MODE,
+            "rerank": config.RERANK_ENABLED,
+        },
+        "indexing_seconds": round(index_seconds, 3),
+        "retrieval": measure_retrieval(FederatedRetriever([COLLECTION], k=args.k), questions, gold, args.k),
+        "systems": {},
+    }
+    print(f"[Benchmark] retrieval    recall@{args.k}={report['retrieval']['recall_at_k']}")
+
+    if "hybrid_rag" in systems:
+        pipeline = HybridRAGAgentPipeline(collections=[COLLECTION])
+        pipeline.llm = llm
+        pipeline.rewriter.llm = llm
+        if pipeline.reranker:
+            pipeline.reranker.load()
+        report["systems"]["hybrid_rag"] = replay("hybrid_rag", lambda q: pipeline.run(q["question"]), questions, args.workers, timings)
+
+    if "insights" in systems:
+        insights = InsightGenerator(collections=[COLLECTION])
+        insights.llm = llm
+        report["systems"]["insights"] = replay("insights", lambda q: insights.generate_insights(q["question"]), questions, args.workers, timings)
+
+    if "table_qa" in systems:
+        table_questions = [q for q in questions if q.get("answer_from") in TABLE_ANSWER_SOURCES or q.get("answer_from") is None]
+        report["systems"]["table_qa"] = replay(
+            "table_qa", lambda q: answer_from_tables(q["tables"], q["question"], llm), table_questions, args.workers, timings
+        )
+
+    tracing.remove_listener(timings)
+
+    for name, system in report["systems"].items():
+        latency = system["latency_ms"] or {}
+        print(
+            f"[Benchmark] {name:<12} {system['throughput_qps']} q/s  p50={latency.get('p50')}ms  "
+            f"p95={latency.get('p95')}ms  EM={system['exact_match']}  F1={system['f1']}"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"[Benchmark] Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.max_drop)
+        if regressions:
+            print(f"[Benchmark] ❌ Quality regressions: {regressions}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
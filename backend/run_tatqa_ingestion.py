@@ -1,5 +1,14 @@
+import argparse
+
 from app.pipelines.tatqa_ingestion_pipeline import ingest_tatqa_dataset
 from app import config
 
 if __name__ == "__main__":
-    ingest_tatqa_dataset(config.TATQA_FILE)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Stream the TAT-QA dataset into the 'tatqa' collection")
+    parser.add_argument("--file", default=config.TATQA_FILE)
+    parser.add_argument("--limit", type=int, default=None, help="Number of records to ingest (default: all)")
+    parser.add_argument("--offset", type=int, default=0, help="Records to skip before ingesting")
+    parser.add_argument("--batch-size", type=int, default=config.DATASET_BATCH_SIZE, help="Chunks per embed/write batch")
+    args = parser.parse_args()
+
+    ingest_tatqa_dataset(args.file, limit=args.limit, offset=args.offset, batch_size=args.batch_size)
@@ -0,0 +1,26 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Tests import the backend as `app`, the same way the run_*.py scripts do from the backend root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    Run in an empty directory with fresh per-process registries: config paths
+    (local vectors, ledgers, caches) are relative, so nothing touches the repo.
+    """
+    from app.services import federated_retriever
+    from app.utils import bm25_index, ingestion_ledger
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(bm25_index, "_indexes", {})
+    monkeypatch.setattr(ingestion_ledger, "_ledgers", {})
+    monkeypatch.setattr(ingestion_ledger.IngestionLedger.__init__, "__defaults__", (str(tmp_path / "ingestion_ledger"),))
+    monkeypatch.setattr(federated_retriever, "_retrievers", {})
+    monkeypatch.setattr(federated_retriever, "_load_locks", {})
+    return tmp_path
@@ -0,0 +1,193 @@
+# tests/test_answer_cache.py
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from app import config
+from app.services.answer_cache import AnswerCache, cacheable
+from app.services.federated_retriever import _load_lock, register_collection_retriever
+from app.services.hybrid_retriever import HybridRetriever
+from app.services.insight_generator import InsightGenerator
+from app.utils.bm25_index import BM25Index
+from app.utils.hash_embeddings import HashEmbeddings
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+    def stream(self, prompt):
+        yield self.invoke(prompt)
+
+class FakeReadiness:
+    def __init__(self, status):
+        self.state = status
+
+    def status(self):
+        return {"status": self.state, "components": {}}
+
+def in_memory_retriever(name, texts):
+    ids = [f"{name}-{i}" for i in range(len(texts))]
+    docs = [Document(page_content=text, metadata={"source": name}) for text in texts]
+    sparse_index = BM25Index()
+    sparse_index.add((chunk_id, doc.page_content, doc.metadata) for chunk_id, doc in zip(ids, docs))
+    vector_store = FAISS.from_documents(docs, HashEmbeddings(), ids=ids)
+    return HybridRetriever(vector_store, collection_name=name, sparse_index=sparse_index)
+
+# --- Degraded answers are never cached ---
+def test_cacheable():
+    assert cacheable({}) and cacheable(None)
+    assert not cacheable({"degraded": ["knowledge_graph"]})
+    assert not cacheable({}, FakeReadiness("starting"))
+    assert not cacheable({}, FakeReadiness("degraded"))
+    assert cacheable({"degraded": []}, FakeReadiness("ready"))
+
+def make_insights(collections):
+    generator = InsightGenerator(collections)
+    generator.llm = FakeLLM()
+    generator.answer_cache = AnswerCache("insights", embeddings=HashEmbeddings())
+    return generator
+
+def test_insights_from_a_warming_collection_are_not_cached(workdir):
+    register_collection_retriever("warm", in_memory_retriever("warm", ["Apple revenue grew 8% in 2019"]))
+    generator = make_insights(["warm", "cold"])
+    question = "How did Apple revenue change in 2019?"
+
+    lock = _load_lock("cold")
+    lock.acquire()   # "cold" is still loading in the background
+    try:
+        assert generator.generate_insights(question) == "answer 1"
+        assert generator.generate_insights(question) == "answer 2"
+        assert generator.answer_cache.stats()["entries"] == 0
+    finally:
+        lock.release()
+
+    register_collection_retriever("cold", in_memory_retriever("cold", ["Microsoft revenue grew 14%"]))
+    assert generator.generate_insights(question) == "answer 3"
+    assert generator.generate_insights(question) == "answer 3"
+
+def test_insights_are_not_cached_until_components_are_ready(workdir):
+    register_collection_retriever("warm", in_memory_retriever("warm", ["Apple revenue grew 8% in 2019"]))
+    generator = make_insights(["warm"])
+    generator.readiness = FakeReadiness("starting")
+    events = list(generator.stream_insights("How did Apple revenue change in 2019?"))
+    assert events[-1]["insights"] == "answer 1"
+    assert generator.answer_cache.stats()["entries"] == 0
+
+    generator.readiness = FakeReadiness("ready")
+    generator.generate_insights("How did Apple revenue change in 2019?")
+    assert generator.answer_cache.stats()["entries"] == 1
+
+class ReadyKG:
+    ready = True
+
+    def retrieve(self, question):
+        return []
+
+def test_hybrid_rag_answer_without_the_kg_is_not_cached(workdir, monkeypatch):
+    from app.services.hybrid_rag_pipeline import HybridRAGAgentPipeline
+
+    monkeypatch.setattr(config, "RERANK_ENABLED", False)
+    register_collection_retriever("warm", in_memory_retriever("warm", ["Apple revenue grew 8% in 2019"]))
+    pipeline = HybridRAGAgentPipeline(collections=["warm"])
+    pipeline.llm = pipeline.rewriter.llm = FakeLLM()
+    pipeline.answer_cache = AnswerCache("hybrid_rag", embeddings=HashEmbeddings())
+    question = "How did Apple revenue change in 2019?"
+
+    # KnowledgeGraphRetriever hasn't connected yet
+    pipeline.run(question)
+    list(pipeline.stream(question))
+    assert pipeline.answer_cache.stats()["entries"] == 0
+
+    pipeline.kg_retriever = ReadyKG()
+    first = pipeline.run(question)
+    assert pipeline.answer_cache.stats()["entries"] == 1
+    assert pipeline.run(question) == first
+
+# --- Exact / semantic tiers, eviction and invalidation ---
+class TableEmbeddings:
+    """Embeds known questions to fixed vectors: paraphrases share a direction."""
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_query(self, question):
+        return self.vectors[question]
+
+REVENUE_2019 = [1.0, 0.0, 0.0]
+PARAPHRASES = {
+    "What was Apple revenue in 2019?": REVENUE_2019,
+    "Apple revenue in 2019, what was it": [0.99, 0.1, 0.0],
+    "What was Apple revenue in 2018?": REVENUE_2019,
+    "What was Apple net income in 2019?": [0.0, 1.0, 0.0],
+}
+
+def revenue_cache(**kwargs):
+    return AnswerCache("test", embeddings=TableEmbeddings(PARAPHRASES), **kwargs)
+
+def test_exact_tier_matches_normalized_questions_per_scope(workdir):
+    cache = revenue_cache()
+    cache.put("What was Apple revenue in 2019?", ["filings", "finqa"], "260.2 billion", elapsed=2.5)
+
+    hit = cache.get("  what was apple revenue in 2019 ", ["finqa", "filings"])
+    assert hit == {"answer": "260.2 billion", "tier": "exact", "similarity": 1.0}
+    # Same question over other collections is a different answer
+    assert cache.get("What was Apple revenue in 2019?", ["filings"]) is None
+    assert cache.stats()["saved_seconds"] == 2.5
+
+def test_semantic_tier_requires_similarity_and_matching_entities(workdir):
+    cache = revenue_cache(similarity=0.95)
+    cache.put("What was Apple revenue in 2019?", ["filings"], "260.2 billion", elapsed=1.0)
+
+    hit = cache.get("Apple revenue in 2019, what was it", ["filings"])
+    assert hit["tier"] == "semantic" and hit["answer"] == "260.2 billion" and hit["similarity"] >= 0.95
+    # Identical embedding, different fiscal year: never reused
+    assert cache.get("What was Apple revenue in 2018?", ["filings"]) is None
+    assert cache.get("What was Apple net income in 2019?", ["filings"]) is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["lookups"]) == (0, 1, 3)
+
+def test_least_recently_used_entry_is_evicted(workdir):
+    cache = revenue_cache(max_entries=2)
+    cache.put("What was Apple revenue in 2019?", ["filings"], "a", elapsed=1.0)
+    cache.put("What was Apple net income in 2019?", ["filings"], "b", elapsed=1.0)
+    assert cache.get("What was Apple revenue in 2019?", ["filings"])["answer"] == "a"
+
+    cache.put("What was Apple revenue in 2018?", ["filings"], "c", elapsed=1.0)
+    assert cache.stats()["entries"] == 2
+    assert cache.get("What was Apple net income in 2019?", ["filings"]) is None
+    assert cache.get("What was Apple revenue in 2019?", ["filings"])["answer"] == "a"
+
+def test_entries_expire_after_the_ttl(workdir, monkeypatch):
+    from app.services import answer_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    cache = revenue_cache(ttl=60)
+    cache.put("What was Apple revenue in 2019?", ["filings"], "260.2 billion", elapsed=1.0)
+
+    now[0] += 59
+    assert cache.get("What was Apple revenue in 2019?", ["filings"]) is not None
+    now[0] += 2
+    assert cache.get("What was Apple revenue in 2019?", ["filings"]) is None
+    assert cache.stats()["invalidated"] == 1
+
+def test_ledger_version_bump_invalidates_cached_answers(workdir):
+    from app.utils.ingestion_ledger import get_ledger
+
+    cache = revenue_cache()
+    cache.put("What was Apple revenue in 2019?", ["filings", "finqa"], "260.2 billion", elapsed=1.0)
+    cache.put("What was Apple net income in 2019?", ["finqa"], "55.3 billion", elapsed=1.0)
+
+    # New chunks land in "filings": only answers that searched it are dropped
+    get_ledger("filings").record({"aapl-10k.pdf": ["filings_chunk-1"]})
+    assert cache.get("What was Apple revenue in 2019?", ["filings", "finqa"]) is None
+    assert cache.get("Apple revenue in 2019, what was it", ["filings", "finqa"]) is None
+    assert cache.get("What was Apple net income in 2019?", ["finqa"])["answer"] == "55.3 billion"
+    assert cache.stats()["invalidated"] == 1
+
+    cache.put("What was Apple revenue in 2019?", ["filings", "finqa"], "260.2 billion", elapsed=1.0)
+    get_ledger("filings").forget("aapl-10k.pdf", ["filings_chunk-1"])
+    assert cache.get("What was Apple revenue in 2019?", ["filings", "finqa"]) is None
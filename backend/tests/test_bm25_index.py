@@ -0,0 +1,53 @@
+# tests/test_bm25_index.py
+
+from app.utils.bm25_index import BM25Index, tokenize
+
+CHUNKS = [
+    ("aapl-1", "Apple net sales were 260.2 billion in fiscal 2019", {"company": "AAPL", "fiscal_year": 2019}),
+    ("aapl-2", "Apple services revenue grew to 46.3 billion", {"company": "AAPL", "fiscal_year": 2019}),
+    ("msft-1", "Microsoft net sales were 125.8 billion in fiscal 2019", {"company": "MSFT", "fiscal_year": 2019}),
+    ("msft-2", "Microsoft cloud revenue grew in fiscal 2020", {"company": "MSFT", "fiscal_year": 2020}),
+]
+
+def build(path=None):
+    index = BM25Index(path)
+    index.add(CHUNKS)
+    return index
+
+def test_tokenize_keeps_tickers_years_and_decimals():
+    assert tokenize("What were AAPL's net sales in FY2019? 260.2 vs 1.5%") == [
+        "aapl", "s", "net", "sales", "fy2019", "260.2", "vs", "1.5",
+    ]
+
+def test_exact_figures_and_rare_terms_rank_first():
+    index = build()
+    assert index.search("net sales 125.8 billion")[0][0] == "msft-1"
+    assert index.search("services revenue")[0][0] == "aapl-2"
+    assert index.search("the of and") == []
+
+def test_allowed_ids_and_field_filters_narrow_the_search():
+    index = build()
+    allowed = index.matching_ids({"company": ["MSFT"], "fiscal_year": [2019]})
+    assert allowed == {"msft-1"}
+    assert [chunk_id for chunk_id, _ in index.search("net sales fiscal 2019", allowed=allowed)] == ["msft-1"]
+    assert index.matching_ids({"company": ["GOOG"]}) == set()
+    assert index.matching_ids({}) is None
+
+def test_remove_and_replace_keep_postings_in_step():
+    index = build()
+    index.remove(["msft-1"])
+    assert "msft-1" not in {chunk_id for chunk_id, _ in index.search("net sales")}
+    index.add([("aapl-2", "Apple wearables revenue", {"company": "AAPL"})])
+    assert index.search("services") == []
+    assert index.search("wearables")[0][0] == "aapl-2"
+    assert len(index) == 3
+
+def test_saved_index_reloads_with_the_same_scores(tmp_path):
+    path = str(tmp_path / "filings" / "bm25.json")
+    index = build(path)
+    index.save()
+
+    reloaded = BM25Index(path)
+    assert len(reloaded) == len(index)
+    assert reloaded.search("net sales fiscal 2019") == index.search("net sales fiscal 2019")
+    assert reloaded.matching_ids({"company": ["AAPL"]}) == {"aapl-1", "aapl-2"}
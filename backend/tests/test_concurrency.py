@@ -0,0 +1,167 @@
+# tests/test_concurrency.py
+
+import asyncio
+import gc
+import json
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from app.utils.concurrency import EndpointLimiter, ndjson_response
+
+def events(count, delay=0.0, fail_at=None):
+    for i in range(count):
+        if i == fail_at:
+            raise RuntimeError("backend went away")
+        time.sleep(delay)
+        yield {"event": "token", "content": str(i)}
+
+def assert_idle(limiter):
+    stats = limiter.stats()
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+    # Every slot is free again
+    assert all(limiter._slots.acquire(blocking=False) for _ in range(limiter.max_concurrency))
+    for _ in range(limiter.max_concurrency):
+        limiter._slots.release()
+
+# --- Limiter on its own ---
+def test_saturated_stream_is_rejected_with_429():
+    limiter = EndpointLimiter("test", max_concurrency=1, max_queue=1)
+    first, second = limiter.stream(events(3)), limiter.stream(events(3))
+    with pytest.raises(HTTPException) as rejected:
+        limiter.stream(events(3))
+    assert rejected.value.status_code == 429
+    assert rejected.value.headers["Retry-After"] == "1"
+    assert limiter.stats()["rejected"] == 1
+
+    assert len(list(first)) == 3
+    limiter.stream(events(1)).close()
+    second.close()
+    assert_idle(limiter)
+
+def test_stream_closed_part_way_releases_its_permit():
+    limiter = EndpointLimiter("test", max_concurrency=1, max_queue=0)
+    stream = limiter.stream(events(5))
+    next(stream)
+    stream.close()
+    stream.close()
+    assert_idle(limiter)
+
+def test_stream_failing_part_way_releases_its_permit():
+    limiter = EndpointLimiter("test", max_concurrency=1, max_queue=0)
+    stream = limiter.stream(events(5, fail_at=2))
+    with pytest.raises(RuntimeError):
+        list(stream)
+    assert_idle(limiter)
+
+def test_stream_abandoned_before_it_starts_releases_its_admission():
+    limiter = EndpointLimiter("test", max_concurrency=1, max_queue=0)
+    stream = limiter.stream(events(5))
+    del stream
+    gc.collect()
+    assert_idle(limiter)
+
+def test_run_rejects_beyond_concurrency_plus_queue():
+    limiter = EndpointLimiter("test", max_concurrency=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(limiter.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as rejected:
+            await limiter.run(release.wait, 5)
+        release.set()
+        await asyncio.gather(*running)
+        return rejected.value.status_code
+
+    assert asyncio.run(scenario()) == 429
+    assert_idle(limiter)
+
+# --- Through FastAPI: 429 under load, permit back after a client disconnect ---
+def make_app(limiter):
+    app = FastAPI()
+
+    @app.post("/stream")
+    async def stream_endpoint():
+        return ndjson_response(limiter.stream(events(40, delay=0.01)))
+
+    return app
+
+async def call(app, disconnect=None):
+    """Drive one POST /stream through the ASGI app; `disconnect` is set to hang up mid-stream."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/stream", "raw_path": b"/stream", "query_string": b"",
+        "root_path": "", "headers": [], "client": ("test", 1), "server": ("test", 80),
+    }
+    disconnect = disconnect or asyncio.Event()
+    started = asyncio.Event()
+    request_sent = False
+    status, body = None, b""
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, body
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body += message.get("body", b"")
+            if body:
+                started.set()
+
+    task = asyncio.ensure_future(app(scope, receive, send))
+    return task, started, lambda: (status, body)
+
+def test_endpoint_returns_429_when_saturated_and_recovers_after_disconnect():
+    limiter = EndpointLimiter("test", max_concurrency=1, max_queue=0)
+    app = make_app(limiter)
+
+    async def scenario():
+        hang_up = asyncio.Event()
+        first, first_started, _ = await call(app, hang_up)
+        await asyncio.wait_for(first_started.wait(), 5)
+
+        second, _, second_result = await call(app)
+        await asyncio.wait_for(second, 5)
+        assert second_result()[0] == 429
+
+        # The streaming client goes away part-way through
+        hang_up.set()
+        await asyncio.wait_for(first, 5)
+        assert_idle(limiter)
+
+        third, _, third_result = await call(app)
+        await asyncio.wait_for(third, 5)
+        status, body = third_result()
+        assert status == 200
+        assert [json.loads(line)["content"] for line in body.decode().splitlines()] == [str(i) for i in range(40)]
+
+    asyncio.run(scenario())
+    assert_idle(limiter)
+
+def test_stream_error_is_reported_in_band_and_frees_the_permit():
+    limiter = EndpointLimiter("test", max_concurrency=1, max_queue=0)
+    app = FastAPI()
+
+    @app.post("/stream")
+    async def failing_endpoint():
+        return ndjson_response(limiter.stream(events(5, fail_at=2)))
+
+    async def scenario():
+        task, _, result = await call(app)
+        await asyncio.wait_for(task, 5)
+        return result()
+
+    status, body = asyncio.run(scenario())
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert status == 200 and lines[-1] == {"event": "error", "detail": "backend went away"}
+    assert_idle(limiter)
@@ -0,0 +1,62 @@
+# tests/test_embedding_cache.py
+
+import itertools
+
+from langchain_core.embeddings import Embeddings
+
+from app.utils import embedding_cache
+from app.utils.embedding_cache import CachedEmbeddings, EmbeddingCache, cache_key
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.embedded = []
+
+    def _vector(self, text):
+        return [float(len(text)), float(sum(map(ord, text)) % 97), 1.0, 0.5]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return self._vector(text)
+
+def test_hits_skip_the_model_and_misses_are_embedded_once(tmp_path):
+    model = CountingEmbeddings()
+    embeddings = CachedEmbeddings(model, "test-model", EmbeddingCache(str(tmp_path / "cache.sqlite3")))
+
+    first = embeddings.embed_documents(["Revenue rose", "Net income fell", "Revenue rose"])
+    assert model.embedded == ["Revenue rose", "Net income fell"]
+    # Whitespace-only differences share a key; the query path reads the same cache
+    assert embeddings.embed_query("  Revenue   rose ") == first[0]
+    assert embeddings.embed_documents(["Net income fell", "Margins widened"])[0] == first[1]
+    assert model.embedded == ["Revenue rose", "Net income fell", "Margins widened"]
+    assert embeddings.stats()["hits"] == 3 and embeddings.stats()["misses"] == 3
+
+def test_vectors_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    CachedEmbeddings(CountingEmbeddings(), "test-model", EmbeddingCache(path)).embed_documents(["Revenue rose"])
+
+    model = CountingEmbeddings()
+    reopened = EmbeddingCache(path)
+    assert reopened.total_bytes == 16
+    CachedEmbeddings(model, "test-model", reopened).embed_documents(["Revenue rose"])
+    assert model.embedded == []
+    # Keys include the model name, so another model never reads these vectors
+    CachedEmbeddings(model, "other-model", reopened).embed_documents(["Revenue rose"])
+    assert model.embedded == ["Revenue rose"]
+
+def test_least_recently_used_vectors_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: next(clock))
+    # Four 4-dim float32 vectors fit exactly; eviction trims to 90% of the budget
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_bytes=64)
+    keys = {text: cache_key("m", text) for text in "abcde"}
+    for text in "abcd":
+        cache.put_many("m", {keys[text]: [1.0, 2.0, 3.0, 4.0]})
+    cache.get_many([keys["a"]])
+
+    cache.put_many("m", {keys["e"]: [1.0, 2.0, 3.0, 4.0]})
+    assert set(cache.get_many(list(keys.values()))) == {keys["a"], keys["d"], keys["e"]}
+    assert cache.total_bytes == 48
@@ -0,0 +1,69 @@
+# tests/test_federated_retriever.py
+
+import threading
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+
+from app.services.agents.retriever_agent import retrieve_relevant_docs
+from app.services.federated_retriever import FederatedRetriever, register_collection_retriever
+from app.services.hybrid_retriever import HybridRetriever
+from app.utils.bm25_index import BM25Index
+from app.utils.hash_embeddings import HashEmbeddings
+
+def in_memory_retriever(name, texts):
+    ids = [f"{name}-{i}" for i in range(len(texts))]
+    docs = [Document(page_content=text, metadata={"source": name}) for text in texts]
+    sparse_index = BM25Index()
+    sparse_index.add((chunk_id, doc.page_content, doc.metadata) for chunk_id, doc in zip(ids, docs))
+    vector_store = FAISS.from_documents(docs, HashEmbeddings(), ids=ids)
+    return HybridRetriever(vector_store, collection_name=name, sparse_index=sparse_index)
+
+class BlockedRetriever:
+    """Holds every search until released: a collection stuck behind a slow store."""
+    def __init__(self):
+        self.release = threading.Event()
+
+    def search(self, query, k=None, filters=None):
+        self.release.wait(5)
+        return [Document(page_content="late revenue figures", metadata={"score": 1.0})], {}
+
+class FailingRetriever:
+    def search(self, query, k=None, filters=None):
+        raise ConnectionError("index unavailable")
+
+QUESTION = "How did revenue change in 2019?"
+
+def test_slow_and_failing_collections_are_left_out_and_reported(workdir):
+    register_collection_retriever("fast", in_memory_retriever("fast", ["Revenue grew 8% in 2019", "Costs fell"]))
+    slow = BlockedRetriever()
+    register_collection_retriever("slow", slow)
+    register_collection_retriever("broken", FailingRetriever())
+    federated = FederatedRetriever(["fast", "slow", "broken"], k=2, timeout_ms=100)
+
+    try:
+        docs, applied = federated.search(QUESTION)
+        assert applied == {"fast": {}}
+        assert docs and {doc.metadata["collection"] for doc in docs} == {"fast"}
+        stats = federated.stats()
+        assert stats["slow"]["timeouts"] == 1 and stats["broken"]["errors"] == 1 and stats["fast"]["timeouts"] == 0
+
+        # The retriever agent turns the missing collections into a degraded answer
+        (message,) = retrieve_relevant_docs([HumanMessage(content=QUESTION)], federated)
+        assert message.additional_kwargs["retrieval"]["degraded"] == ["slow", "broken"]
+    finally:
+        slow.release.set()
+
+def test_scores_are_normalized_per_collection(workdir):
+    register_collection_retriever("a", in_memory_retriever("a", ["Revenue grew 8% in 2019", "Revenue was flat in 2018"]))
+    register_collection_retriever("b", in_memory_retriever("b", ["2019 revenue rose to 4.1 billion"]))
+    federated = FederatedRetriever(["a", "b"], k=3, timeout_ms=2000)
+
+    docs, applied = federated.search(QUESTION)
+    assert set(applied) == {"a", "b"}
+    top_scores = {name: max(doc.metadata["score"] for doc in docs if doc.metadata["collection"] == name) for name in ("a", "b")}
+    assert top_scores == {"a": 1.0, "b": 1.0}
+
+    (message,) = retrieve_relevant_docs([HumanMessage(content=QUESTION)], federated)
+    assert "degraded" not in message.additional_kwargs["retrieval"]
@@ -0,0 +1,131 @@
+# tests/test_graph_loader.py
+
+import re
+
+from langchain_core.documents import Document
+
+from app.services.kg_retriever import KnowledgeGraphRetriever
+from app.utils.graph_loader import _to_lucene_query, save_chunks_to_neo4j, search_knowledge_graph
+
+# --- In-memory stand-in for the Neo4j driver: just the queries graph_loader sends ---
+class FakeRecord:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return dict(self._data)
+
+class FakeGraph:
+    def __init__(self):
+        self.nodes = {}          # DocumentChunk nodes by id (the uniqueness constraint)
+        self.write_batches = []  # rows per write transaction
+        self.schema = []
+
+    def run(self, query, **params):
+        if "UNWIND $rows" in query:
+            for row in params["rows"]:
+                node = self.nodes.setdefault(row["id"], {"id": row["id"]})
+                node.update(text=row["text"], source=row["source"], **row["props"])
+            return []
+        if "queryNodes" in query:
+            terms = params["terms"].split(" OR ")
+            if any(term in ("AND", "OR", "NOT", "TO") or term.startswith("-") for term in terms):
+                raise ValueError(f"Lucene operator in query terms: {params['terms']}")
+            terms = {term.lower() for term in terms}
+            hits = []
+            for node in self.nodes.values():
+                score = len(terms & set(re.findall(r"[a-z0-9]+", node["text"].lower())))
+                if not score:
+                    continue
+                if params["company"] and node.get("company") not in (None, params["company"]):
+                    continue
+                if params["form_type"] and node.get("form_type") not in (None, params["form_type"]):
+                    continue
+                hits.append({"id": node["id"], "text": node["text"], "source": node["source"], "score": score})
+            hits.sort(key=lambda hit: -hit["score"])
+            return [FakeRecord(hit) for hit in hits[:params["k"]]]
+        self.schema.append(" ".join(query.split()))
+        return []
+
+class FakeSession:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None, **params):
+        # Same signature as neo4j.Session.run: a "query" keyword would clash with the Cypher text
+        return self.graph.run(query, **(parameters or {}), **params)
+
+    def execute_write(self, work, *args):
+        self.graph.write_batches.append(len(args[0]))
+        return work(self.graph, *args)
+
+class FakeDriver:
+    def __init__(self):
+        self.graph = FakeGraph()
+
+    def session(self):
+        return FakeSession(self.graph)
+
+def chunks(count):
+    return [Document(page_content=f"Segment {i} revenue was {i * 10} million", metadata={"page": i}) for i in range(count)]
+
+def test_chunks_are_written_in_batches():
+    driver = FakeDriver()
+    assert save_chunks_to_neo4j(chunks(25), source="report.pdf", batch_size=10, graph_driver=driver) == 25
+    assert driver.graph.write_batches == [10, 10, 5]
+    assert len(driver.graph.nodes) == 25
+    assert any("REQUIRE c.id IS UNIQUE" in query for query in driver.graph.schema)
+
+def test_rewriting_the_same_chunks_creates_no_duplicates():
+    driver = FakeDriver()
+    save_chunks_to_neo4j(chunks(25), source="report.pdf", batch_size=10, graph_driver=driver)
+    first = {node_id: dict(node) for node_id, node in driver.graph.nodes.items()}
+
+    save_chunks_to_neo4j(chunks(25), source="report.pdf", batch_size=7, graph_driver=driver)
+    assert driver.graph.nodes == first
+
+    # The same text from another source is a different chunk
+    save_chunks_to_neo4j(chunks(1), source="other.pdf", graph_driver=driver)
+    assert len(driver.graph.nodes) == 26
+
+def test_flattened_sec_summaries_keep_their_properties():
+    driver = FakeDriver()
+    summary = {"text": "Apple net sales rose", "company": "AAPL", "form_type": "10-K", "fiscal_year": 2019, "nested": {"x": 1}}
+    save_chunks_to_neo4j([summary], source="aapl.txt", collection_name="sec_summaries", graph_driver=driver)
+    (node,) = driver.graph.nodes.values()
+    assert node["company"] == "AAPL" and node["fiscal_year"] == 2019 and "nested" not in node
+
+def test_full_text_lookup_filters_by_company():
+    driver = FakeDriver()
+    save_chunks_to_neo4j([
+        {"text": "Apple net sales rose 6%", "company": "AAPL"},
+        {"text": "Microsoft net sales rose 14%", "company": "MSFT"},
+        {"text": "Net sales by segment table"},
+    ], source="filings", graph_driver=driver)
+
+    hits = search_knowledge_graph("What were Apple's net sales?", k=5, company="AAPL", graph_driver=driver)
+    assert {hit["text"] for hit in hits} == {"Apple net sales rose 6%", "Net sales by segment table"}
+    assert search_knowledge_graph("the of and", graph_driver=driver) == []
+
+def test_lucene_operators_in_questions_are_plain_terms():
+    assert _to_lucene_query("Did -revenue AND margin NOT rise TO 2019?") == "revenue OR margin OR not OR rise OR 2019"
+
+    driver = FakeDriver()
+    save_chunks_to_neo4j([{"text": "Net sales did not rise in 2019"}], source="filings", graph_driver=driver)
+    hits = search_knowledge_graph("Net sales AND NOT -costs", graph_driver=driver)
+    assert [hit["text"] for hit in hits] == ["Net sales did not rise in 2019"]
+
+def test_kg_retriever_uses_its_driver():
+    driver = FakeDriver()
+    save_chunks_to_neo4j(chunks(3), source="report.pdf", graph_driver=driver)
+    retriever = KnowledgeGraphRetriever(k=2, graph_driver=driver)
+    retriever.connect()
+    assert retriever.ready
+    assert any("FULLTEXT INDEX" in query for query in driver.graph.schema)
+    assert retriever.retrieve("What was segment 2 revenue?")[0] == "Segment 2 revenue was 20 million"
@@ -0,0 +1,63 @@
+# tests/test_hybrid_retriever.py
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from app.services.hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+from app.utils.bm25_index import BM25Index
+from app.utils.hash_embeddings import HashEmbeddings
+
+def build(texts, metadatas=None, **kwargs):
+    metadatas = metadatas or [{} for _ in texts]
+    ids = [f"chunk-{i}" for i in range(len(texts))]
+    docs = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+    sparse_index = BM25Index()
+    sparse_index.add((chunk_id, doc.page_content, doc.metadata) for chunk_id, doc in zip(ids, docs))
+    vector_store = FAISS.from_documents(docs, HashEmbeddings(), ids=ids)
+    return HybridRetriever(vector_store, collection_name="test", sparse_index=sparse_index, **kwargs)
+
+REVENUE_TEXTS = [f"Segment {i} revenue was {i} million in fiscal 2019" for i in range(120)]
+
+def test_per_call_k_widens_the_candidate_pool():
+    retriever = build(REVENUE_TEXTS, k=5, candidates=20)
+    assert len(retriever.search("segment revenue 2019")[0]) == 5
+    # The reranker asks for 50: both sides must return more than the default 20 candidates
+    docs, _ = retriever.search("segment revenue 2019", k=50)
+    assert len(docs) == 50
+    assert len({doc.id for doc in docs}) == 50
+
+def test_rrf_rewards_agreement_between_rankings():
+    scores = reciprocal_rank_fusion({"dense": ["a", "b", "c"], "sparse": ["d", "b", "e"]}, {}, rrf_k=60)
+    # Second on both lists beats first on only one
+    assert max(scores, key=scores.get) == "b"
+    assert scores["b"] == 2 / 62 and scores["a"] == scores["d"] == 1 / 61
+    assert scores["c"] == scores["e"] == 1 / 63
+
+def test_rrf_weights_scale_and_disable_a_side():
+    rankings = {"dense": ["a", "b"], "sparse": ["b", "a"]}
+    scores = reciprocal_rank_fusion(rankings, {"dense": 1.0, "sparse": 2.0}, rrf_k=0)
+    assert scores == {"a": 1 + 2 / 2, "b": 1 / 2 + 2}
+    assert sorted(reciprocal_rank_fusion(rankings, {"dense": 0.0}, rrf_k=0).items(), key=lambda item: -item[1])[0][0] == "b"
+
+def test_sparse_only_exact_match_is_fused_into_the_results():
+    texts = REVENUE_TEXTS[:30] + ["Goodwill impairment of 14.7 million was recorded"]
+    retriever = build(texts, k=3, candidates=10)
+    docs, _ = retriever.search("goodwill impairment 14.7")
+    assert docs[0].page_content == texts[-1]
+    assert docs[0].metadata["chunk_id"] == "chunk-30" and docs[0].metadata["score"] > 0
+
+def test_filters_are_relaxed_until_something_matches():
+    texts = ["Apple net sales were 260 billion", "Apple net sales were 229 billion", "Microsoft net sales were 125 billion"]
+    metadatas = [
+        {"company": "AAPL", "fiscal_year": 2019, "fiscal_quarter": "Q4"},
+        {"company": "AAPL", "fiscal_year": 2018},
+        {"company": "MSFT", "fiscal_year": 2019},
+    ]
+    retriever = build(texts, metadatas, k=3)
+
+    docs, applied = retriever.search("net sales", filters={"company": ["AAPL"], "fiscal_year": ["2019"], "fiscal_quarter": ["Q2"]})
+    assert applied == {"company": ["AAPL"], "fiscal_year": ["2019"]}
+    assert [doc.page_content for doc in docs] == [texts[0]]
+
+    docs, applied = retriever.search("net sales", filters={"company": ["GOOG"]})
+    assert applied == {} and len(docs) == 3
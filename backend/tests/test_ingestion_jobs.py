@@ -0,0 +1,47 @@
+# tests/test_ingestion_jobs.py
+
+import os
+
+from app.services import ingestion_jobs
+from app.services.ingestion_jobs import IngestionJobQueue
+
+def run_job(workdir, monkeypatch, ingest):
+    calls = []
+
+    def fake_ingest(file_path, collection_name="default", progress=None, source=None):
+        calls.append((file_path, source, open(file_path).read()))
+        return ingest()
+
+    monkeypatch.setattr(ingestion_jobs, "ingest_document", fake_ingest)
+    jobs = IngestionJobQueue(db_path=str(workdir / "jobs.sqlite3"), workers=0)
+    os.makedirs("uploads")
+    with open("uploads/abc_report.txt", "w") as f:
+        f.write("second upload")
+    job_id = jobs.submit("uploads/abc_report.txt", source="uploads/report.txt", job_id="abc")
+    jobs._run(job_id)
+    return jobs.get(job_id), calls
+
+def test_completed_job_ingests_its_own_copy_and_publishes_it(workdir, monkeypatch):
+    job, calls = run_job(workdir, monkeypatch, lambda: 3)
+    assert job["status"] == "completed"
+    assert calls == [("uploads/abc_report.txt", "uploads/report.txt", "second upload")]
+    assert os.listdir("uploads") == ["report.txt"]
+    assert open("uploads/report.txt").read() == "second upload"
+
+def test_failed_job_deletes_its_copy(workdir, monkeypatch):
+    def fail():
+        raise ValueError("bad pdf")
+
+    job, _ = run_job(workdir, monkeypatch, fail)
+    assert job["status"] == "failed" and job["error"] == "bad pdf"
+    assert os.listdir("uploads") == []
+
+def test_jobs_without_a_source_keep_their_file(workdir, monkeypatch):
+    monkeypatch.setattr(ingestion_jobs, "ingest_document", lambda *args, **kwargs: 1)
+    jobs = IngestionJobQueue(db_path=str(workdir / "jobs.sqlite3"), workers=0)
+    with open("report.txt", "w") as f:
+        f.write("text")
+    job_id = jobs.submit("report.txt")
+    jobs._run(job_id)
+    assert jobs.get(job_id)["source"] == "report.txt"
+    assert os.path.exists("report.txt")
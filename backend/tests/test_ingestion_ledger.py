@@ -0,0 +1,72 @@
+# tests/test_ingestion_ledger.py
+
+import pytest
+from langchain_core.documents import Document
+
+from app.utils import vector_store
+from app.utils.hash_embeddings import HashEmbeddings
+from app.utils.ingestion_ledger import get_ledger, make_chunk_id
+
+PARAGRAPHS = [
+    "Revenue grew 12% to 4.1 billion.",
+    "Operating margin widened to 18%.",
+    "Net income was 610 million.",
+]
+
+class CountingEmbeddings(HashEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+    def report(self):
+        return f"{len(self.embedded)} embedded"
+
+@pytest.fixture
+def embeddings(workdir, monkeypatch):
+    embeddings = CountingEmbeddings()
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(vector_store, "_use_local_collection", lambda collection_name, incoming: True)
+    return embeddings
+
+def ingest(paragraphs, source="report.txt"):
+    chunk_ids = vector_store.save_vector_store([Document(page_content=text) for text in paragraphs], "filings", source=source)
+    removed = vector_store.delete_stale_chunks("filings", source, chunk_ids)
+    return chunk_ids, removed
+
+def test_chunk_id_depends_only_on_collection_source_and_text():
+    chunk_id = make_chunk_id("filings", "report.txt", PARAGRAPHS[0])
+    assert chunk_id == make_chunk_id("filings", "report.txt", PARAGRAPHS[0])
+    assert chunk_id.startswith("filings_")
+    assert len({
+        chunk_id,
+        make_chunk_id("finqa", "report.txt", PARAGRAPHS[0]),
+        make_chunk_id("filings", "other.txt", PARAGRAPHS[0]),
+        make_chunk_id("filings", "report.txt", PARAGRAPHS[1]),
+    }) == 4
+
+def test_reingesting_unchanged_content_keeps_ids_and_skips_embedding(embeddings):
+    first, _ = ingest(PARAGRAPHS)
+    version = get_ledger("filings").version
+
+    second, removed = ingest(PARAGRAPHS)
+    assert second == first and removed == 0
+    assert embeddings.embedded == PARAGRAPHS
+    # Nothing was stored or removed, so cached answers stay valid
+    assert get_ledger("filings").version == version
+
+def test_edited_source_replaces_only_changed_chunks(embeddings):
+    first, _ = ingest(PARAGRAPHS)
+    edited = PARAGRAPHS[:2] + ["Net income was 640 million."]
+
+    second, removed = ingest(edited)
+    assert second[:2] == first[:2] and second[2] != first[2]
+    assert removed == 1
+    assert embeddings.embedded == PARAGRAPHS + edited[2:]
+    assert get_ledger("filings").ids_for_source("report.txt") == set(second)
+    store = vector_store.load_vector_store("filings")
+    assert store.index.ntotal == 3
+    assert store.similarity_search(edited[2], k=1)[0].id == second[2]
@@ -0,0 +1,41 @@
+# tests/test_json_stream.py
+
+import json
+
+import pytest
+
+from app.utils.json_stream import batched, iter_json_array
+
+def write(tmp_path, text):
+    path = tmp_path / "records.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64])
+@pytest.mark.parametrize("text", [
+    "[123.45, 6]",
+    "[100.5]",
+    "[1, 22, 333, 4444, -55555, 6.5e10, 0.000123]",
+    "[ 12 ,\n 3.25 ]",
+    '[{"id": 1, "values": [1.5, 2]}, 42, "x", true, null, 1234567]',
+])
+def test_small_chunks_decode_every_element(tmp_path, text, chunk_size):
+    path = write(tmp_path, text)
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == json.loads(text)
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 64])
+def test_offset_and_limit(tmp_path, chunk_size):
+    path = write(tmp_path, json.dumps([{"id": i, "amount": i * 1.25} for i in range(10)]))
+    records = list(iter_json_array(path, offset=3, limit=4, chunk_size=chunk_size))
+    assert [record["id"] for record in records] == [3, 4, 5, 6]
+
+def test_empty_array(tmp_path):
+    assert list(iter_json_array(write(tmp_path, " [ ] "), chunk_size=1)) == []
+
+@pytest.mark.parametrize("text", ["{}", "[1, 2", "[12x]", '[{"a": 1} {"b": 2}]', '["a" "b"]', "[1,, 2]", "[1, 2,]"])
+def test_malformed_input_raises(tmp_path, text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(write(tmp_path, text), chunk_size=2))
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
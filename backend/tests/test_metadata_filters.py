@@ -0,0 +1,42 @@
+# tests/test_metadata_filters.py
+
+from app.utils.metadata_filters import filters_from_entities, indexable_fields, relaxations, to_pinecone_filter
+
+def test_relaxations_drop_the_most_specific_field_first():
+    filters = {"company": ["AAPL"], "fiscal_year": ["2019"], "form_type": ["10-K"], "fiscal_quarter": ["Q4"]}
+    assert list(relaxations(filters)) == [
+        filters,
+        {"company": ["AAPL"], "fiscal_year": ["2019"], "form_type": ["10-K"]},
+        {"company": ["AAPL"], "form_type": ["10-K"]},
+        {"company": ["AAPL"]},
+        {},
+    ]
+    # The caller's dict is never mutated
+    assert "fiscal_quarter" in filters
+
+def test_relaxations_skip_absent_fields_and_end_unfiltered():
+    assert list(relaxations({"company": ["MSFT"], "fiscal_year": ["2020"]})) == [
+        {"company": ["MSFT"], "fiscal_year": ["2020"]},
+        {"company": ["MSFT"]},
+        {},
+    ]
+    assert list(relaxations({})) == [{}]
+    # Fields outside FILTER_FIELDS can't be relaxed one by one, only dropped at the end
+    assert list(relaxations({"segment": ["cloud"]})) == [{"segment": ["cloud"]}, {}]
+
+def test_filters_from_entities():
+    entities = {"company": "AAPL", "form_type": "10-Q", "years": ["2018", "2019"], "quarter": "Q2"}
+    assert filters_from_entities(entities) == {
+        "company": ["AAPL"], "form_type": ["10-Q"], "fiscal_year": ["2018", "2019"], "fiscal_quarter": ["Q2"],
+    }
+    assert filters_from_entities({"years": []}) == {}
+
+def test_indexable_fields_and_pinecone_filter():
+    assert indexable_fields({"company": "AAPL", "fiscal_year": 2019, "form_type": "", "page": 3}) == {
+        "fiscal_year": "2019", "company": "AAPL",
+    }
+    assert to_pinecone_filter({}) is None
+    assert to_pinecone_filter({"company": ["AAPL"]}) == {"company": {"$in": ["AAPL"]}}
+    assert to_pinecone_filter({"company": ["AAPL"], "fiscal_year": ["2019"]}) == {
+        "$and": [{"company": {"$in": ["AAPL"]}}, {"fiscal_year": {"$in": [2019]}}],
+    }
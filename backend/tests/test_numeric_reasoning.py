@@ -0,0 +1,131 @@
+# tests/test_numeric_reasoning.py
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.services.agents.answer_generator_agent import generate_answer, stream_answer
+from app.services.numeric_reasoning import parse_number, solve_numeric_question
+
+TABLE = [
+    ["", "2017", "2018", "2019"],
+    ["Revenue", "100", "150", "200"],
+    ["Net income", "10", "20", "30"],
+    ["Total revenue", "1", "2", "3"],
+]
+
+def solve(question, table=TABLE):
+    return solve_numeric_question(question, tables=[table])
+
+@pytest.mark.parametrize("cell, expected", [("$1,234.5", 1234.5), ("(123)", -123.0), ("12.5%", 12.5), (7, 7.0)])
+def test_parse_number(cell, expected):
+    assert parse_number(cell) == expected
+
+def test_missing_cells_parse_as_nan():
+    assert parse_number("—") != parse_number("—")
+
+@pytest.mark.parametrize("question, value", [
+    ("What was the change in revenue from 2017 to 2019?", 100.0),
+    ("What was the percentage change in revenue from 2017 to 2019?", 100.0),
+    ("What was the change in revenue between 2018 and 2019?", 50.0),
+    ("What was the average net income from 2017 to 2019?", 20.0),
+    ("What is the sum of revenue in 2018 and 2019?", 350.0),
+    ("What is the ratio of revenue in 2019 to 2018?", 200 / 150),
+    ("What is the ratio of revenue in 2018 to 2019?", 150 / 200),
+    ("What is the ratio of net income to revenue in 2019?", 0.15),
+])
+def test_resolved_programs(question, value):
+    solved = solve(question)
+    assert solved["value"] == pytest.approx(value)
+    assert solved["confident"]
+
+@pytest.mark.parametrize("question", [
+    # Metric words the row label doesn't have
+    "What is the change in net income margin from 2018 to 2019?",
+    # Two rows across two years is ambiguous
+    "What is the ratio of net income to revenue in 2019 and 2018?",
+    # "total" names the row here, it doesn't ask for a sum
+    "What was total revenue in 2018 and 2019?",
+    # A single period can't be compared
+    "What was the change in revenue in 2019?",
+    # A year the table doesn't have
+    "What was the change in revenue from 2016 to 2019?",
+])
+def test_unresolved_questions(question):
+    assert solve(question) is None
+
+def test_total_row_is_picked_for_total_questions():
+    solved = solve("What was the change in total revenue from 2018 to 2019?")
+    assert solved["program"]["row"] == "Total revenue"
+    assert solved["value"] == 1.0
+
+def test_month_in_label_picks_the_row_the_question_names():
+    table = [["", "2018", "2019"], ["Outstanding at 1 April", "10", "12"], ["Outstanding at 31 March", "12", "20"]]
+    solved = solve("What was the change in the amount Outstanding at 31 March in 2019 from 2018?", table=table)
+    assert solved["program"]["row"] == "Outstanding at 31 March"
+    assert solved["value"] == 8.0
+
+def test_filler_words_do_not_block_a_match():
+    solved = solve("What is the average Revenue for the year ended December 31, 2018 and 2019?")
+    assert solved["value"] == 175.0
+    assert solved["confident"]
+
+def test_partial_row_match_is_not_confident():
+    solved = solve("What was the change in revenue from segment sales from 2018 to 2019?",
+                   table=[["", "2018", "2019"], ["Revenue from segment sales and services", "5", "8"]])
+    assert solved["value"] == 3.0
+    assert not solved["confident"]
+
+def test_tables_in_context_text():
+    context = "Table:\n| | 2018 | 2019 |\n| --- | --- | --- |\n| Revenue | $1,000 | $1,250 |"
+    solved = solve_numeric_question("What was the percentage change in revenue from 2018 to 2019?", context=context)
+    assert solved["value"] == 25.0
+
+# --- Answer generation: the solver replaces the LLM only for a confident match from the right table ---
+class RecordingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return "llm answer"
+
+    def stream(self, prompt):
+        yield self.invoke(prompt)
+
+APPLE_TABLE = "Table:\n| | 2018 | 2019 |\n| --- | --- | --- |\n| Revenue | 100 | 150 |"
+MSFT_TABLE = "Table:\n| | 2018 | 2019 |\n| --- | --- | --- |\n| Revenue | 300 | 330 |"
+
+def messages(question, passages):
+    context = "\n\n".join(passage["text"] for passage in passages)
+    return [HumanMessage(content=question), AIMessage(content=context, additional_kwargs={"passages": passages})]
+
+def test_confident_match_from_the_questions_company_skips_the_llm():
+    llm = RecordingLLM()
+    result = generate_answer(messages("What was the change in Apple's revenue from 2018 to 2019?", [
+        {"text": MSFT_TABLE, "source": "msft-10k", "company": "MSFT"},
+        {"text": APPLE_TABLE, "source": "aapl-10k", "company": "AAPL"},
+    ]), llm)
+    assert result[0].content == "The change in Revenue from 2018 to 2019 is 50."
+    assert not llm.prompts
+
+def test_table_from_another_company_is_only_a_hint():
+    llm = RecordingLLM()
+    result = generate_answer(messages("What was the change in Apple's revenue from 2018 to 2019?", [
+        {"text": MSFT_TABLE, "source": "msft-10k", "company": "MSFT"},
+    ]), llm)
+    assert result[0].content == "llm answer"
+    assert "is 30." in llm.prompts[0]
+
+def test_tables_from_several_sources_without_a_company_are_only_a_hint():
+    llm = RecordingLLM()
+    tokens = list(stream_answer(messages("What was the change in revenue from 2018 to 2019?", [
+        {"text": APPLE_TABLE, "source": "a"},
+        {"text": MSFT_TABLE, "source": "b"},
+    ]), llm))
+    assert tokens == ["llm answer"]
+    assert "A calculation over a table" in llm.prompts[0]
+
+def test_no_table_leaves_the_prompt_unchanged():
+    llm = RecordingLLM()
+    generate_answer(messages("What was the change in revenue from 2018 to 2019?", [{"text": "Revenue grew.", "source": "a"}]), llm)
+    assert "A calculation" not in llm.prompts[0]
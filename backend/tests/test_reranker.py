@@ -0,0 +1,72 @@
+# tests/test_reranker.py
+
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.services.agents.reranker_agent import rerank_passages
+from app.services.reranker import CrossEncoderReranker
+from app.utils.token_budget import estimate_tokens
+
+class KeywordModel:
+    """Cross-encoder stand-in: scores a pair by how often the passage says "revenue"."""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = 0
+
+    def predict(self, pairs, batch_size=None):
+        self.batches += 1
+        time.sleep(self.delay)
+        return [text.lower().count("revenue") for _, text in pairs]
+
+# Fused retrieval order: the most relevant passage comes last
+PASSAGES = [
+    {"text": "Costs fell in 2019", "source": "a"},
+    {"text": "Revenue grew in 2019", "source": "b"},
+    {"text": "Revenue and revenue mix: revenue rose 8%", "source": "c"},
+]
+
+def reranker(model, **kwargs):
+    reranker = CrossEncoderReranker(**{"batch_size": 1, "budget_ms": 1000, "token_budget": 1000, **kwargs})
+    reranker.model = model
+    return reranker
+
+def test_passages_are_reordered_by_cross_encoder_score():
+    kept, info = reranker(KeywordModel()).rerank("How did revenue change?", PASSAGES)
+    assert [p["source"] for p in kept] == ["c", "b", "a"]
+    assert [p["rerank_score"] for p in kept] == [3, 1, 0]
+    assert info["reranked"] and info["kept"] == 3 and "fallback" not in info
+
+def test_missing_the_deadline_keeps_the_fused_order():
+    model = KeywordModel(delay=0.03)
+    slow = reranker(model, budget_ms=40)
+    kept, info = slow.rerank("How did revenue change?", PASSAGES)
+
+    assert [p["source"] for p in kept] == ["a", "b", "c"]
+    assert not any("rerank_score" in p for p in kept)
+    assert not info["reranked"] and info["fallback"] == "over 40ms budget"
+    # Scoring stops at the deadline instead of finishing every batch
+    assert model.batches < len(PASSAGES)
+    assert slow.stats()["fallbacks"] == 1
+
+def test_a_last_batch_that_overruns_the_deadline_still_falls_back():
+    kept, info = reranker(KeywordModel(delay=0.06), batch_size=8, budget_ms=30).rerank("revenue", PASSAGES)
+    assert [p["source"] for p in kept] == ["a", "b", "c"] and not info["reranked"]
+
+def test_unloaded_model_is_a_pass_through_within_the_token_budget():
+    kept, info = reranker(None, token_budget=8).rerank("revenue", PASSAGES)
+    assert info["fallback"] == "model unavailable"
+    assert kept[0] == PASSAGES[0] and [p["source"] for p in kept] == ["a", "b", "c"]
+    # Passages past the budget are cut down, never reordered
+    assert sum(estimate_tokens(p["text"]) for p in kept) <= 8
+    assert kept[-1]["text"] != PASSAGES[-1]["text"]
+
+def test_agent_records_rerank_info_with_the_retrieval():
+    retrieved = AIMessage(content="", additional_kwargs={
+        "retrieval": {"query": "How did revenue change?", "num_docs": 3},
+        "passages": PASSAGES,
+    })
+    (message,) = rerank_passages([HumanMessage(content="revenue?"), retrieved], reranker(KeywordModel()))
+    assert message.content.startswith("Revenue and revenue mix")
+    assert message.additional_kwargs["retrieval"]["rerank"]["reranked"]
+    assert message.additional_kwargs["retrieval"]["num_docs"] == 3
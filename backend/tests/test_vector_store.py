@@ -0,0 +1,116 @@
+# tests/test_vector_store.py
+
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from app import config
+from app.utils import bm25_index, vector_store
+from app.utils.hash_embeddings import HashEmbeddings
+
+class CountingEmbeddings(HashEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+    def report(self):
+        return f"{self.embedded} embedded"
+
+@pytest.fixture
+def local_collection(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_VECTORS_DIR", str(tmp_path))
+    monkeypatch.setattr(bm25_index, "_indexes", {})
+    embeddings = CountingEmbeddings()
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda: embeddings)
+
+    data = [{"id": f"chunk-{i}", "text": f"Revenue for segment {i} was {i * 7} million", "metadata": {}} for i in range(1200)]
+    local_dir = vector_store.get_local_dir("rebuild")
+    os.makedirs(local_dir)
+    vector_store._write_local_collection(local_dir, data, embeddings.embed_documents([item["text"] for item in data]))
+    embeddings.embedded = 0
+    return local_dir, data, embeddings
+
+def test_missing_index_is_rebuilt_from_stored_embeddings(local_collection):
+    local_dir, data, embeddings = local_collection
+    embeddings_path = os.path.join(local_dir, vector_store.EMBEDDINGS_FILE)
+    stored = np.load(embeddings_path)
+    os.remove(os.path.join(local_dir, vector_store.INDEX_FILE))
+
+    for _ in range(2):
+        store = vector_store.load_vector_store("rebuild")
+        assert store.index.ntotal == len(data)
+
+    assert embeddings.embedded == 0
+    assert np.array_equal(np.load(embeddings_path), stored)
+    assert os.path.exists(os.path.join(local_dir, vector_store.INDEX_FILE))
+    assert store.similarity_search(data[42]["text"], k=1)[0].id == "chunk-42"
+
+def test_append_rewrites_embeddings_it_read(local_collection):
+    local_dir, data, embeddings = local_collection
+    store = vector_store.load_vector_store("rebuild")
+
+    vector_store._save_local_collection([("extra", "Operating margin rose to 12%", {})], "rebuild")
+
+    assert np.load(os.path.join(local_dir, vector_store.EMBEDDINGS_FILE)).shape[0] == len(data) + 1
+    assert vector_store.load_vector_store("rebuild").index.ntotal == len(data) + 1
+    # The store loaded before the write still reads its (replaced, not truncated) index
+    assert store.similarity_search(data[3]["text"], k=1)[0].id == "chunk-3"
+    assert not [name for name in os.listdir(local_dir) if name.endswith(".tmp")]
+
+# --- Pipelined embed → write ---
+class SlowFirstBatchEmbeddings(CountingEmbeddings):
+    def __init__(self, fail_on=None):
+        super().__init__()
+        self.fail_on = fail_on
+
+    def embed_documents(self, texts):
+        if self.fail_on in texts:
+            raise RuntimeError("embedding service down")
+        if texts[0] == "text 0":
+            # Not time.sleep: the fixture disables it to skip retry backoff
+            threading.Event().wait(0.05)
+        return super().embed_documents(texts)
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    def run(texts, sink, embeddings, **kwargs):
+        monkeypatch.setattr(vector_store, "get_embeddings", lambda: embeddings)
+        monkeypatch.setattr(vector_store.time, "sleep", lambda seconds: None)
+        return vector_store._pipelined_write(texts, sink, **kwargs)
+    return run
+
+def test_batches_are_written_in_order(pipeline):
+    texts = [f"text {i}" for i in range(10)]
+    written, progress = [], []
+    embeddings = SlowFirstBatchEmbeddings()
+
+    failed = pipeline(
+        texts, lambda start, vectors: written.append((start, vectors)), embeddings,
+        batch_size=3, workers=3, progress=lambda done, total: progress.append((done, total)),
+    )
+
+    assert failed == []
+    assert [start for start, _ in written] == [0, 3, 6, 9]
+    assert [vector for _, vectors in written for vector in vectors] == HashEmbeddings().embed_documents(texts)
+    assert progress == [(3, 10), (6, 10), (9, 10), (10, 10)]
+
+def test_failed_batches_are_reported_and_skipped(pipeline):
+    texts = [f"text {i}" for i in range(10)]
+    written = []
+
+    def sink(start, vectors):
+        if start == 6:
+            raise ConnectionError("upsert rejected")
+        written.append(start)
+
+    failed = pipeline(texts, sink, SlowFirstBatchEmbeddings(fail_on="text 4"), batch_size=3, workers=2)
+
+    # Batch 3-6 never embeds and batch 6-9 never writes; the rest still land, in order
+    assert failed == [(3, 6), (6, 9)]
+    assert written == [0, 9]